@@ -0,0 +1,205 @@
+# bench.py
+#
+# Compare le coût des politiques de bots sur des plateaux enregistrés ou synthétiques.
+#
+#   python bench.py latency --cells 200 --grid-size 30 --turns 50
+#   python bench.py latency --replay states.jsonl
+#   python bench.py profile --policies logic --cells 500 --grid-size 60
+#   python bench.py scaling --cells 50 100 200 400 --grid-sizes 20 40 80
+#
+# Un fichier --replay contient un stateUpdate JSON par ligne (turn, grid, grid_size, ...).
+
+import argparse
+import cProfile
+import importlib
+import io
+import json
+import pstats
+import random
+import statistics
+import time
+
+from logic import GameLogic
+from search import SearchLogic
+
+
+def _logic_policy(grid, player_name, grid_size):
+    return GameLogic(player_name, grid_size).build_moves(grid)
+
+
+def _search_policy(grid, player_name, grid_size):
+    return SearchLogic(player_name, grid_size).build_moves(grid)
+
+
+def _module_policy(module_name):
+    # player.py importe socketio/requests : on ne le charge qu'à la demande
+    def policy(grid, player_name, grid_size):
+        return importlib.import_module(module_name).build_moves(grid, player_name, grid_size)
+    return policy
+
+
+POLICIES = {
+    'logic': _logic_policy,                    # logic.py::GameLogic
+    'backup': _module_policy('logicBackUp'),   # logicBackUp.py::build_moves
+    'player': _module_policy('player'),        # player.py::build_moves
+    'search': _search_policy,                  # search.py::SearchLogic
+}
+
+MY_PLAYER_NAME = 'p1'
+
+
+def synthetic_board(grid_size, n_cells, n_players=4, n_vitamins=None, seed=0):
+    """
+    Génère un plateau aléatoire (un occupant par case) au format de la grille du serveur.
+    Les cellules sont réparties entre p1..pN ; n_vitamins vaut n_cells // 5 par défaut.
+    """
+    rng = random.Random(seed)
+    if n_vitamins is None:
+        n_vitamins = n_cells // 5
+    total = min(n_cells + n_vitamins, grid_size * grid_size)
+    positions = set()
+    while len(positions) < total:
+        positions.add((rng.randrange(grid_size), rng.randrange(grid_size)))
+
+    grid = []
+    for i, (x, y) in enumerate(positions):
+        if i < total - n_vitamins:
+            grid.append({'x': x, 'y': y, 'weight': rng.randint(1, 12),
+                         'player': f"p{i % n_players + 1}"})
+        else:
+            grid.append({'x': x, 'y': y, 'weight': 1, 'player': 'vitamin'})
+    return grid
+
+
+def load_replay(path):
+    """
+    Lit un fichier JSON lines de stateUpdate ; retourne une liste de (grid, grid_size).
+    """
+    boards = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                state = json.loads(line)
+                boards.append((state.get('grid', []), state.get('grid_size', 10)))
+    return boards
+
+
+def synthetic_boards(grid_size, n_cells, turns, seed=0):
+    return [(synthetic_board(grid_size, n_cells, seed=seed + t), grid_size) for t in range(turns)]
+
+
+def measure_latencies(policy, boards, player_name=MY_PLAYER_NAME):
+    """
+    Joue policy sur chaque plateau ; retourne la liste des durées (secondes).
+    """
+    latencies = []
+    for grid, grid_size in boards:
+        start = time.perf_counter()
+        policy(grid, player_name, grid_size)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    """
+    Distribution des latences en millisecondes : moyenne, p50, p90, p99, max.
+    """
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        'mean': statistics.fmean(ordered) * 1000,
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def hot_spots(policy, boards, top=15, player_name=MY_PLAYER_NAME):
+    """
+    Profile policy sur tous les plateaux ; retourne le rapport pstats (tottime).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for grid, grid_size in boards:
+        policy(grid, player_name, grid_size)
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('tottime').print_stats(top)
+    return out.getvalue()
+
+
+def selected_policies(names):
+    policies = {}
+    for name in names:
+        policy = POLICIES[name]
+        try:
+            policy([], MY_PLAYER_NAME, 1)
+        except ImportError as e:
+            print(f"[{name}] ignorée : {e}")
+            continue
+        policies[name] = policy
+    return policies
+
+
+def run_latency(args, boards):
+    print(f"{'policy':<10}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}   (ms, {len(boards)} tours)")
+    for name, policy in selected_policies(args.policies).items():
+        s = summarize(measure_latencies(policy, boards))
+        print(f"{name:<10}{s['mean']:>10.2f}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+
+
+def run_profile(args, boards):
+    for name, policy in selected_policies(args.policies).items():
+        print(f"=== {name} ===")
+        print(hot_spots(policy, boards, top=args.top))
+
+
+def run_scaling(args):
+    policies = selected_policies(args.policies)
+    print(f"{'policy':<10}{'grid':>8}{'cells':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, policy in policies.items():
+        for grid_size in args.grid_sizes:
+            for n_cells in args.cells:
+                if n_cells > grid_size * grid_size:
+                    continue
+                boards = synthetic_boards(grid_size, n_cells, args.turns, seed=args.seed)
+                s = summarize(measure_latencies(policy, boards))
+                print(f"{name:<10}{grid_size:>8}{n_cells:>8}{s['p50']:>12.2f}{s['p99']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des politiques de bots")
+    parser.add_argument('mode', choices=['latency', 'profile', 'scaling'])
+    parser.add_argument('--policies', nargs='+', default=['logic', 'backup', 'player'], choices=list(POLICIES))
+    parser.add_argument('--replay', help="fichier JSON lines de stateUpdate enregistrés")
+    parser.add_argument('--grid-size', type=int, default=30)
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[20, 40, 80])
+    parser.add_argument('--cells', type=int, nargs='+', default=[200])
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.mode == 'scaling':
+        run_scaling(args)
+        return
+
+    if args.replay:
+        boards = load_replay(args.replay)
+    else:
+        boards = synthetic_boards(args.grid_size, args.cells[0], args.turns, seed=args.seed)
+
+    if args.mode == 'latency':
+        run_latency(args, boards)
+    else:
+        run_profile(args, boards)
+
+
+if __name__ == "__main__":
+    main()
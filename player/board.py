@@ -0,0 +1,84 @@
+# board.py
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+class Board:
+    """
+    Plateau décodé une seule fois à partir d'un stateUpdate, partagé par
+    toutes les politiques d'un même processus.
+    """
+
+    def __init__(self, state):
+        self.turn = state.get('turn')
+        self.grid = state.get('grid', [])
+        self.grid_size = state.get('grid_size', 10)
+        self.time_between_moves = state.get('timeBetweenMoves', 0)
+        self.players = state.get('players', [])
+
+        # Index (x, y) -> cellule et joueur -> cellules
+        self.by_position = {}
+        self.by_player = defaultdict(list)
+        for cell in self.grid:
+            self.by_position[(cell['x'], cell['y'])] = cell
+            self.by_player[cell['player']].append(cell)
+
+        # Index par ligne / colonne (construits à la demande)
+        self._rows = None
+        self._columns = None
+
+    def cell_at(self, x, y):
+        """
+        Retourne la cellule à la position (x, y) ou None si vide.
+        """
+        return self.by_position.get((x, y))
+
+    def occupied_along(self, x, y, dx, dy):
+        """
+        Parcourt les cases occupées depuis (x, y) dans la direction (dx, dy), de la plus
+        proche à la plus lointaine, en sautant les cases vides : le coût dépend du nombre
+        de cellules sur la ligne, pas de grid_size. Génère des (distance, cell).
+        """
+        if self._rows is None:
+            rows, columns = defaultdict(list), defaultdict(list)
+            for cx, cy in self.by_position:
+                rows[cy].append(cx)
+                columns[cx].append(cy)
+            for line in rows.values():
+                line.sort()
+            for line in columns.values():
+                line.sort()
+            self._rows, self._columns = rows, columns
+
+        if dy == 0:
+            line, origin = self._rows.get(y, []), x
+        else:
+            line, origin = self._columns.get(x, []), y
+        step = dx + dy
+        if step > 0:
+            others = line[bisect_right(line, origin):]
+        else:
+            others = reversed(line[:bisect_left(line, origin)])
+        for other in others:
+            distance = abs(other - origin)
+            if dy == 0:
+                yield distance, self.by_position[(other, y)]
+            else:
+                yield distance, self.by_position[(x, other)]
+
+    def cells_of(self, player):
+        """
+        Retourne les cellules d'un joueur (ou les vitamines avec player='vitamin').
+        """
+        return self.by_player.get(player, [])
+
+    def enemies_of(self, player):
+        """
+        Retourne toutes les cellules qui ne sont ni à player ni des vitamines.
+        """
+        enemies = []
+        for owner, cells in self.by_player.items():
+            if owner != player and owner != 'vitamin':
+                enemies.extend(cells)
+        return enemies
@@ -0,0 +1,176 @@
+# bot_host.py
+#
+# Héberge plusieurs bots dans un seul processus : une seule connexion Socket.IO,
+# un seul décodage du stateUpdate (Board) par tour, et un seul POST pour les moves
+# de tous les bots.
+#
+# Usage : python bot_host.py p1:logic p2:logic p3:random --workers 4
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import socketio
+import requests
+
+from board import Board
+from logic import GameLogic, deadline_from_state
+from logicBackUp import build_moves as random_build_moves
+from search import SearchLogic
+
+BASE_URL = "http://localhost:3000"
+
+
+def logic_policy(board, player_name, deadline=None):
+    """
+    Politique heuristique (GameLogic) jouée sur un Board partagé.
+    """
+    return GameLogic(player_name, board.grid_size).build_moves(board, deadline=deadline)
+
+
+def random_policy(board, player_name, deadline=None):
+    """
+    Politique aléatoire de logicBackUp ; elle n'a besoin que de mes cellules.
+    """
+    return random_build_moves(board.cells_of(player_name), player_name, board.grid_size)
+
+
+def search_policy(board, player_name, deadline=None):
+    """
+    Politique de recherche Monte Carlo (SearchLogic).
+    """
+    return SearchLogic(player_name, board.grid_size).build_moves(board, deadline=deadline)
+
+
+POLICIES = {
+    'logic': logic_policy,
+    'random': random_policy,
+    'search': search_policy,
+}
+
+
+def play_bots(board, bots, deadline=None):
+    """
+    Fait jouer une liste de bots [(player_name, policy_name), ...] sur le même Board.
+    Retourne {player_name: moves}.
+    """
+    moves_by_player = {}
+    for player_name, policy_name in bots:
+        moves_by_player[player_name] = POLICIES[policy_name](board, player_name, deadline)
+    return moves_by_player
+
+
+def _play_group(state, bots, deadline):
+    # Exécuté dans un worker : le state n'est décodé qu'une fois par groupe de bots
+    return play_bots(Board(state), bots, deadline)
+
+
+class BotHost:
+    def __init__(self, bots, base_url=BASE_URL, workers=0):
+        """
+        :param bots: liste de (player_name, policy_name)
+        :param workers: nombre de processus ; 0 => tout dans le processus courant
+        """
+        self.bots = bots
+        self.base_url = base_url
+        self.workers = workers
+        self.last_turn_played = None
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+        self.sio = socketio.Client()
+        self.sio.on('connect', self.on_connect)
+        self.sio.on('disconnect', self.on_disconnect)
+        self.sio.on('stateUpdate', self.on_state_update)
+
+    def on_connect(self):
+        print("Hôte de bots connecté au serveur Node. SID =", self.sio.sid)
+        for player_name, _ in self.bots:
+            self.sio.emit('join', {"name": player_name})
+
+    def on_disconnect(self):
+        print("Hôte de bots déconnecté")
+
+    def compute_moves(self, state):
+        """
+        Calcule les moves de tous les bots pour un stateUpdate.
+        """
+        deadline = deadline_from_state(state)
+        if self.pool is None:
+            return play_bots(Board(state), self.bots, deadline)
+
+        # Un groupe de bots par worker : le state n'est envoyé (et décodé)
+        # qu'une fois par worker, pas une fois par bot.
+        groups = [self.bots[i::self.workers] for i in range(self.workers)]
+        futures = [
+            self.pool.submit(_play_group, state, group, deadline)
+            for group in groups if group
+        ]
+        moves_by_player = {}
+        for future in futures:
+            moves_by_player.update(future.result())
+        return moves_by_player
+
+    def send_moves(self, turn, moves_by_player):
+        """
+        Envoie les moves de tous les bots en une seule requête POST /moves/batch.
+        """
+        body = {
+            "turn": turn,
+            "moves_by_player": moves_by_player
+        }
+        try:
+            resp = requests.post(f"{self.base_url}/moves/batch", json=body)
+            resp.raise_for_status()
+            print(f"=> Moves de {len(moves_by_player)} bots envoyés pour le tour {turn}, réponse: {resp.json()}")
+        except requests.RequestException as e:
+            print(f"Erreur lors de l'envoi /moves/batch: {e}")
+
+    def on_state_update(self, data):
+        turn = data.get("turn")
+        if turn == self.last_turn_played:
+            return
+
+        moves_by_player = self.compute_moves(data)
+        print(f"Tour {turn}: {sum(len(m) for m in moves_by_player.values())} moves pour {len(moves_by_player)} bots.")
+        self.send_moves(turn, moves_by_player)
+        self.last_turn_played = turn
+
+    def run(self):
+        try:
+            self.sio.connect(self.base_url, wait_timeout=10)
+            print("Connexion réussie, on attend les stateUpdate...")
+            self.sio.wait()
+        except Exception as e:
+            print(f"Impossible de se connecter à {self.base_url} : {e}")
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+
+def parse_bots(specs):
+    """
+    Transforme ["p1:logic", "p2:random", "p3"] en [("p1", "logic"), ...].
+    La politique par défaut est 'logic'.
+    """
+    bots = []
+    for spec in specs:
+        player_name, _, policy_name = spec.partition(':')
+        policy_name = policy_name or 'logic'
+        if policy_name not in POLICIES:
+            raise ValueError(f"Politique inconnue '{policy_name}' (disponibles : {', '.join(POLICIES)})")
+        bots.append((player_name, policy_name))
+    return bots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Héberge plusieurs bots sur une seule connexion")
+    parser.add_argument('bots', nargs='+', help="joueur[:politique], ex. p1:logic p2:random")
+    parser.add_argument('--url', default=BASE_URL)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="nombre de processus pour calculer les moves (0 = aucun)")
+    args = parser.parse_args()
+
+    BotHost(parse_bots(args.bots), base_url=args.url, workers=args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
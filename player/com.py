@@ -2,7 +2,7 @@
 
 import socketio
 import requests
-from logic import GameLogic  # Importer la classe GameLogic au lieu de build_moves
+from logic import GameLogic, deadline_from_state  # Importer la classe GameLogic au lieu de build_moves
 
 BASE_URL = "http://localhost:3000"
 MY_PLAYER_NAME = "p2"
@@ -42,11 +42,14 @@ def on_state_update(data):
     if turn == last_turn_played:
         return
     
+    # Échéance du tour (None si le tour attend tous les joueurs)
+    deadline = deadline_from_state(data)
+    
     # Créer une instance de GameLogic
     game_logic = GameLogic(MY_PLAYER_NAME, grid_size)
     
     # Appeler la méthode build_moves sur l'instance
-    moves_for_this_turn = game_logic.build_moves(grid)
+    moves_for_this_turn = game_logic.build_moves(grid, deadline=deadline)
     
     if not moves_for_this_turn:
         print(f"Tour {turn}: pas de cellule pour {MY_PLAYER_NAME}, aucun move.")
@@ -60,6 +63,12 @@ def on_state_update(data):
     send_moves(MY_PLAYER_NAME, turn, moves_for_this_turn)
     last_turn_played = turn
 
+@sio.on('movesRejected')
+def on_moves_rejected(data):
+    mine = [r for r in data.get("rejected", []) if r.get("player") == MY_PLAYER_NAME]
+    for r in mine:
+        print(f"Tour {data.get('turn')}: move refusé en ({r['x']}, {r['y']}) : {r['reason']}")
+
 def main():
     try:
         sio.connect(BASE_URL, wait_timeout=10)
@@ -1,12 +1,88 @@
 # logic.py
 
+import atexit
+import math
 import random
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from board import Board
+from shared_board import SharedBoard
+
+# Pools de processus réutilisés d'un tour à l'autre (les bots recréent GameLogic à chaque tour)
+_pools = {}
+# Segments SharedBoard libres, réécrits au tour suivant plutôt que recréés
+_free_boards = []
+
+
+@atexit.register
+def _close_boards():
+    while _free_boards:
+        _free_boards.pop().close()
+
+
+def _get_pool(workers):
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def _evaluate_chunk(shm_name, grid_size, players, params, cells, deadline):
+    """
+    Évalue un paquet de mes cellules dans un worker, contre le plateau partagé.
+    """
+    board = SharedBoard.attach(shm_name, grid_size, players)
+    try:
+        logic = GameLogic(params['my_player_name'], grid_size)
+        logic.interest_weights = params['interest_weights']
+        logic.enemy_near_threshold = params['enemy_near_threshold']
+
+        if deadline is None:
+            ranked = [(cell, logic.is_enemy_near_on_board(cell['x'], cell['y'], board)) for cell in cells]
+        else:
+            ranked = logic.prioritize_cells(
+                cells, deadline=deadline,
+                enemy_near=lambda x, y: logic.is_enemy_near_on_board(x, y, board)
+            )
+
+        moves = []
+        for cell, enemy_near in ranked:
+            if deadline is not None and time.monotonic() >= deadline:
+                moves.append(logic.stay_move(cell['x'], cell['y'], cell.get('weight', 1)))
+                continue
+            moves.append(logic.decide_move(cell, board, None, None, enemy_near))
+        return moves
+    finally:
+        board.close()
+
+
+def deadline_from_state(state, safety_ratio=0.8):
+    """
+    Calcule l'échéance du tour (horloge time.monotonic()) à partir du champ
+    'timeBetweenMoves' (en secondes) d'un stateUpdate.
+    On ne garde que safety_ratio du temps pour laisser le temps d'envoyer les moves.
+    Retourne None si le tour n'est pas limité dans le temps (timeBetweenMoves == 0).
+    """
+    time_between_moves = float(state.get('timeBetweenMoves') or 0)
+    if time_between_moves <= 0:
+        return None
+    return time.monotonic() + time_between_moves * safety_ratio
 
 class GameLogic:
-    def __init__(self, my_player_name, grid_size):
+    def __init__(self, my_player_name, grid_size, workers=0, chunk_size=None, min_parallel_cells=64):
+        """
+        :param workers: si > 1, mes cellules sont évaluées par paquets dans un pool de
+            workers qui lisent le plateau en mémoire partagée (voir build_moves_parallel)
+        :param chunk_size: taille des paquets (par défaut ~4 paquets par worker)
+        :param min_parallel_cells: en dessous, on reste séquentiel (le pool coûte plus cher)
+        """
         self.my_player_name = my_player_name
         self.grid_size = grid_size
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.min_parallel_cells = min_parallel_cells
         self.directions = ['move_up', 'move_down', 'move_left', 'move_right']
         self.direction_vectors = {
             'move_up': (0, -1),
@@ -23,93 +99,198 @@ class GameLogic:
         }
         self.enemy_near_threshold = 3  # Distance seuil pour considérer les ennemis comme proches
 
-    def build_moves(self, grid):
+    def build_moves(self, grid, deadline=None):
         """
         Construit une liste de moves pour ce tour en évaluant l'intérêt des directions.
+
+        :param deadline: (float, optionnel) échéance du tour sur l'horloge time.monotonic()
+            (voir deadline_from_state). Si elle est fournie, on passe en mode "anytime" :
+            les cellules sont traitées par priorité (menacées puis plus lourdes d'abord)
+            et, une fois l'échéance atteinte, les cellules restantes reçoivent le move
+            par défaut (rester sur place). Le jeu de moves renvoyé est toujours complet.
+
+        grid peut être la liste de cellules brute ou un Board déjà décodé (partagé
+        entre plusieurs bots) ; dans ce cas on réutilise ses index.
         """
         moves_for_this_turn = []
-        
+
+        if deadline is not None and not isinstance(grid, Board):
+            # Mode anytime : avec un index du plateau, chaque cellule coûte un temps
+            # borné (sur la liste brute, un seul decide_move la parcourt à chaque case)
+            grid = Board({'grid': grid, 'grid_size': self.grid_size})
+
         # Séparer les cellules par type
-        my_cells = [cell for cell in grid if cell.get('player') == self.my_player_name]
-        enemy_cells = [cell for cell in grid if cell.get('player') not in [self.my_player_name, 'vitamin']]
-        vitamins = [cell for cell in grid if cell.get('player') == 'vitamin']
+        if isinstance(grid, Board):
+            my_cells = grid.cells_of(self.my_player_name)
+            enemy_cells = grid.enemies_of(self.my_player_name)
+            vitamins = grid.cells_of('vitamin')
+        else:
+            my_cells = [cell for cell in grid if cell.get('player') == self.my_player_name]
+            enemy_cells = [cell for cell in grid if cell.get('player') not in [self.my_player_name, 'vitamin']]
+            vitamins = [cell for cell in grid if cell.get('player') == 'vitamin']
         
         if not my_cells:
             return []
-        
-        for cell in my_cells:
-            x, y, weight = cell.get('x'), cell.get('y'), cell.get('weight', 1)
-            
-            # Obtenir les directions valides pour cette cellule
-            valid_directions = self.get_valid_directions(x, y)
-            
-            if not valid_directions:
-                # Aucune direction valide, rester sur place
-                move = {
-                    "x": x,
-                    "y": y,
-                    "player": self.my_player_name,
-                    "move_up": 0,
-                    "move_down": 0,
-                    "move_left": 0,
-                    "move_right": 0,
-                    "move_stay": weight
-                }
-                moves_for_this_turn.append(move)
+
+        if self.workers > 1 and len(my_cells) >= self.min_parallel_cells:
+            return self.build_moves_parallel(grid, my_cells, deadline)
+
+        if deadline is None:
+            for cell in my_cells:
+                moves_for_this_turn.append(self.decide_move(cell, grid, enemy_cells, vitamins))
+            return moves_for_this_turn
+
+        # Mode anytime : les cellules importantes d'abord
+        ranked = self.prioritize_cells(
+            my_cells, deadline=deadline,
+            enemy_near=lambda x, y: self.is_enemy_near_on_board(x, y, grid)
+        )
+        for cell, enemy_near in ranked:
+            if time.monotonic() >= deadline:
+                # Plus de temps : move par défaut, toujours valide
+                moves_for_this_turn.append(
+                    self.stay_move(cell.get('x'), cell.get('y'), cell.get('weight', 1))
+                )
                 continue
+            moves_for_this_turn.append(
+                self.decide_move(cell, grid, enemy_cells, vitamins, enemy_near)
+            )
+
+        return moves_for_this_turn
+
+    def build_moves_parallel(self, grid, my_cells, deadline=None):
+        """
+        Découpe mes cellules en paquets évalués en parallèle. La grille est écrite une
+        seule fois dans un SharedBoard (segment réutilisé d'un tour à l'autre, de taille
+        proportionnelle au nombre de cellules) : les workers la lisent sans en recevoir
+        de copie. Avec une échéance, les paquets les plus lourds sont soumis en premier.
+        """
+        cells = grid.grid if isinstance(grid, Board) else grid
+        reuse = _free_boards.pop() if _free_boards else None
+        board = SharedBoard.create(cells, self.grid_size, reuse)
+        try:
+            if deadline is not None:
+                my_cells = sorted(my_cells, key=lambda c: c.get('weight', 1), reverse=True)
+            chunk_size = self.chunk_size or math.ceil(len(my_cells) / (self.workers * 4))
+            params = {
+                'my_player_name': self.my_player_name,
+                'interest_weights': self.interest_weights,
+                'enemy_near_threshold': self.enemy_near_threshold
+            }
+            pool = _get_pool(self.workers)
+            futures = []
+            try:
+                for i in range(0, len(my_cells), chunk_size):
+                    futures.append(pool.submit(_evaluate_chunk, board.name, self.grid_size,
+                                               board.players, params,
+                                               my_cells[i:i + chunk_size], deadline))
+                moves_for_this_turn = []
+                for future in futures:
+                    moves_for_this_turn.extend(future.result())
+                return moves_for_this_turn
+            finally:
+                # Si un paquet a échoué, les autres workers lisent peut-être encore le
+                # plateau : il ne redevient libre qu'une fois tous les paquets terminés
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+        finally:
+            _free_boards.append(board)
+
+    def prioritize_cells(self, my_cells, enemy_cells=(), deadline=None, enemy_near=None):
+        """
+        Trie mes cellules par priorité de traitement : d'abord celles qui ont un ennemi
+        proche, puis les plus lourdes. Retourne une liste de (cell, enemy_near).
+
+        La proximité se lit dans l'ensemble des cases ennemies (voir
+        is_enemy_near_squares), ou par la fonction enemy_near(x, y) si elle est donnée :
+        un coût borné par cellule, quel que soit le nombre d'ennemis. Si l'échéance
+        tombe pendant ce tri, les cellules restantes sont classées sans ce test
+        (enemy_near=False) : elles recevront de toute façon le move par défaut.
+        """
+        if enemy_near is None:
+            enemy_squares = {(enemy['x'], enemy['y']) for enemy in enemy_cells}
+            enemy_near = lambda x, y: self.is_enemy_near_squares(x, y, enemy_squares)
+        ranked = []
+        for i, cell in enumerate(my_cells):
+            if deadline is not None and time.monotonic() >= deadline:
+                ranked.extend((rest, False) for rest in my_cells[i:])
+                break
+            ranked.append((cell, enemy_near(cell.get('x'), cell.get('y'))))
+        ranked.sort(key=lambda item: (item[1], item[0].get('weight', 1)), reverse=True)
+        return ranked
+
+    def decide_move(self, cell, grid, enemy_cells, vitamins, enemy_near=None):
+        """
+        Calcule le move d'une cellule en évaluant l'intérêt de chaque direction valide.
+        """
+        x, y, weight = cell.get('x'), cell.get('y'), cell.get('weight', 1)
+        
+        # Obtenir les directions valides pour cette cellule
+        valid_directions = self.get_valid_directions(x, y)
+        
+        if not valid_directions:
+            # Aucune direction valide, rester sur place
+            return self.stay_move(x, y, weight)
+        
+        # Évaluer l'intérêt de chaque direction valide
+        interests = {direction: self.evaluate_interest(x, y, direction, grid, enemy_cells, vitamins) 
+                     for direction in valid_directions}
+        
+        # Décider s'il faut se séparer ou rester ensemble
+        if enemy_near is None:
+            enemy_near = self.is_enemy_near(x, y, enemy_cells)
+        if enemy_near:
+            # Préfère rester ensemble
+            split = False
+        else:
+            # Préfère se séparer
+            split = True
+        
+        if split and weight >= len(valid_directions):
+            # Choisir autant de directions que possible avec le plus d'intérêt
+            sorted_directions = sorted(interests.items(), key=lambda item: item[1], reverse=True)
+            top_directions = [dir for dir, val in sorted_directions if val > 0]
             
-            # Évaluer l'intérêt de chaque direction valide
-            interests = {direction: self.evaluate_interest(x, y, direction, grid, enemy_cells, vitamins) 
-                         for direction in valid_directions}
-            
-            # Décider s'il faut se séparer ou rester ensemble
-            if self.is_enemy_near(x, y, enemy_cells):
-                # Préfère rester ensemble
-                split = False
-            else:
-                # Préfère se séparer
-                split = True
-            
-            if split and weight >= len(valid_directions):
-                # Choisir autant de directions que possible avec le plus d'intérêt
-                sorted_directions = sorted(interests.items(), key=lambda item: item[1], reverse=True)
-                top_directions = [dir for dir, val in sorted_directions if val > 0]
-                
-                # Limiter le nombre de directions au poids disponible
-                max_split = min(weight, len(top_directions))
-                if max_split == 0:
-                    # Si aucune direction n'a un intérêt positif, rester sur place
-                    move = {
-                        "x": x,
-                        "y": y,
-                        "player": self.my_player_name,
-                        "move_up": 0,
-                        "move_down": 0,
-                        "move_left": 0,
-                        "move_right": 0,
-                        "move_stay": weight
-                    }
-                else:
-                    selected_directions = top_directions[:max_split]
-                    move = self.create_move(x, y, selected_directions, weight)
+            # Limiter le nombre de directions au poids disponible
+            max_split = min(weight, len(top_directions))
+            if max_split == 0:
+                # Si aucune direction n'a un intérêt positif, rester sur place
+                move = self.stay_move(x, y, weight)
             else:
-                # Choisir la direction avec le plus d'intérêt
-                best_direction = max(interests, key=interests.get)
-                move = {
-                    "x": x,
-                    "y": y,
-                    "player": self.my_player_name,
-                    "move_up": 0,
-                    "move_down": 0,
-                    "move_left": 0,
-                    "move_right": 0,
-                    "move_stay": 0
-                }
-                move[best_direction] = weight
-            
-            moves_for_this_turn.append(move)
+                selected_directions = top_directions[:max_split]
+                move = self.create_move(x, y, selected_directions, weight)
+        else:
+            # Choisir la direction avec le plus d'intérêt
+            best_direction = max(interests, key=interests.get)
+            move = {
+                "x": x,
+                "y": y,
+                "player": self.my_player_name,
+                "move_up": 0,
+                "move_down": 0,
+                "move_left": 0,
+                "move_right": 0,
+                "move_stay": 0
+            }
+            move[best_direction] = weight
         
-        return moves_for_this_turn
+        return move
+
+    def stay_move(self, x, y, weight):
+        """
+        Move par défaut : toute la cellule reste sur place.
+        """
+        return {
+            "x": x,
+            "y": y,
+            "player": self.my_player_name,
+            "move_up": 0,
+            "move_down": 0,
+            "move_left": 0,
+            "move_right": 0,
+            "move_stay": weight
+        }
 
     def get_valid_directions(self, x, y):
         """
@@ -130,15 +311,7 @@ class GameLogic:
         interest = 0
         enemies_near = False
         
-        for distance in range(1, self.grid_size):
-            nx, ny = x + dx * distance, y + dy * distance
-            if not (0 <= nx < self.grid_size and 0 <= ny < self.grid_size):
-                break  # Sortie de la grille
-            
-            cell = self.get_cell(nx, ny, grid)
-            if not cell:
-                continue  # Cellule vide
-            
+        for distance, cell in self.cells_along(x, y, dx, dy, grid):
             if cell['player'] == 'vitamin':
                 # Les vitamines augmentent l'intérêt
                 interest += self.interest_weights['vitamin'] / distance
@@ -160,6 +333,24 @@ class GameLogic:
 
         return interest
 
+    def cells_along(self, x, y, dx, dy, grid):
+        """
+        Génère les (distance, cell) occupées dans une direction jusqu'au bord.
+        Avec un Board ou un SharedBoard, on saute directement les cases vides (plateaux
+        très grands).
+        """
+        if isinstance(grid, (Board, SharedBoard)):
+            yield from grid.occupied_along(x, y, dx, dy)
+            return
+        for distance in range(1, self.grid_size):
+            nx, ny = x + dx * distance, y + dy * distance
+            if not (0 <= nx < self.grid_size and 0 <= ny < self.grid_size):
+                break  # Sortie de la grille
+            
+            cell = self.get_cell(nx, ny, grid)
+            if cell:
+                yield distance, cell
+
     def is_enemy_near(self, x, y, enemy_cells):
         """
         Vérifie si des ennemis sont proches de la cellule (distance <= threshold).
@@ -170,10 +361,41 @@ class GameLogic:
                 return True
         return False
 
+    def is_enemy_near_on_board(self, x, y, board):
+        """
+        Comme is_enemy_near, mais en parcourant les cases à distance <= threshold
+        d'un plateau indexé (Board ou SharedBoard) plutôt que la liste des ennemis.
+        """
+        for nx, ny in self.squares_near(x, y):
+            cell = board.cell_at(nx, ny)
+            if cell and cell['player'] not in (self.my_player_name, 'vitamin'):
+                return True
+        return False
+
+    def is_enemy_near_squares(self, x, y, enemy_squares):
+        """
+        Comme is_enemy_near, avec l'ensemble des cases (x, y) ennemies.
+        """
+        return any(square in enemy_squares for square in self.squares_near(x, y))
+
+    def squares_near(self, x, y):
+        """
+        Cases du plateau à distance (Manhattan) <= enemy_near_threshold de (x, y).
+        """
+        t = self.enemy_near_threshold
+        for dx in range(-t, t + 1):
+            reach = t - abs(dx)
+            for dy in range(-reach, reach + 1):
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.grid_size and 0 <= ny < self.grid_size:
+                    yield nx, ny
+
     def get_cell(self, x, y, grid):
         """
         Retourne la cellule à la position (x, y) ou None si vide.
         """
+        if isinstance(grid, (Board, SharedBoard)):
+            return grid.cell_at(x, y)
         for cell in grid:
             if cell['x'] == x and cell['y'] == y:
                 return cell
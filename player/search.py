@@ -0,0 +1,143 @@
+# search.py
+#
+# Bot de recherche : au lieu d'un seul coup glouton, on évalue plusieurs plans
+# candidats pour l'ensemble de mes cellules par simulations Monte Carlo
+# (modèle de prédiction : simulator.py), avec une sélection UCB1 entre candidats.
+
+import math
+import random
+import time
+
+from board import Board
+from logic import GameLogic
+from simulator import (
+    DIRECTION_VECTORS, state_from_grid, step, random_splits,
+    split_from_move, move_from_split, total_weight
+)
+
+
+class SearchLogic:
+    def __init__(self, my_player_name, grid_size, depth=3, n_candidates=8,
+                 max_simulations=2000, exploration=1.4, rng=None):
+        """
+        :param depth: nombre de tours simulés par rollout
+        :param n_candidates: nombre de plans évalués (glouton, immobile, variantes aléatoires)
+        :param max_simulations: budget de simulations (tours simulés) par décision
+        :param exploration: constante UCB1
+        """
+        self.my_player_name = my_player_name
+        self.grid_size = grid_size
+        self.depth = depth
+        self.n_candidates = n_candidates
+        self.max_simulations = max_simulations
+        self.exploration = exploration
+        self.rng = rng or random.Random()
+        self.greedy = GameLogic(my_player_name, grid_size)
+        # Statistiques de la dernière décision : simulations, durée, débit
+        self.last_stats = {}
+
+    def build_moves(self, grid, deadline=None):
+        """
+        Construit une liste de moves pour ce tour.
+
+        La recherche s'arrête au premier des deux budgets atteint :
+        max_simulations tours simulés, ou l'échéance deadline (time.monotonic()).
+        """
+        cells = grid.grid if isinstance(grid, Board) else grid
+        state = state_from_grid(cells)
+        my_positions = [pos for pos, (p, _) in state.items() if p == self.my_player_name]
+        if not my_positions:
+            return []
+
+        # Le nombre de vitamines cible n'est pas dans le state : on garde celui du plateau
+        number_of_vitamins = sum(w for p, w in state.values() if p == 'vitamin')
+
+        candidates = self.candidate_plans(grid, state, my_positions)
+        visits = [0] * len(candidates)
+        scores = [0.0] * len(candidates)
+
+        start = time.monotonic()
+        simulations = 0
+        rollouts = 0
+        while simulations + self.depth <= self.max_simulations:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            index = self.select(visits, scores, rollouts)
+            scores[index] += self.rollout(state, candidates[index], number_of_vitamins)
+            visits[index] += 1
+            simulations += self.depth
+            rollouts += 1
+
+        elapsed = time.monotonic() - start
+        self.last_stats = {
+            'simulations': simulations,
+            'rollouts': rollouts,
+            'elapsed': elapsed,
+            'simulations_per_second': simulations / elapsed if elapsed > 0 else 0.0
+        }
+
+        best = max(
+            range(len(candidates)),
+            key=lambda i: scores[i] / visits[i] if visits[i] else float('-inf')
+        )
+        return [
+            move_from_split(x, y, self.my_player_name, split)
+            for (x, y), split in candidates[best].items()
+        ]
+
+    def candidate_plans(self, grid, state, my_positions):
+        """
+        Plans candidats {(x, y): split} pour toutes mes cellules : le plan glouton
+        de GameLogic, le plan immobile, puis des variantes du plan glouton où une
+        partie des cellules part dans une direction aléatoire.
+        """
+        greedy = {
+            (m['x'], m['y']): split_from_move(m)
+            for m in self.greedy.build_moves(grid)
+        }
+        stay = {pos: (0, 0, 0, 0, state[pos][1]) for pos in my_positions}
+        candidates = [greedy, stay]
+
+        last = self.grid_size - 1
+        while len(candidates) < self.n_candidates:
+            plan = dict(greedy)
+            for (x, y) in my_positions:
+                if self.rng.random() < 0.3:
+                    choice = self.rng.randrange(5)
+                    dx, dy = DIRECTION_VECTORS[choice]
+                    if 0 <= x + dx <= last and 0 <= y + dy <= last:
+                        split = [0, 0, 0, 0, 0]
+                        split[choice] = state[(x, y)][1]
+                        plan[(x, y)] = tuple(split)
+            candidates.append(plan)
+        return candidates
+
+    def select(self, visits, scores, rollouts):
+        """
+        Sélection UCB1 : chaque candidat est d'abord essayé une fois.
+        """
+        for i, n in enumerate(visits):
+            if n == 0:
+                return i
+        log_total = math.log(rollouts)
+        return max(
+            range(len(visits)),
+            key=lambda i: scores[i] / visits[i] + self.exploration * math.sqrt(log_total / visits[i])
+        )
+
+    def rollout(self, state, plan, number_of_vitamins):
+        """
+        Joue plan au premier tour (adversaires aléatoires), puis depth-1 tours
+        aléatoires pour tous. Retourne mon poids final relatif à mon poids initial.
+        """
+        rng = self.rng
+        initial = total_weight(state, self.my_player_name)
+
+        splits = random_splits(state, None, self.grid_size, rng)
+        splits.update(plan)
+        current = step(state, splits, self.grid_size, number_of_vitamins, rng)
+        for _ in range(self.depth - 1):
+            splits = random_splits(current, None, self.grid_size, rng)
+            current = step(current, splits, self.grid_size, number_of_vitamins, rng)
+
+        return total_weight(current, self.my_player_name) / max(1, initial)
@@ -0,0 +1,150 @@
+# shared_board.py
+#
+# Plateau en lecture seule placé en mémoire partagée, pour que plusieurs processus
+# évaluent des cellules sans recevoir chacun une copie de la grille.
+#
+# Disposition creuse, proportionnelle au nombre de cellules (pas à grid_size ** 2) :
+#   en-tête     : n_cells, capacity (int64)
+#   keys        : y * grid_size + x de chaque cellule, triées (int64)
+#   col_keys    : x * grid_size + y, triées (int64)
+#   owners      : propriétaire de la cellule keys[i] (1 = vitamine, 2 + i = players[i])
+#   weights     : poids de la cellule keys[i] (int32)
+#   col_index   : col_index[j] = i de la cellule col_keys[j] (int32)
+# Une cellule se retrouve par bisection ; une ligne (ou une colonne) occupe une plage
+# contiguë de keys (de col_keys), ce qui donne occupied_along comme Board.
+#
+# Le segment est réutilisable d'un tour à l'autre (create(..., reuse=board)) tant
+# que sa capacité suffit.
+
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from multiprocessing import shared_memory
+
+EMPTY = 0
+VITAMIN = 1
+HEADER = struct.Struct('<qq')
+BYTES_PER_CELL = 8 + 8 + 4 + 4 + 4
+MIN_CAPACITY = 1024
+
+
+class SharedBoard:
+    def __init__(self, shm, grid_size, players, owner=False):
+        self.shm = shm
+        self.grid_size = grid_size
+        self.players = players
+        self.owner = owner
+        self._views = []
+        self._map()
+
+    def _map(self):
+        # Vues typées sur les n_cells premières entrées de chaque tableau
+        self._release_views()
+        buf = self.shm.buf
+        self.count, self.capacity = HEADER.unpack_from(buf, 0)
+        offset = HEADER.size
+        arrays = []
+        for fmt, size in (('q', 8), ('q', 8), ('i', 4), ('i', 4), ('i', 4)):
+            raw = buf[offset:offset + self.capacity * size]
+            typed = raw.cast(fmt)
+            view = typed[:self.count]
+            self._views.extend((raw, typed, view))
+            arrays.append(view)
+            offset += self.capacity * size
+        self.keys, self.col_keys, self.owners, self.weights, self.col_index = arrays
+
+    def _release_views(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+
+    @classmethod
+    def create(cls, grid, grid_size, reuse=None):
+        """
+        Écrit la grille (liste de dict) dans un segment partagé : celui de reuse (un
+        SharedBoard créé ici) s'il est assez grand, sinon un nouveau (reuse est alors
+        libéré). Retourne le SharedBoard.
+        """
+        players = sorted({c['player'] for c in grid if c['player'] != 'vitamin'})
+        codes = {p: i + 2 for i, p in enumerate(players)}
+        codes['vitamin'] = VITAMIN
+        n = len(grid)
+
+        if reuse is not None and reuse.capacity >= n:
+            board = reuse
+            board.grid_size = grid_size
+            board.players = players
+        else:
+            if reuse is not None:
+                reuse.close()
+            capacity = max(MIN_CAPACITY, 2 * n)
+            shm = shared_memory.SharedMemory(create=True, size=HEADER.size + capacity * BYTES_PER_CELL)
+            HEADER.pack_into(shm.buf, 0, 0, capacity)
+            board = cls(shm, grid_size, players, owner=True)
+
+        cells = sorted(grid, key=lambda c: (c['y'], c['x']))
+        order = sorted(range(n), key=lambda i: (cells[i]['x'], cells[i]['y']))
+        HEADER.pack_into(board.shm.buf, 0, n, board.capacity)
+        board._map()
+        board.keys[:] = array('q', [c['y'] * grid_size + c['x'] for c in cells])
+        board.owners[:] = array('i', [codes[c['player']] for c in cells])
+        board.weights[:] = array('i', [c['weight'] for c in cells])
+        board.col_keys[:] = array('q', [cells[i]['x'] * grid_size + cells[i]['y'] for i in order])
+        board.col_index[:] = array('i', order)
+        return board
+
+    @classmethod
+    def attach(cls, name, grid_size, players):
+        """
+        Ouvre un segment existant (dans un worker), sans copie de la grille.
+        """
+        return cls(shared_memory.SharedMemory(name=name), grid_size, players)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _cell(self, i):
+        key = self.keys[i]
+        code = self.owners[i]
+        player = 'vitamin' if code == VITAMIN else self.players[code - 2]
+        return {'x': key % self.grid_size, 'y': key // self.grid_size,
+                'weight': self.weights[i], 'player': player}
+
+    def cell_at(self, x, y):
+        """
+        Retourne la cellule à la position (x, y) ou None si vide.
+        """
+        key = y * self.grid_size + x
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return self._cell(i)
+        return None
+
+    def occupied_along(self, x, y, dx, dy):
+        """
+        Comme Board.occupied_along : les (distance, cell) occupées depuis (x, y) dans
+        la direction (dx, dy), de la plus proche à la plus lointaine.
+        """
+        size = self.grid_size
+        if dy == 0:
+            keys, origin, line = self.keys, y * size + x, y
+        else:
+            keys, origin, line = self.col_keys, x * size + y, x
+        first, last = line * size, (line + 1) * size
+        if dx + dy > 0:
+            indices = range(bisect_right(keys, origin), bisect_left(keys, last))
+        else:
+            indices = range(bisect_left(keys, origin) - 1, bisect_left(keys, first) - 1, -1)
+        for j in indices:
+            i = j if dy == 0 else self.col_index[j]
+            yield abs(keys[j] - origin), self._cell(i)
+
+    def close(self):
+        """
+        Libère les vues ; le créateur supprime aussi le segment.
+        """
+        self._release_views()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
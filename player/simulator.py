@@ -0,0 +1,259 @@
+# simulator.py
+#
+# Copie rapide des règles de compute_game_turn (server/compute.py), utilisée comme
+# modèle de prédiction par les bots de recherche. Ce n'est pas une approximation :
+# mêmes fusions (croisements par passes, destinations), mêmes tirages pour les égalités
+# et les vitamines, donc même tour que le serveur à graines égales ; seule l'animation
+# n'est pas construite. Le fichier reste autonome (un bot n'a pas server/ sous la main) :
+# toute modification des règles de compute.py doit être reportée ici, engine_check.py
+# (candidat `simulator`) le vérifie.
+#
+# L'état est un dict (x, y) -> (player, weight) : un seul occupant par case, ce que
+# garantit le moteur après chaque tour. Les valeurs sont des tuples immuables, donc
+# cloner un état revient à un simple dict(state), sans deepcopy de listes de dicts.
+
+import random
+
+# Comme world.DENSE_AREA_LIMIT : au-delà, les vitamines sont placées par tirage par rejet
+DENSE_AREA_LIMIT = 250_000
+
+# Ordre des composantes d'un move : (up, down, left, right, stay)
+DIRECTION_VECTORS = ((0, -1), (0, 1), (-1, 0), (1, 0), (0, 0))
+MOVE_KEYS = ('move_up', 'move_down', 'move_left', 'move_right', 'move_stay')
+
+
+def state_from_grid(grid):
+    """
+    Convertit une grille (liste de dict) en état {(x, y): (player, weight)}.
+    """
+    return {(c['x'], c['y']): (c['player'], c['weight']) for c in grid}
+
+
+def grid_from_state(state):
+    """
+    Convertit un état en grille (liste de dict), même format que new_grid.
+    """
+    return [
+        {'x': x, 'y': y, 'weight': w, 'player': p}
+        for (x, y), (p, w) in state.items()
+    ]
+
+
+def split_from_move(move):
+    """
+    Convertit un move dict ('move_up', ...) en tuple (up, down, left, right, stay).
+    """
+    return tuple(move.get(k, 0) for k in MOVE_KEYS)
+
+
+def move_from_split(x, y, player, split):
+    """
+    Convertit un tuple (up, down, left, right, stay) en move dict pour le serveur.
+    """
+    move = {'x': x, 'y': y, 'player': player}
+    for key, w in zip(MOVE_KEYS, split):
+        move[key] = w
+    return move
+
+
+def _tie_draw(rng, tie_seed):
+    # Générateur des égalités d'un endroit, comme tie_rngs de compute.py : sans
+    # tie_seed, rng partout ; sinon un Random(f"{tie_seed}:{endroit}") par endroit
+    # (case, ou les deux origines d'un croisement), créé au premier usage
+    if tie_seed is None:
+        return lambda *place: rng
+    rngs = {}
+
+    def rng_at(*place):
+        tie_rng = rngs.get(place)
+        if tie_rng is None:
+            tie_rng = rngs[place] = random.Random(f"{tie_seed}:{place}")
+        return tie_rng
+
+    return rng_at
+
+
+def _merge_group(weights, tie_rng):
+    # weights : liste de (player, weight) déjà sommés par joueur, dans l'ordre d'arrivée ;
+    # mêmes règles et mêmes tirages que STEP 4 de compute_game_turn (le plus lourd gagne,
+    # la vitamine perd les égalités)
+    merges = list(weights)
+    while len(merges) > 1:
+        merges.sort(key=lambda m: m[1], reverse=True)
+        top1, top2 = merges[0], merges[1]
+        if top1[1] > top2[1]:
+            merges[0] = (top1[0], top1[1] + top2[1])
+            merges.pop(1)
+        elif top1[1] < top2[1]:
+            merges[1] = (top2[0], top2[1] + top1[1])
+            merges.pop(0)
+        else:
+            p1, p2 = top1[0], top2[0]
+            if p1 == 'vitamin' and p2 != 'vitamin':
+                winner = top2
+            elif p2 == 'vitamin' and p1 != 'vitamin':
+                winner = top1
+            else:
+                winner = tie_rng.choice([top1, top2])
+            loser = top2 if winner == top1 else top1
+            del merges[:2]
+            merges.append((winner[0], winner[1] + loser[1]))
+    return merges[0]
+
+
+def _free_positions(grid_size, state, count, rng):
+    # Mêmes tirages que world.pick_free_positions (plateaux jusqu'à DENSE_AREA_LIMIT :
+    # toutes les cases libres, mélangées ; au-delà, tirage par rejet)
+    area = grid_size * grid_size
+    if area > DENSE_AREA_LIMIT and area - len(state) > 2 * count:
+        chosen = []
+        seen = set()
+        while len(chosen) < count:
+            pos = (rng.randrange(grid_size), rng.randrange(grid_size))
+            if pos in state or pos in seen:
+                continue
+            seen.add(pos)
+            chosen.append(pos)
+        return chosen
+    free_positions = [
+        (x, y) for x in range(grid_size) for y in range(grid_size)
+        if (x, y) not in state
+    ]
+    rng.shuffle(free_positions)
+    return free_positions[:count]
+
+
+def step(state, splits, grid_size, number_of_vitamins, rng=random, tie_seed=None):
+    """
+    Simule un tour complet, avec le résultat de compute_game_turn : à état, moves
+    (valides) et tirages égaux, même nouvel état. engine_check.py le vérifie
+    (candidat `simulator`, voir test_engine_check.py).
+
+    :param state: dict (x, y) -> (player, weight), non modifié
+    :param splits: dict (x, y) -> (up, down, left, right, stay) pour les cellules qui bougent,
+        dans l'ordre où les moves auraient été envoyés ; un split invalide (mauvaise
+        somme, poids négatif, sortie de grille, case vide) laisse la cellule sur place
+    :param rng: générateur des égalités (sans tie_seed) et de la réapparition des
+        vitamines, comme le module `random` pour compute_game_turn sans tie_seed ni rng
+    :param tie_seed: (optionnel) égalités tirées comme compute_game_turn(tie_seed=...)
+    :return: nouvel état (dict)
+    """
+    rng_at = _tie_draw(rng, tie_seed)
+
+    # STEP 1 : sous-cellules (ox, oy, x, y, player, weight), dans l'ordre des moves
+    # puis des cellules restées sur place, comme compute_game_turn : l'ordre décide
+    # des paires de croisements et de l'ordre des égalités
+    subs = []
+    moved = set()
+    for pos, split in splits.items():
+        occupant = state.get(pos)
+        if occupant is None or sum(split) != occupant[1] or min(split) < 0:
+            continue
+        ox, oy = pos
+        in_bounds = True
+        for (dx, dy), w in zip(DIRECTION_VECTORS, split):
+            if w > 0 and not (0 <= ox + dx < grid_size and 0 <= oy + dy < grid_size):
+                in_bounds = False
+                break
+        if not in_bounds:
+            continue
+        moved.add(pos)
+        for (dx, dy), w in zip(DIRECTION_VECTORS, split):
+            if w > 0:
+                subs.append((ox, oy, ox + dx, oy + dy, occupant[0], w))
+
+    # STEP 2 : les cellules sans move valide restent sur place
+    for (ox, oy), (player, weight) in state.items():
+        if (ox, oy) not in moved:
+            subs.append((ox, oy, ox, oy, player, weight))
+
+    # STEP 3 : croisements à mi-chemin, par passes jusqu'à ce qu'il n'y en ait plus :
+    # chaque sous-cellule i est appariée à la première j > i encore libre qui fait le
+    # chemin inverse, et la fusion (à l'origine de j) s'ajoute en fin de liste, toujours
+    # en chemin, pour la passe suivante
+    while True:
+        by_path = {}
+        for i, (ox, oy, x, y, _, _) in enumerate(subs):
+            if ox != x or oy != y:
+                by_path.setdefault((ox, oy, x, y), []).append(i)
+        if not by_path:
+            break
+        removed = set()
+        for i in range(len(subs)):
+            ox, oy, x, y, p, w = subs[i]
+            if i in removed or (ox == x and oy == y):
+                continue
+            for j in by_path.get((x, y, ox, oy), ()):
+                if j <= i or j in removed:
+                    continue
+                bp, bw = subs[j][4], subs[j][5]
+                if p == bp or w > bw:
+                    winner = p
+                elif bw > w:
+                    winner = bp
+                else:
+                    path = sorted(((ox, oy), (x, y)))
+                    winner = rng_at(*path[0], *path[1]).choice([p, bp])
+                removed.add(i)
+                removed.add(j)
+                subs.append((ox, oy, x, y, winner, w + bw))
+                break
+        if not removed:
+            break
+        subs = [s for i, s in enumerate(subs) if i not in removed]
+
+    # STEP 4 : fusions sur les destinations (poids par joueur dans l'ordre d'arrivée)
+    by_destination = {}
+    for _, _, x, y, p, w in subs:
+        totals = by_destination.get((x, y))
+        if totals is None:
+            by_destination[(x, y)] = {p: w}
+        else:
+            totals[p] = totals.get(p, 0) + w
+
+    new_state = {}
+    vitamins = 0
+    for pos, totals in by_destination.items():
+        if len(totals) == 1:
+            occupant = next(iter(totals.items()))
+        else:
+            occupant = _merge_group(totals.items(), rng_at(*pos))
+        new_state[pos] = occupant
+        if occupant[0] == 'vitamin':
+            vitamins += occupant[1]
+
+    # STEP 6 : réapparition des vitamines
+    missing = number_of_vitamins - vitamins
+    if missing > 0:
+        for pos in _free_positions(grid_size, new_state, missing, rng):
+            new_state[pos] = ('vitamin', 1)
+
+    return new_state
+
+
+def random_splits(state, player, grid_size, rng=random):
+    """
+    Politique de rollout très bon marché : chaque cellule de player part
+    entière dans une direction valide tirée au hasard (ou reste sur place).
+    Si player est None, on joue pour tous les joueurs (hors vitamines).
+    """
+    splits = {}
+    last = grid_size - 1
+    for (x, y), (p, w) in state.items():
+        if p == 'vitamin' or (player is not None and p != player):
+            continue
+        choice = rng.randrange(5)
+        dx, dy = DIRECTION_VECTORS[choice]
+        if not (0 <= x + dx <= last and 0 <= y + dy <= last):
+            choice = 4
+        split = [0, 0, 0, 0, 0]
+        split[choice] = w
+        splits[(x, y)] = tuple(split)
+    return splits
+
+
+def total_weight(state, player):
+    """
+    Poids total des cellules de player.
+    """
+    return sum(w for p, w in state.values() if p == player)
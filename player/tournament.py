@@ -0,0 +1,305 @@
+# tournament.py
+#
+# Fait s'affronter des politiques de bots sans serveur Node ni processus de bots :
+# chaque match tourne dans un GameManager local, les matchs sont répartis dans un
+# pool de processus, et on agrège taux de victoire, poids finaux et débit.
+#
+#   python tournament.py logic random search --games 20 --workers 8
+#   python tournament.py base=logic "greedy=logic:vitamin=25,enemy_smaller=15" --format swiss --rounds 5
+#   python tournament.py logic mybots.policies.aggressive --grid-size 30 --max-turns 300
+#
+# Un participant s'écrit [label=]politique[:clé=valeur,...] :
+#   - logic  : GameLogic ; les paramètres remplacent des entrées de interest_weights
+#              (ou enemy_near_threshold)
+#   - random : logicBackUp.build_moves
+#   - search : SearchLogic(**paramètres)
+#   - module.fonction : politique personnalisée, appelée fonction(board, player_name, params)
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server'))
+
+from game_manager import GameManager  # noqa: E402
+
+from board import Board  # noqa: E402
+from logic import GameLogic  # noqa: E402
+from logicBackUp import build_moves as random_build_moves  # noqa: E402
+from search import SearchLogic  # noqa: E402
+
+
+def logic_policy(board, player_name, params):
+    logic = GameLogic(player_name, board.grid_size)
+    for key, value in params.items():
+        if key == 'enemy_near_threshold':
+            logic.enemy_near_threshold = value
+        elif key in logic.interest_weights:
+            logic.interest_weights[key] = value
+        else:
+            raise ValueError(f"Paramètre inconnu pour logic : '{key}'")
+    return logic.build_moves(board)
+
+
+def random_policy(board, player_name, params):
+    return random_build_moves(board.cells_of(player_name), player_name, board.grid_size)
+
+
+def search_policy(board, player_name, params):
+    # Graine tirée du `random` du match : la recherche reste reproductible depuis `seed`
+    rng = random.Random(random.getrandbits(64))
+    return SearchLogic(player_name, board.grid_size, rng=rng, **params).build_moves(board)
+
+
+POLICIES = {
+    'logic': logic_policy,
+    'random': random_policy,
+    'search': search_policy,
+}
+
+
+def resolve_policy(policy_name):
+    """
+    Retourne la fonction d'une politique : nom connu ou chemin module.fonction.
+    """
+    if policy_name in POLICIES:
+        return POLICIES[policy_name]
+    module_name, _, function_name = policy_name.rpartition('.')
+    if not module_name:
+        raise ValueError(f"Politique inconnue '{policy_name}' (disponibles : {', '.join(POLICIES)}, ou module.fonction)")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def parse_entrant(spec):
+    """
+    '[label=]politique[:clé=valeur,...]' -> (label, politique, params).
+    Les valeurs sont lues en JSON quand c'est possible (nombres), sinon gardées en texte.
+    """
+    label, sep, rest = spec.partition('=')
+    if not sep or ':' in label:
+        label, rest = None, spec
+    policy_name, _, raw_params = rest.partition(':')
+    params = {}
+    for item in filter(None, raw_params.split(',')):
+        key, _, value = item.partition('=')
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    resolve_policy(policy_name)
+    return (label or spec, policy_name, params)
+
+
+def play_match(entrants, grid_size, start_weight, number_of_vitamins, max_turns, seed):
+    """
+    Joue un match entre des participants [(label, politique, params), ...] (un siège
+    chacun, joueurs s0, s1, ...). Le moteur et les politiques tirent dans `random`,
+    réinitialisé avec `seed` : un match est reproductible.
+
+    Retourne dict(labels, weights, winner (index du siège ou None si égalité), turns, seconds).
+    """
+    random.seed(seed)
+    started = time.perf_counter()
+    seats = [f"s{i}" for i in range(len(entrants))]
+    policies = [resolve_policy(policy_name) for _, policy_name, _ in entrants]
+    game = GameManager(seats, grid_size, start_weight, number_of_vitamins)
+
+    turns = 0
+    while turns < max_turns:
+        board = Board({'grid': game.current_grid, 'grid_size': grid_size, 'players': seats})
+        alive = [i for i, seat in enumerate(seats) if board.cells_of(seat)]
+        if len(alive) <= 1:
+            break
+        moves = []
+        for i in alive:
+            moves.extend(policies[i](board, seats[i], entrants[i][2]))
+        game.apply_moves(moves)
+        turns += 1
+
+    weights = [0] * len(seats)
+    for cell in game.current_grid:
+        if cell['player'] != 'vitamin':
+            weights[seats.index(cell['player'])] += cell['weight']
+    best = max(weights)
+    leaders = [i for i, w in enumerate(weights) if w == best]
+    return {
+        'labels': [label for label, _, _ in entrants],
+        'weights': weights,
+        'winner': leaders[0] if len(leaders) == 1 and best > 0 else None,
+        'turns': turns,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _play_job(job):
+    return play_match(*job)
+
+
+def round_robin(n_entrants, games_per_pair):
+    """
+    Toutes les paires (i, j), games_per_pair matchs chacune, en alternant les sièges.
+    """
+    pairings = []
+    for i, j in combinations(range(n_entrants), 2):
+        for game in range(games_per_pair):
+            pairings.append((i, j) if game % 2 == 0 else (j, i))
+    return pairings
+
+
+def swiss_round(scores, played):
+    """
+    Apparie les participants de score proche (ordre décroissant) en évitant les
+    revanches quand c'est possible ; un nombre impair laisse le dernier exempt.
+    """
+    order = sorted(scores, key=lambda i: -scores[i])
+    pairings = []
+    while len(order) > 1:
+        first = order.pop(0)
+        opponent = next((o for o in order if (first, o) not in played), order[0])
+        order.remove(opponent)
+        pairings.append((first, opponent))
+    return pairings
+
+
+class Standings:
+    def __init__(self, labels):
+        self.labels = labels
+        self.games = defaultdict(int)
+        self.wins = defaultdict(int)
+        self.draws = defaultdict(int)
+        self.total_weight = defaultdict(int)
+        self.points = defaultdict(float)
+        self.matches = 0
+        self.turns = 0
+        self.match_seconds = 0.0
+
+    def record(self, indices, result):
+        self.matches += 1
+        self.turns += result['turns']
+        self.match_seconds += result['seconds']
+        for seat, index in enumerate(indices):
+            self.games[index] += 1
+            self.total_weight[index] += result['weights'][seat]
+            if result['winner'] is None:
+                self.draws[index] += 1
+                self.points[index] += 0.5
+            elif result['winner'] == seat:
+                self.wins[index] += 1
+                self.points[index] += 1
+
+    def table(self):
+        rows = []
+        for index, label in enumerate(self.labels):
+            games = self.games[index]
+            rows.append({
+                'label': label,
+                'games': games,
+                'wins': self.wins[index],
+                'draws': self.draws[index],
+                'losses': games - self.wins[index] - self.draws[index],
+                'win_rate': self.wins[index] / games if games else 0.0,
+                'mean_final_weight': self.total_weight[index] / games if games else 0.0,
+                'points': self.points[index],
+            })
+        rows.sort(key=lambda row: (-row['points'], -row['win_rate']))
+        return rows
+
+
+def run_tournament(entrants, schedule='round-robin', games_per_pair=2, rounds=3,
+                   grid_size=20, start_weight=6, number_of_vitamins=5, max_turns=200,
+                   workers=None, seed=0):
+    """
+    Lance le tournoi et retourne {'standings', 'matches', 'turns', 'seconds',
+    'matches_per_second', 'turns_per_second'}.
+    """
+    standings = Standings([label for label, _, _ in entrants])
+    started = time.perf_counter()
+    next_seed = seed
+
+    def jobs_for(pairings):
+        nonlocal next_seed
+        jobs = []
+        for pairing in pairings:
+            jobs.append(([entrants[i] for i in pairing], grid_size, start_weight,
+                         number_of_vitamins, max_turns, next_seed))
+            next_seed += 1
+        return jobs
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def play(pairings):
+            jobs = jobs_for(pairings)
+            chunksize = max(1, len(jobs) // (4 * workers))
+            for pairing, result in zip(pairings, executor.map(_play_job, jobs, chunksize=chunksize)):
+                standings.record(pairing, result)
+
+        if schedule == 'round-robin':
+            play(round_robin(len(entrants), games_per_pair))
+        else:
+            played = set()
+            for _ in range(rounds):
+                scores = {i: standings.points[i] for i in range(len(entrants))}
+                pairings = swiss_round(scores, played)
+                for i, j in pairings:
+                    played.add((i, j))
+                    played.add((j, i))
+                play([(i, j) if game % 2 == 0 else (j, i)
+                      for i, j in pairings for game in range(games_per_pair)])
+
+    seconds = time.perf_counter() - started
+    return {
+        'standings': standings.table(),
+        'matches': standings.matches,
+        'turns': standings.turns,
+        'seconds': seconds,
+        'matches_per_second': standings.matches / seconds if seconds else 0.0,
+        'turns_per_second': standings.turns / seconds if seconds else 0.0,
+    }
+
+
+def print_report(report):
+    print(f"{'participant':<30}{'matchs':>8}{'V':>7}{'N':>6}{'D':>7}{'% V':>8}{'poids moyen':>13}")
+    for row in report['standings']:
+        print(f"{row['label']:<30}{row['games']:>8}{row['wins']:>7}{row['draws']:>6}"
+              f"{row['losses']:>7}{row['win_rate'] * 100:>7.1f}%{row['mean_final_weight']:>13.1f}")
+    print(f"\n{report['matches']} matchs, {report['turns']} tours en {report['seconds']:.1f} s "
+          f"({report['matches_per_second']:.1f} matchs/s, {report['turns_per_second']:.0f} tours/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournoi entre politiques de bots (GameManager local)")
+    parser.add_argument('entrants', nargs='+', help="[label=]politique[:clé=valeur,...]")
+    parser.add_argument('--format', choices=['round-robin', 'swiss'], default='round-robin')
+    parser.add_argument('--games', type=int, default=2, help="matchs par paire (et par ronde en suisse)")
+    parser.add_argument('--rounds', type=int, default=3, help="nombre de rondes (suisse)")
+    parser.add_argument('--grid-size', type=int, default=20)
+    parser.add_argument('--start-weight', type=int, default=6)
+    parser.add_argument('--vitamins', type=int, default=5)
+    parser.add_argument('--max-turns', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help="processus (défaut : nombre de CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="écrit aussi le rapport dans ce fichier")
+    args = parser.parse_args()
+
+    entrants = [parse_entrant(spec) for spec in args.entrants]
+    report = run_tournament(
+        entrants, schedule=args.format, games_per_pair=args.games, rounds=args.rounds,
+        grid_size=args.grid_size, start_weight=args.start_weight,
+        number_of_vitamins=args.vitamins, max_turns=args.max_turns,
+        workers=args.workers, seed=args.seed
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
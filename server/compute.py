@@ -1,8 +1,13 @@
+import heapq
 import random
 import math
-from collections import defaultdict, Counter
+from collections import defaultdict
 
-def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
+from world import pick_free_positions, take_free_positions
+
+def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves, tie_seed=None,
+                      rejected=None, max_moves_per_player=None, rng=None, touched=None,
+                      eaten=None):
     """
     Compute one turn of the game, with validity checks on moves.
 
@@ -24,6 +29,27 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
             ...
         ]
 
+    :param tie_seed: (optional) if given, random tie-breaks use a random generator
+        seeded by (tie_seed, square or crossing path) instead of the global `random` module.
+        The result then no longer depends on the order squares are processed in,
+        which is what lets parallel_compute.py resolve tiles independently.
+    :param rejected: (optional) list receiving one entry per invalid move
+        ({'index', 'x', 'y', 'player', 'reason'}, see validate_moves)
+    :param max_moves_per_player: (optional) cap on the moves read per player
+    :param rng: (optional) random generator for the vitamin respawn (global `random`
+        module by default). With tie_seed too, the turn is fully determined by its
+        inputs: lockstep.py replays turns from (moves, seed) this way.
+    :param touched: (optional) set receiving the (x, y) squares whose content may
+        have changed this turn: origin and destination of every sub-cell that moved
+        (merges and deaths happen on those squares) and respawned vitamins. Squares
+        outside it are the same in new_grid as in original_grid; game_manager.py
+        maps them to the display tiles to republish. If it is a dict, each square
+        maps to its cell in new_grid, or None if the square is now empty, so a caller
+        can update its own index and aggregates square by square.
+    :param eaten: (optional) dict receiving {player: vitamins eaten this turn}. A
+        vitamin never moves: it dies on arrival of another sub-cell on its square, and
+        the player who wins that square has eaten it.
+
     :return: (move_animation, new_grid)
 
         * move_animation: list of dict describing each sub-cell's move (for animation)
@@ -46,6 +72,58 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
             ]
     """
 
+    rng_at = tie_rngs(tie_seed)
+
+    sub_cells, move_animation_expansions = build_sub_cells(
+        grid_size, original_grid, cells_moves, rejected, max_moves_per_player
+    )
+    fates = {}
+    sub_cells = resolve_midway_collisions(sub_cells, rng_at, fates)
+    survivors, merged = resolve_destination_collisions(sub_cells, rng_at, fates)
+    return finish_turn(grid_size, numberOfVit, survivors + merged, move_animation_expansions, fates,
+                       rng, touched, eaten)
+
+
+def tie_rngs(tie_seed):
+    """
+    Return rng_at(*place), the random generator used for tie-breaks at a place:
+    a square (x, y) for destination merges, or the two squares of a crossing path
+    (x1, y1, x2, y2) for mid-way merges.
+
+    Without a seed every place shares the global `random` module (historical behaviour).
+    With a seed each place gets its own generator seeded by (tie_seed, place), created
+    on first use and reused for every later tie at that place during the turn.
+    """
+    if tie_seed is None:
+        return lambda *place: random
+
+    rngs = {}
+
+    def rng_at(*place):
+        rng = rngs.get(place)
+        if rng is None:
+            rng = rngs[place] = random.Random(f"{tie_seed}:{place}")
+        return rng
+
+    return rng_at
+
+
+def build_sub_cells(grid_size, original_grid, cells_moves, rejected=None, max_moves_per_player=None):
+    """
+    STEP 0 to 2 of compute_game_turn: validate moves and split cells into sub-cells.
+    Return (sub_cells, move_animation_expansions).
+    `rejected` and `max_moves_per_player` are passed on to validate_moves.
+    """
+    original_lookup = index_grid(original_grid)
+    valid_moves = validate_moves(grid_size, original_lookup, cells_moves,
+                                 rejected, max_moves_per_player)
+    return split_cells(original_lookup, valid_moves)
+
+
+def index_grid(original_grid):
+    """
+    STEP 0 of compute_game_turn: (x, y, player) -> weight lookup of the grid.
+    """
     # ------------------------------------------------------------
     # STEP 0: Organize the original grid into a lookup
     #         (x, y, player) -> weight
@@ -57,22 +135,22 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
         # (This depends on your game rules. If your game doesn't allow multiple same-player cells
         # in the same spot, you can just store them directly. For safety, we sum.)
         original_lookup[(x, y, p)] = original_lookup.get((x, y, p), 0) + w
+    return original_lookup
 
-    # We'll also keep track of which cells have "used" a move, so we don't 
-    # accidentally let them move twice.
-    used_keys = set()  # set of (x,y,player)
 
+def split_cells(original_lookup, valid_moves):
+    """
+    STEP 1 and 2 of compute_game_turn: one sub-cell per non-empty split of a valid
+    move (from validate_moves), then one 'stay' sub-cell per cell that did not move.
+    The lookup is left untouched, so a pre-built one can be reused.
+    Return (sub_cells, move_animation_expansions).
+
+    Each sub-cell carries 'ids': the indices in move_animation_expansions of the
+    moves it is made of (a single one until it merges with another sub-cell).
+    """
     # ------------------------------------------------------------
     # STEP 1: Build sub-cells from valid moves
     # ------------------------------------------------------------
-    directions = {
-        'up':    (0, -1),
-        'down':  (0,  1),
-        'left':  (-1, 0),
-        'right': (1,  0),
-        'stay':  (0,  0)
-    }
-
     # We'll store sub-cells in a list of dict:
     # {
     #   'origin_x': <int>,
@@ -81,7 +159,8 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
     #   'y': <int>,  # intended final y
     #   'player': <str>,
     #   'weight': <int>,
-    #   'direction': 'up'/'down'/'left'/'right'/'stay'
+    #   'direction': 'up'/'down'/'left'/'right'/'stay',
+    #   'ids': [<int>, ...]  # move_animation entries still alive in this sub-cell
     # }
     sub_cells = []
 
@@ -100,73 +179,16 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
             'result': 'survives'  # default (we'll adjust later)
         }
 
-    # Validate each move request
-    for move in cells_moves:
-        ox, oy = move['x'], move['y']
-        pl = move['player']
-        key = (ox, oy, pl)
-
-        # Check if a cell with that (x,y,player) exists
-        if key not in original_lookup:
-            # invalid => ignore
-            continue
-
-        # Make sure we haven't used that same cell before
-        if key in used_keys:
-            # This cell already moved => ignore
-            continue
-
-        cell_weight = original_lookup[key]
-        # Sum the splits
-        up_    = move.get('move_up', 0)
-        down_  = move.get('move_down', 0)
-        left_  = move.get('move_left', 0)
-        right_ = move.get('move_right', 0)
-        stay_  = move.get('move_stay', 0)
-
-        total_split = up_ + down_ + left_ + right_ + stay_
-
-        # Check if the total matches the cell's weight
-        if total_split != cell_weight:
-            # invalid => ignore
-            continue
-
-        # Next, check if any of these sub-splits try to move out of bounds
-        # For each direction that has w>0, see if final x,y would go out of [0, grid_size-1].
-        # If so, it's invalid => ignore this entire move.
-        is_invalid_move = False
-        move_splits = {
-            'up': up_,
-            'down': down_,
-            'left': left_,
-            'right': right_,
-            'stay': stay_
-        }
-        for d_name, w in move_splits.items():
-            if w <= 0:
-                continue
-            dx, dy = directions[d_name]
-            final_x = ox + dx
-            final_y = oy + dy
-            # Check bounds
-            if final_x < 0 or final_x >= grid_size or final_y < 0 or final_y >= grid_size:
-                is_invalid_move = True
-                break
-
-        if is_invalid_move:
-            # out of bounds => ignore
-            continue
-
-        # If we reach here => the move is valid
-        used_keys.add(key)
-        # Remove the cell from original_lookup so we don't "stay" it later
-        del original_lookup[key]
+    moved = set()
+    for ox, oy, pl, move_splits in valid_moves:
+        # Remember the cell so we don't "stay" it later
+        moved.add((ox, oy, pl))
 
         # Create sub-cells
         for d_name, w in move_splits.items():
             if w <= 0:
                 continue
-            dx, dy = directions[d_name]
+            dx, dy = DIRECTIONS[d_name]
             final_x = ox + dx
             final_y = oy + dy
             sub_cells.append({
@@ -176,7 +198,8 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
                 'y': final_y,
                 'player': pl,
                 'weight': w,
-                'direction': d_name
+                'direction': d_name,
+                'ids': [len(move_animation_expansions)]
             })
 
             # For animation
@@ -187,6 +210,8 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
     #         we keep it "as-is" (they stay in place).
     # ------------------------------------------------------------
     for (ox, oy, pl), w in original_lookup.items():
+        if (ox, oy, pl) in moved:
+            continue
         # That cell didn't move => produce one "stay" sub-cell
         sub_cells.append({
             'origin_x': ox,
@@ -195,71 +220,290 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
             'y': oy,
             'player': pl,
             'weight': w,
-            'direction': 'stay'
+            'direction': 'stay',
+            'ids': [len(move_animation_expansions)]
         })
         # Also add an animation entry
         move_animation_expansions.append(create_animation_entry(ox, oy, w, 'stay', pl))
 
+    return sub_cells, move_animation_expansions
+
+
+DIRECTIONS = {
+    'up':    (0, -1),
+    'down':  (0,  1),
+    'left':  (-1, 0),
+    'right': (1,  0),
+    'stay':  (0,  0)
+}
+
+# Reasons reported by validate_moves, in the order they are checked
+REJECT_TOO_MANY_MOVES = 'too_many_moves'   # beyond max_moves_per_player for this player
+REJECT_DUPLICATE = 'duplicate'             # this cell already has a valid move this turn
+REJECT_UNKNOWN_CELL = 'unknown_cell'       # no cell of this player at (x, y)
+REJECT_NEGATIVE_SPLIT = 'negative_split'   # a direction gets a negative weight
+REJECT_WRONG_TOTAL = 'wrong_total'         # splits do not add up to the cell's weight
+REJECT_OUT_OF_BOUNDS = 'out_of_bounds'     # a non-empty split leaves the grid
+
+
+def validate_moves(grid_size, original_lookup, cells_moves, rejected=None, max_moves_per_player=None):
+    """
+    Check every move in one pass against the (x, y, player) -> weight lookup.
+    Return [(x, y, player, {direction: weight}), ...] for the valid moves, in order.
+
+    :param rejected: (optional) list; for each invalid move, appends
+        {'index', 'x', 'y', 'player', 'reason': REJECT_*} (see report_rejection)
+    :param max_moves_per_player: (optional) moves of a player beyond this count are
+        rejected without being looked at
+    """
+    valid = []
+    used_keys = set()  # set of (x,y,player)
+    submitted = defaultdict(int)
+    capped = {}
+
+    for move in cells_moves:
+        reason, checked = check_move(grid_size, original_lookup, move, used_keys,
+                                     submitted, max_moves_per_player)
+        if reason is not None:
+            if rejected is not None:
+                report_rejection(rejected, capped, submitted, move, reason)
+            continue
+        valid.append(checked)
+
+    return valid
+
+
+def report_rejection(rejected, capped, submitted, move, reason):
+    """
+    Append the entry of a rejected move to `rejected`. Its 'index' is the position
+    of the move among its player's moves (the array that player submitted), counted
+    by `submitted` (see check_move).
+
+    Moves beyond max_moves_per_player share a single entry per player, kept in
+    `capped`: that of the first one dropped, with 'count' the number dropped, so an
+    oversized payload does not produce an equally large report.
+    """
+    player = move['player']
+    if reason == REJECT_TOO_MANY_MOVES and player in capped:
+        capped[player]['count'] += 1
+        return
+    entry = {'index': submitted[player] - 1, 'x': move['x'], 'y': move['y'],
+             'player': player, 'reason': reason}
+    if reason == REJECT_TOO_MANY_MOVES:
+        entry['count'] = 1
+        capped[player] = entry
+    rejected.append(entry)
+
+
+def check_move(grid_size, original_lookup, move, used_keys, submitted, max_moves_per_player=None):
+    """
+    Check one move. Return (None, (x, y, player, {direction: weight})) if it is valid,
+    after recording it in used_keys, or (REJECT_*, None).
+    `submitted` counts the moves read per player (for max_moves_per_player).
+    """
+    ox, oy = move['x'], move['y']
+    pl = move['player']
+    key = (ox, oy, pl)
+
+    submitted[pl] += 1
+    if max_moves_per_player is not None and submitted[pl] > max_moves_per_player:
+        return REJECT_TOO_MANY_MOVES, None
+    if key in used_keys:
+        # This cell already moved => ignore
+        return REJECT_DUPLICATE, None
+    if key not in original_lookup:
+        return REJECT_UNKNOWN_CELL, None
+
+    move_splits = {
+        'up': move.get('move_up', 0),
+        'down': move.get('move_down', 0),
+        'left': move.get('move_left', 0),
+        'right': move.get('move_right', 0),
+        'stay': move.get('move_stay', 0)
+    }
+    if any(w < 0 for w in move_splits.values()):
+        return REJECT_NEGATIVE_SPLIT, None
+    # Check if the total matches the cell's weight
+    if sum(move_splits.values()) != original_lookup[key]:
+        return REJECT_WRONG_TOTAL, None
+    # A direction with w>0 must keep the sub-cell inside [0, grid_size-1]
+    for d_name, w in move_splits.items():
+        if w <= 0:
+            continue
+        dx, dy = DIRECTIONS[d_name]
+        final_x = ox + dx
+        final_y = oy + dy
+        if final_x < 0 or final_x >= grid_size or final_y < 0 or final_y >= grid_size:
+            return REJECT_OUT_OF_BOUNDS, None
+
+    # If we reach here => the move is valid
+    used_keys.add(key)
+    return None, (ox, oy, pl, move_splits)
+
+
+class PendingTurn:
+    """
+    Moves of the coming turn, validated as they arrive against an index of the
+    board built once (index_grid), so closing the turn only has collisions left.
+
+    A player's moves are validated on their own (cells are keyed by player), and a
+    new submission from a player replaces their previous one. At close, the kept
+    moves are read in the order they arrived, whatever the players' interleaving:
+    the turn is that of compute_game_turn on those moves in that order (the order
+    decides which sub-cells merge first, so grouping them by player would not be).
+    """
+
+    def __init__(self, grid_size, original_grid):
+        self.grid_size = grid_size
+        self.original_lookup = index_grid(original_grid)
+        # player -> [(arrival number, checked move), ...], in arrival order
+        self.valid_by_player = {}
+        self.received = 0
+
+    def submit(self, cells_moves, max_moves_per_player=None):
+        """
+        Validate a batch of moves (possibly of several players) and keep the valid
+        ones. Return the rejected moves, as validate_moves reports them
+        ('index' is the position among the player's moves in this batch).
+        """
+        by_player = defaultdict(list)
+        for number, move in enumerate(cells_moves, self.received):
+            by_player[move['player']].append((number, move))
+        self.received += len(cells_moves)
+
+        rejected = []
+        for player, moves in by_player.items():
+            valid, used_keys, submitted, capped = [], set(), defaultdict(int), {}
+            for number, move in moves:
+                reason, checked = check_move(self.grid_size, self.original_lookup, move,
+                                             used_keys, submitted, max_moves_per_player)
+                if reason is not None:
+                    report_rejection(rejected, capped, submitted, move, reason)
+                else:
+                    valid.append((number, checked))
+            self.valid_by_player[player] = valid
+        return rejected
+
+    def valid_moves(self):
+        """
+        The kept moves in arrival order (each player's list is already sorted).
+        """
+        return [m for _, m in heapq.merge(*self.valid_by_player.values(), key=lambda v: v[0])]
+
+
+def resolve_pending_turn(grid_size, numberOfVit, pending, tie_seed=None, vitamin_candidates=None,
+                         touched=None, eaten=None):
+    """
+    Finish a turn whose moves were validated in a PendingTurn.
+    Return (move_animation_iter, new_grid), as compute_game_turn_stream.
+
+    :param vitamin_candidates: (optional) positions in random order, drawn before the
+        turn (world.shuffled_positions); respawned vitamins take the first free ones.
+    :param touched, eaten: see compute_game_turn.
+    """
+    rng_at = tie_rngs(tie_seed)
+
+    sub_cells, move_animation_expansions = split_cells(pending.original_lookup, pending.valid_moves())
+    fates = {}
+    sub_cells = resolve_midway_collisions(sub_cells, rng_at, fates)
+    survivors, merged = resolve_destination_collisions(sub_cells, rng_at, fates)
+    return finish_turn_stream(
+        grid_size, numberOfVit, survivors + merged, move_animation_expansions, fates,
+        vitamin_candidates, touched=touched, eaten=eaten
+    )
+
+
+def resolve_midway_collisions(sub_cells, rng_at, fates):
+    """
+    STEP 3 of compute_game_turn: merge sub-cells whose paths cross.
+    Return the new list of sub-cells.
+
+    The ids of the losing side are recorded as fates[id] = 'dies_midway'; the
+    merged sub-cell carries the ids of the winning player's side.
+
+    Sub-cells carrying a '_key' (ordering key used by parallel_compute.py) pass it on:
+    a merge created during pass p from A gets (p, A['_key']).
+    """
     # ------------------------------------------------------------
     # STEP 3: Resolve mid-way collisions (cells crossing paths)
     # ------------------------------------------------------------
     # We'll repeatedly scan for pairs that cross until no more mid-way collisions occur.
+    # Moving sub-cells are indexed by (origin, destination), so each sub-cell looks up
+    # the ones crossing it instead of scanning every pair: a pass is linear in the
+    # number of sub-cells. Pairs are still formed in the same order as a pairwise scan
+    # (for each i, the first j > i still available).
 
     has_midway_collision = True
+    pass_number = 0
     while has_midway_collision:
         has_midway_collision = False
         to_remove = set()
+        pass_number += 1
+
+        by_path = defaultdict(list)
+        for idx, s in enumerate(sub_cells):
+            if (s['origin_x'], s['origin_y']) != (s['x'], s['y']):
+                by_path[(s['origin_x'], s['origin_y'], s['x'], s['y'])].append(idx)
 
         n = len(sub_cells)
-        i = 0
-        while i < n - 1:
-            j = i + 1
-            while j < n:
-                if i in to_remove:
-                    j += 1
-                    continue
-                if j in to_remove:
-                    j += 1
-                    continue
+        for i in range(n):
+            if i in to_remove:
+                continue
+            A = sub_cells[i]
+            if (A['origin_x'], A['origin_y']) == (A['x'], A['y']):
+                continue
 
-                A = sub_cells[i]
+            # Condition for mid-way collision:
+            #  - A's origin == B's destination
+            #  - B's origin == A's destination
+            #  - origin != destination
+            for j in by_path.get((A['x'], A['y'], A['origin_x'], A['origin_y']), ()):
+                if j <= i or j in to_remove:
+                    continue
                 B = sub_cells[j]
 
-                # Condition for mid-way collision:
-                #  - A's origin == B's destination
-                #  - B's origin == A's destination
-                #  - origin != destination
-                if (A['origin_x'] == B['x'] and
-                    A['origin_y'] == B['y'] and
-                    B['origin_x'] == A['x'] and
-                    B['origin_y'] == A['y'] and
-                    (A['origin_x'], A['origin_y']) != (A['x'], A['y'])):
-                    # Mid-way collision
-                    has_midway_collision = True
-                    to_remove.add(i)
-                    to_remove.add(j)
-
-                    # Merge them
-                    merged_player, merged_weight = resolve_merge(A, B)
-
-                    # Create a new sub-cell with direction='stay'
-                    # We'll place it at B's origin (arbitrary choice)
-                    new_sub = {
-                        'origin_x': A['origin_x'],
-                        'origin_y': A['origin_y'],
-                        'x': B['origin_x'],
-                        'y': B['origin_y'],
-                        'player': merged_player,
-                        'weight': merged_weight,
-                        'direction': 'stay'
-                    }
-                    sub_cells.append(new_sub)
-                j += 1
-            i += 1
+                # Mid-way collision
+                has_midway_collision = True
+                to_remove.add(i)
+                to_remove.add(j)
+
+                # Merge them
+                path = sorted([(A['origin_x'], A['origin_y']), (B['origin_x'], B['origin_y'])])
+                merged_player, merged_weight = resolve_merge(A, B, rng_at(*path[0], *path[1]))
+                merged_ids = collect_ids((A, B), merged_player, 'dies_midway', fates)
+
+                # Create a new sub-cell with direction='stay'
+                # We'll place it at B's origin (arbitrary choice)
+                new_sub = {
+                    'origin_x': A['origin_x'],
+                    'origin_y': A['origin_y'],
+                    'x': B['origin_x'],
+                    'y': B['origin_y'],
+                    'player': merged_player,
+                    'weight': merged_weight,
+                    'direction': 'stay',
+                    'ids': merged_ids
+                }
+                if '_key' in A:
+                    new_sub['_key'] = (pass_number, A['_key'])
+                sub_cells.append(new_sub)
+                break
 
         if to_remove:
             sub_cells = [s for idx, s in enumerate(sub_cells) if idx not in to_remove]
 
+    return sub_cells
+
+
+def resolve_destination_collisions(sub_cells, rng_at, fates):
+    """
+    STEP 4 of compute_game_turn: merge sub-cells landing on the same square.
+    Return (survivors, merged): sub-cells alone on their square, in order,
+    then one merged sub-cell per contested square, in order of first arrival.
+
+    The ids of sub-cells not owned by the square's winner are recorded as
+    fates[id] = 'dies_arrival'.
+    """
     # ------------------------------------------------------------
     # STEP 4: Collisions on final destinations
     # ------------------------------------------------------------
@@ -308,10 +552,10 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
                     winner = top1
                 elif p1 == 'vitamin' and p2 == 'vitamin':
                     # Both are vitamins, choose randomly
-                    winner = random.choice([top1, top2])
+                    winner = rng_at(*pos).choice([top1, top2])
                 else:
                     # Both non-vitamins, choose randomly
-                    winner = random.choice([top1, top2])
+                    winner = rng_at(*pos).choice([top1, top2])
                 loser = top2 if winner == top1 else top1
                 winner = (winner[0], winner[1] + loser[1])
                 merges.remove(top1)
@@ -323,53 +567,116 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
         for i in idxs:
             to_remove.add(i)
 
-        new_subs.append({
+        new_sub = {
             'origin_x': group[0]['origin_x'],
             'origin_y': group[0]['origin_y'],
             'x': pos[0],
             'y': pos[1],
             'player': final_player,
             'weight': final_weight,
-            'direction': group[0]['direction']
-        })
+            'direction': group[0]['direction'],
+            'ids': collect_ids(group, final_player, 'dies_arrival', fates)
+        }
+        if '_key' in group[0]:
+            new_sub['_key'] = group[0]['_key']
+        new_subs.append(new_sub)
 
     # Remove old
-    sub_cells = [s for i, s in enumerate(sub_cells) if i not in to_remove]
-    sub_cells.extend(new_subs)
+    survivors = [s for i, s in enumerate(sub_cells) if i not in to_remove]
+
+    return survivors, new_subs
+
 
+def collect_ids(group, winner, death, fates):
+    """
+    Return the ids of the sub-cells of `group` owned by the winning player, and mark
+    every other id as fates[id] = death.
+    """
+    ids = []
+    for sc in group:
+        if sc['player'] == winner:
+            ids.extend(sc['ids'])
+        else:
+            for i in sc['ids']:
+                fates[i] = death
+    return ids
+
+
+def compute_game_turn_stream(grid_size, numberOfVit, original_grid, cells_moves, tie_seed=None,
+                             rejected=None, max_moves_per_player=None, rng=None, touched=None,
+                             eaten=None):
+    """
+    Same turn as compute_game_turn, returned as (move_animation_iter, new_grid).
+
+    The new grid is complete when this returns; move_animation entries are labelled
+    one at a time as the iterator is consumed, so a caller can serialize them as they
+    come (e.g. as NDJSON) instead of holding the whole list.
+    """
+    rng_at = tie_rngs(tie_seed)
+
+    sub_cells, move_animation_expansions = build_sub_cells(
+        grid_size, original_grid, cells_moves, rejected, max_moves_per_player
+    )
+    fates = {}
+    sub_cells = resolve_midway_collisions(sub_cells, rng_at, fates)
+    survivors, merged = resolve_destination_collisions(sub_cells, rng_at, fates)
+    return finish_turn_stream(
+        grid_size, numberOfVit, survivors + merged, move_animation_expansions, fates,
+        rng=rng, touched=touched, eaten=eaten
+    )
+
+
+def finish_turn(grid_size, numberOfVit, sub_cells, move_animation_expansions, fates, rng=None,
+                touched=None, eaten=None):
+    """
+    STEP 5 to 7 of compute_game_turn: animation results, vitamin respawn, new grid.
+    Return (move_animation, new_grid).
+    """
+    move_animation, new_grid = finish_turn_stream(
+        grid_size, numberOfVit, sub_cells, move_animation_expansions, fates, rng=rng,
+        touched=touched, eaten=eaten
+    )
+    return list(move_animation), new_grid
+
+
+def finish_turn_stream(grid_size, numberOfVit, sub_cells, move_animation_expansions, fates,
+                       vitamin_candidates=None, rng=None, touched=None, eaten=None):
+    """
+    STEP 5 to 7 of compute_game_turn, with STEP 5 left lazy.
+    Return (move_animation_iter, new_grid).
+    `vitamin_candidates`: see resolve_pending_turn; `rng`, `touched`, `eaten`: see
+    compute_game_turn.
+    """
     # ------------------------------------------------------------
     # STEP 5: Create the move_animation array
     #         We have "move_animation_expansions" describing 
     #         every (origin_x, origin_y, weight, direction, player) that was attempted.
-    #         We'll see if it "survives" in sub_cells or "dies_midway"/"dies_arrival".
+    #         Deaths were recorded by id in `fates` during STEP 3 and 4
+    #         ('dies_midway' / 'dies_arrival'); every other entry survives.
+    #         (The labelling itself happens on iteration.)
     # ------------------------------------------------------------
-    # Build a Counter for final sub_cells
-    final_counter = Counter()
-    for sc in sub_cells:
-        # Each surviving sub-cell can be identified by
-        # (origin_x, origin_y, direction, player, weight).
-        k = (sc['origin_x'], sc['origin_y'], sc['direction'], sc['player'], sc['weight'])
-        final_counter[k] += 1
-
-    # Now, move_animation starts as a copy of expansions, then we fix their 'result'.
-    move_animation = []
-    for anim_sub in move_animation_expansions:
-        key = (anim_sub['origin_x'], 
-               anim_sub['origin_y'], 
-               anim_sub['direction'], 
-               anim_sub['player'], 
-               anim_sub['weight'])
-        if final_counter[key] > 0:
-            # Survives
-            anim_sub['result'] = 'survives'
-            final_counter[key] -= 1
-        else:
-            # Died (either mid-way or final)
-            # We'll just label them 'dies_arrival' for simplicity,
-            # or you could attempt further logic to detect mid-way collisions specifically.
-            anim_sub['result'] = 'dies_arrival'
-
-        move_animation.append(anim_sub)
+    def label_animation():
+        for i, anim_sub in enumerate(move_animation_expansions):
+            anim_sub['result'] = fates.get(i, 'survives')
+            yield anim_sub
+
+    changed = set()
+    if touched is not None:
+        # Every change happens on the path of a moving sub-cell
+        for anim_sub in move_animation_expansions:
+            if anim_sub['direction'] != 'stay':
+                ox, oy = anim_sub['origin_x'], anim_sub['origin_y']
+                dx, dy = DIRECTIONS[anim_sub['direction']]
+                changed.add((ox, oy))
+                changed.add((ox + dx, oy + dy))
+
+    # Squares of the vitamins that died this turn (only sub-cells in `fates` died)
+    eaten_at = set()
+    if eaten is not None:
+        for i, fate in fates.items():
+            anim_sub = move_animation_expansions[i]
+            if fate == 'dies_arrival' and anim_sub['player'] == 'vitamin':
+                eaten_at.add((anim_sub['origin_x'], anim_sub['origin_y']))
 
     # ------------------------------------------------------------
     # STEP 6: Add vitamins if needed
@@ -382,13 +689,13 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
     missing = numberOfVit - vitamins_count
     if missing > 0:
         # find free spots
+        # (dense enumeration on normal boards, sampling on huge sparse ones)
         occupied = {(sc['x'], sc['y']) for sc in sub_cells}
-        all_positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
-        free_positions = [pos for pos in all_positions if pos not in occupied]
-        random.shuffle(free_positions)
-        to_place = min(missing, len(free_positions))
-        for i in range(to_place):
-            px, py = free_positions[i]
+        if vitamin_candidates is not None:
+            positions = take_free_positions(vitamin_candidates, occupied, missing)
+        else:
+            positions = pick_free_positions(grid_size, occupied, missing, rng or random)
+        for px, py in positions:
             sub_cells.append({
                 'origin_x': px,
                 'origin_y': py,
@@ -396,27 +703,44 @@ def compute_game_turn(grid_size, numberOfVit, original_grid, cells_moves):
                 'y': py,
                 'player': 'vitamin',
                 'weight': 1,
-                'direction': 'stay'
+                'direction': 'stay',
+                'ids': []
             })
+            changed.add((px, py))
 
     # ------------------------------------------------------------
     # STEP 7: Build the final new_grid
     # ------------------------------------------------------------
     new_grid = []
+    contents = None
+    if isinstance(touched, dict):
+        contents = dict.fromkeys(changed)
+    elif touched is not None:
+        touched.update(changed)
     for sc in sub_cells:
-        new_grid.append({
+        cell = {
             'x': sc['x'],
             'y': sc['y'],
             'weight': sc['weight'],
             'player': sc['player']
-        })
-
-    return move_animation, new_grid
-
-def resolve_merge(A, B):
+        }
+        new_grid.append(cell)
+        if contents is not None or eaten_at:
+            pos = (sc['x'], sc['y'])
+            if contents is not None and pos in contents:
+                contents[pos] = cell
+            if pos in eaten_at:
+                eaten[sc['player']] = eaten.get(sc['player'], 0) + 1
+    if contents is not None:
+        touched.update(contents)
+
+    return label_animation(), new_grid
+
+def resolve_merge(A, B, rng=random):
     """
     Merge sub-cells A and B that collided mid-way.
     Return (winning_player, combined_weight).
+    `rng` draws the winner of a tie (global `random` module by default).
     
     Rules:
     1) If same player => sum up directly
@@ -440,11 +764,11 @@ def resolve_merge(A, B):
         return pB, wA + wB
     else:
         # tie => random
-        winner = random.choice([pA, pB])
+        winner = rng.choice([pA, pB])
         return winner, wA + wB
 
 
-def generate_initial_grid(players, grid_size, start_weight, number_of_vitamins):
+def generate_initial_grid(players, grid_size, start_weight, number_of_vitamins, rng=None):
     """
     Génère une grille de départ pour le jeu.
 
@@ -452,6 +776,7 @@ def generate_initial_grid(players, grid_size, start_weight, number_of_vitamins):
     :param grid_size: (int) Taille N de la grille (N x N)
     :param start_weight: (int) Poids de départ pour chaque cellule de joueur
     :param number_of_vitamins: (int) Nombre total de vitamines à placer
+    :param rng: (optionnel) générateur aléatoire des vitamines (module `random` par défaut)
 
     :return: (list[dict]) Liste de cellules, même format que new_grid/original_grid
              ex. [
@@ -506,17 +831,11 @@ def generate_initial_grid(players, grid_size, start_weight, number_of_vitamins):
 
     # Maintenant, on place les vitamines (poids=1)
     # On va piocher random dans les cases libres
+    # (sur un très grand plateau, on tire les cases au hasard sans les énumérer)
     occupied = set((c['x'], c['y']) for c in initial_grid)
-    all_positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
-    free_positions = [pos for pos in all_positions if pos not in occupied]
-
-    # On mélange au hasard
-    random.shuffle(free_positions)
 
     # On place autant de vitamines que demandé (ou moins s'il n'y a pas assez de cases)
-    nb_vitamins_to_place = min(number_of_vitamins, len(free_positions))
-    for i in range(nb_vitamins_to_place):
-        x_vit, y_vit = free_positions[i]
+    for x_vit, y_vit in pick_free_positions(grid_size, occupied, number_of_vitamins, rng or random):
         initial_grid.append({
             'x': x_vit,
             'y': y_vit,
@@ -0,0 +1,301 @@
+# engine_check.py
+#
+# Vérification différentielle d'un moteur de tour : on génère des plateaux et des
+# moves au hasard (moves invalides compris), on joue chaque cas avec le moteur de
+# référence (compute_game_turn) et avec un moteur candidat, avec les mêmes graines
+# (tie_seed, et `random` réinitialisé avant chaque appel pour la réapparition des
+# vitamines), et on compare new_grid (et move_animation quand le candidat la donne).
+# Le premier cas divergent est réduit à un petit reproducteur ; on mesure aussi
+# l'accélération du candidat.
+#
+#   python engine_check.py tiled stream pending --cases 2000
+#   python engine_check.py simulator --cases 500 --max-grid 30
+#   python engine_check.py mypackage.engine.compute_turn --json divergence.json
+#
+# Un candidat est une fonction (grid_size, numberOfVit, grid, moves, tie_seed)
+# -> (move_animation ou None, new_grid).
+
+import argparse
+import copy
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+from compute import (compute_game_turn, compute_game_turn_stream, PendingTurn, resolve_pending_turn,
+                     index_grid, validate_moves)
+from parallel_compute import compute_game_turn_tiled
+
+MOVE_KEYS = ('move_up', 'move_down', 'move_left', 'move_right', 'move_stay')
+
+
+def reference_engine(grid_size, numberOfVit, grid, moves, tie_seed):
+    return compute_game_turn(grid_size, numberOfVit, grid, moves, tie_seed=tie_seed)
+
+
+def tiled_engine(grid_size, numberOfVit, grid, moves, tie_seed):
+    # Petites tuiles : les cas aléatoires en traversent plusieurs
+    return compute_game_turn_tiled(grid_size, numberOfVit, grid, moves, tie_seed, tile_size=4)
+
+
+def stream_engine(grid_size, numberOfVit, grid, moves, tie_seed):
+    move_animation, new_grid = compute_game_turn_stream(grid_size, numberOfVit, grid, moves,
+                                                        tie_seed=tie_seed)
+    return list(move_animation), new_grid
+
+
+def pending_engine(grid_size, numberOfVit, grid, moves, tie_seed):
+    # Tous les moves en un envoi : PendingTurn les relit dans leur ordre d'arrivée
+    pending = PendingTurn(grid_size, grid)
+    pending.submit(moves)
+    move_animation, new_grid = resolve_pending_turn(grid_size, numberOfVit, pending, tie_seed=tie_seed)
+    return list(move_animation), new_grid
+
+
+def simulator_engine(grid_size, numberOfVit, grid, moves, tie_seed):
+    # Modèle de prédiction des bots, sans move_animation. Un bot ne donne que des moves
+    # de ses cellules, un par case : le serveur filtre d'abord les moves (validate_moves)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'player'))
+    import simulator
+    valid = validate_moves(grid_size, index_grid(grid), moves)
+    splits = {(x, y): tuple(split.values()) for x, y, _, split in valid}
+    state = simulator.step(simulator.state_from_grid(grid), splits, grid_size, numberOfVit,
+                           tie_seed=tie_seed)
+    return None, simulator.grid_from_state(state)
+
+
+CANDIDATES = {
+    'tiled': tiled_engine,
+    'stream': stream_engine,
+    'pending': pending_engine,
+    'simulator': simulator_engine,
+}
+
+
+def resolve_candidate(name):
+    """
+    Retourne la fonction d'un candidat : nom connu ou chemin module.fonction.
+    """
+    if name in CANDIDATES:
+        return CANDIDATES[name]
+    module_name, _, function_name = name.rpartition('.')
+    if not module_name:
+        raise ValueError(f"Candidat inconnu '{name}' (disponibles : {', '.join(CANDIDATES)}, ou module.fonction)")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def random_case(rng, max_grid=12, players=('p1', 'p2', 'p3')):
+    """
+    Tire un cas : dict(grid_size, numberOfVit, grid, moves, seed). Les cellules sont
+    serrées pour provoquer croisements et fusions ; une partie des moves est invalide
+    (doublon, mauvaise somme, poids négatif, sortie de grille, case vide ou adverse).
+    """
+    grid_size = rng.randint(2, max_grid)
+    density = rng.uniform(0.1, 0.8)
+    grid = []
+    for x in range(grid_size):
+        for y in range(grid_size):
+            if rng.random() < density:
+                player = rng.choice(players + ('vitamin',))
+                weight = 1 if player == 'vitamin' else rng.randint(1, 9)
+                grid.append({'x': x, 'y': y, 'weight': weight, 'player': player})
+    rng.shuffle(grid)
+
+    moves = []
+    for cell in grid:
+        if cell['player'] == 'vitamin' or rng.random() < 0.2:
+            continue
+        split = [0] * 5
+        for _ in range(cell['weight']):
+            split[rng.randrange(5)] += 1
+        move = {'x': cell['x'], 'y': cell['y'], 'player': cell['player']}
+        move.update(zip(MOVE_KEYS, split))
+        moves.append(move)
+
+    for move in list(moves):
+        roll = rng.random()
+        if roll < 0.03:
+            moves.append(dict(move))
+        elif roll < 0.06:
+            bad = dict(move)
+            bad[rng.choice(MOVE_KEYS)] += 1
+            moves.append(bad)
+        elif roll < 0.08:
+            bad = dict(move)
+            key = rng.choice(MOVE_KEYS[:4])
+            bad['move_stay'] += bad[key] + 1
+            bad[key] = -1
+            moves.append(bad)
+        elif roll < 0.10:
+            moves.append(dict(move, player=rng.choice(players)))
+        elif roll < 0.12:
+            moves.append(dict(move, x=rng.randrange(grid_size), y=rng.randrange(grid_size)))
+    rng.shuffle(moves)
+
+    return {
+        'grid_size': grid_size,
+        'numberOfVit': rng.randint(0, 6),
+        'grid': grid,
+        'moves': moves,
+        'seed': rng.getrandbits(32),
+    }
+
+
+def run_engine(engine, case):
+    """
+    Joue un cas ; retourne (move_animation, new_grid, secondes). Les entrées sont
+    copiées et `random` réinitialisé avec la graine du cas avant l'appel.
+    """
+    grid = copy.deepcopy(case['grid'])
+    moves = copy.deepcopy(case['moves'])
+    random.seed(case['seed'])
+    started = time.perf_counter()
+    move_animation, new_grid = engine(case['grid_size'], case['numberOfVit'], grid, moves, case['seed'])
+    return move_animation, new_grid, time.perf_counter() - started
+
+
+def canonical_grid(grid):
+    return sorted((c['x'], c['y'], c['player'], c['weight']) for c in grid)
+
+
+def canonical_animation(move_animation):
+    return sorted(tuple(sorted(entry.items())) for entry in move_animation)
+
+
+def difference(expected, got):
+    """
+    Compare deux résultats (move_animation, new_grid) ; retourne None s'ils s'accordent,
+    sinon dict(field, expected, got). move_animation n'est comparée que si le candidat
+    la donne.
+    """
+    ref_animation, ref_grid = expected
+    animation, grid = got
+    if canonical_grid(grid) != canonical_grid(ref_grid):
+        return {'field': 'new_grid', 'expected': canonical_grid(ref_grid), 'got': canonical_grid(grid)}
+    if animation is not None and canonical_animation(animation) != canonical_animation(ref_animation):
+        return {'field': 'move_animation', 'expected': canonical_animation(ref_animation),
+                'got': canonical_animation(animation)}
+    return None
+
+
+def compare(case, reference, candidate):
+    """
+    Joue un cas avec les deux moteurs ; retourne difference(...) (une exception du
+    candidat compte comme divergence).
+    """
+    ref_animation, ref_grid, _ = run_engine(reference, case)
+    try:
+        animation, grid, _ = run_engine(candidate, case)
+    except Exception as e:
+        return {'field': 'exception', 'expected': None, 'got': f"{type(e).__name__}: {e}"}
+    return difference((ref_animation, ref_grid), (animation, grid))
+
+
+def _reductions(case):
+    # Cas plus petits : sans un move, sans une cellule (et ses moves), plateau rétréci,
+    # moins de vitamines, poids réduits à 1
+    moves, grid = case['moves'], case['grid']
+    for i in range(len(moves)):
+        yield dict(case, moves=moves[:i] + moves[i + 1:])
+    for i, cell in enumerate(grid):
+        yield dict(case, grid=grid[:i] + grid[i + 1:],
+                   moves=[m for m in moves if (m['x'], m['y']) != (cell['x'], cell['y'])])
+    used = max([c['x'] for c in grid] + [c['y'] for c in grid] + [0]) + 1
+    if used < case['grid_size']:
+        yield dict(case, grid_size=used)
+    if case['numberOfVit'] > 0:
+        yield dict(case, numberOfVit=case['numberOfVit'] - 1)
+    for i, cell in enumerate(grid):
+        if cell['weight'] > 1 and not any((m['x'], m['y']) == (cell['x'], cell['y']) for m in moves):
+            yield dict(case, grid=grid[:i] + [dict(cell, weight=1)] + grid[i + 1:])
+
+
+def minimize(case, reference, candidate):
+    """
+    Réduit un cas divergent tant qu'une réduction diverge encore (même graine).
+    """
+    reduced = True
+    while reduced:
+        reduced = False
+        for smaller in _reductions(case):
+            if compare(smaller, reference, candidate) is not None:
+                case, reduced = smaller, True
+                break
+    return case
+
+
+def check(candidate_name, cases=1000, seed=0, max_grid=12, reference=reference_engine):
+    """
+    Compare un candidat à la référence sur `cases` cas tirés avec `seed`.
+    Retourne dict(candidate, cases, divergences, reference_seconds, candidate_seconds,
+    speedup, first_divergence) ; first_divergence contient le cas réduit et l'écart.
+    """
+    candidate = resolve_candidate(candidate_name)
+    rng = random.Random(seed)
+    divergences = 0
+    first = None
+    reference_seconds = candidate_seconds = 0.0
+    for _ in range(cases):
+        case = random_case(rng, max_grid)
+        ref_animation, ref_grid, seconds = run_engine(reference, case)
+        reference_seconds += seconds
+        try:
+            animation, grid, seconds = run_engine(candidate, case)
+            candidate_seconds += seconds
+            diverged = difference((ref_animation, ref_grid), (animation, grid)) is not None
+        except Exception:
+            diverged = True
+        if diverged:
+            divergences += 1
+            if first is None:
+                small = minimize(case, reference, candidate)
+                first = {'case': small, 'difference': compare(small, reference, candidate)}
+    return {
+        'candidate': candidate_name,
+        'cases': cases,
+        'divergences': divergences,
+        'reference_seconds': reference_seconds,
+        'candidate_seconds': candidate_seconds,
+        'speedup': reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+        'first_divergence': first,
+    }
+
+
+def print_report(report):
+    status = "OK" if not report['divergences'] else f"{report['divergences']} divergence(s)"
+    print(f"{report['candidate']:<20}{report['cases']:>7} cas   {status:<20}"
+          f"réf {report['reference_seconds'] * 1000:>9.1f} ms   cand {report['candidate_seconds'] * 1000:>9.1f} ms"
+          f"   x{report['speedup']:.2f}")
+    first = report['first_divergence']
+    if first:
+        case, difference = first['case'], first['difference']
+        print(f"  premier cas divergent (réduit, {len(case['grid'])} cellules, {len(case['moves'])} moves) :")
+        print("  " + json.dumps(case))
+        print(f"  {difference['field']} attendu : {difference['expected']}")
+        print(f"  {difference['field']} obtenu  : {difference['got']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison aléatoire d'un moteur candidat avec compute_game_turn")
+    parser.add_argument('candidates', nargs='+', help=f"{', '.join(CANDIDATES)} ou module.fonction")
+    parser.add_argument('--cases', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-grid', type=int, default=12, help="côté maximum des plateaux tirés")
+    parser.add_argument('--json', help="écrit aussi les rapports dans ce fichier")
+    args = parser.parse_args()
+
+    reports = []
+    for name in args.candidates:
+        report = check(name, cases=args.cases, seed=args.seed, max_grid=args.max_grid)
+        print_report(report)
+        reports.append(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    sys.exit(1 if any(r['divergences'] for r in reports) else 0)
+
+
+if __name__ == "__main__":
+    main()
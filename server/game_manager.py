@@ -1,47 +1,651 @@
-from compute import generate_initial_grid, compute_game_turn
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compute import (
+    generate_initial_grid, compute_game_turn, compute_game_turn_stream,
+    PendingTurn, resolve_pending_turn
+)
+from parallel_compute import compute_game_turn_tiled, TILE_SIZE
+from world import ChunkedWorld, shuffled_positions, DENSE_AREA_LIMIT, CHUNK_SIZE
+from metrics_history import MetricsHistory
+
+# Versions des tuiles d'affichage (voir tile_updates) : une grille remplacée sans
+# savoir ce qui a changé (nouvelle partie, restore) repart au-dessus de l'horloge
+# (millisecondes x TILE_VERSIONS_PER_MS), jamais en dessous d'une version déjà donnée :
+# un `since` d'une autre partie ou d'un ancien état ne passe pas pour récent.
+TILE_VERSIONS_PER_MS = 1024
 
 class GameManager:
-    def __init__(self, players, grid_size, start_weight, number_of_vitamins):
+    def __init__(self, players, grid_size, start_weight, number_of_vitamins,
+                 tile_workers=0, tile_size=TILE_SIZE, current_grid=None, turn=0):
         """
         Initialise une partie avec une grille de départ
+
+        :param tile_workers: si > 0, chaque tour est calculé par tuiles dans un pool de
+            tile_workers processus (voir parallel_compute.py)
+        :param current_grid: (optionnel) grille à reprendre au lieu d'en générer une
+            (voir from_snapshot)
         """
         self.grid_size = grid_size
         self.number_of_vitamins = number_of_vitamins
         self.players = players
         self.start_weight = start_weight
+        self.tile_workers = tile_workers
+        self.tile_size = tile_size
+        self._tile_executor = None
+        # Numéro du tour courant (0 = grille initiale)
+        self.turn = turn
         # On génère la grille initiale
-        self.current_grid = generate_initial_grid(
-            players, grid_size, start_weight, number_of_vitamins
-        )
+        if current_grid is None:
+            current_grid = generate_initial_grid(
+                players, grid_size, start_weight, number_of_vitamins
+            )
+        self.current_grid = current_grid
+        # Index spatial creux et cellules par joueur (construits à la demande, voir world)
+        self._world = None
+        self._by_player = None
+        # Tour suivant préparé à l'avance (voir prepare_next_turn)
+        self._pending = None
+        self._vitamin_candidates = None
+        self._turn_lock = threading.Lock()
+        # Plans NumPy (voir planes), tenus à jour par _advance une fois construits,
+        # et indice de chaque joueur dans leur première dimension
+        self._planes = None
+        self._plane_index = None
+        # Agrégats par joueur (voir leaderboard), mis à jour à chaque tour, et leur
+        # historique (un point par tour, voir metrics_history.py)
+        self.vitamins_eaten = dict.fromkeys(players, 0)
+        self.history = MetricsHistory(players, first_turn=turn)
+        self._update_aggregates()
+        # Tuiles d'affichage (voir tile_updates) : version courante de la partie,
+        # version à laquelle chaque tuile a changé pour la dernière fois (les tuiles
+        # absentes sont à _tiles_base) et tuiles changées par le dernier tour
+        self.tiles_version = 0
+        self._reset_tiles()
 
     def reset(self):
         """
         Ré-initialise la grille (optionnel si vous voulez relancer une partie).
         """
-        self.current_grid = generate_initial_grid(
-            self.players, 
-            self.grid_size, 
-            self.start_weight, 
-            self.number_of_vitamins
-        )
+        with self._turn_lock:
+            self.current_grid = generate_initial_grid(
+                self.players, 
+                self.grid_size, 
+                self.start_weight, 
+                self.number_of_vitamins
+            )
+            self.turn = 0
+            self._world = None
+            self._by_player = None
+            self._planes = None
+            self._pending = None
+            self.vitamins_eaten = dict.fromkeys(self.players, 0)
+            self.history.clear(0)
+            self._update_aggregates()
+            self._reset_tiles()
+
+    def restore(self, grid, turn, vitamins_eaten=None, tiles=None, history=None):
+        """
+        Remplace la grille courante par un état publié ailleurs (ex : shared_state).
+        Poids et nombres de cellules sont recalculés depuis la grille ; les vitamines
+        mangées viennent de vitamins_eaten ({joueur: nombre}, celles de l'état publié),
+        sinon elles ne sont pas connues et les compteurs repartent de zéro.
+        L'historique reprend history (to_dict de l'historique publié, voir
+        MetricsHistory.merge), sinon reçoit le point de ce tour (et recommence s'il ne
+        suit pas).
+        Les versions des tuiles viennent de tiles (tiles_state() de l'état publié),
+        sinon toutes les tuiles passent à une nouvelle version.
+        """
+        with self._turn_lock:
+            self.current_grid = grid
+            self.turn = turn
+            self._world = None
+            self._by_player = None
+            self._planes = None
+            self._pending = None
+            self.vitamins_eaten = dict.fromkeys(self.players, 0)
+            if vitamins_eaten:
+                self.vitamins_eaten.update(vitamins_eaten)
+            if history is not None:
+                self.history.merge(history)
+            self._update_aggregates()
+            if tiles is not None:
+                self._load_tiles(tiles)
+            else:
+                self._reset_tiles()
+
+    def _advance(self, new_grid, touched, eaten):
+        # Fin d'un tour : nouvelle grille ; index spatial, agrégats et versions des
+        # tuiles mis à jour case par case, sans parcourir la grille (touched :
+        # {(x, y): nouvelle cellule ou None}, eaten : {joueur: vitamines mangées},
+        # remplis par le moteur)
+        world = self.world  # celui de la grille d'avant (construit au besoin)
+        weights, counts = self.total_weights, self.cell_counts
+        changes = [] if self._planes is not None else None
+        for (x, y), cell in touched.items():
+            old = world.remove(x, y)
+            if changes is not None:
+                changes.append((x, y, old, cell))
+            if old is not None and old['player'] != 'vitamin':
+                weights[old['player']] -= old['weight']
+                counts[old['player']] -= 1
+            if cell is not None:
+                world.add(cell)
+                if cell['player'] != 'vitamin':
+                    weights[cell['player']] = weights.get(cell['player'], 0) + cell['weight']
+                    counts[cell['player']] = counts.get(cell['player'], 0) + 1
+        if changes is not None:
+            self._write_planes(changes)
+        for player, count in eaten.items():
+            self.vitamins_eaten[player] = self.vitamins_eaten.get(player, 0) + count
+        self.current_grid = new_grid
+        self.turn += 1
+        self._by_player = None
+        self._pending = None
+        self._record_history()
+        self.tiles_version += 1
+        dirty = {(x // CHUNK_SIZE, y // CHUNK_SIZE) for x, y in touched}
+        for tile in dirty:
+            self._tile_versions[tile] = self.tiles_version
+        self._dirty_tiles = dirty
+
+    def _reset_tiles(self):
+        # Grille remplacée sans savoir ce qui a changé : toutes les tuiles changent
+        epoch = time.time_ns() // 1_000_000 * TILE_VERSIONS_PER_MS
+        self.tiles_version = max(self.tiles_version + 1, epoch)
+        self._tiles_base = self.tiles_version
+        self._tile_versions = {}
+        self._dirty_tiles = set()
+
+    def tiles_state(self):
+        """
+        Versions des tuiles (sérialisables en JSON) : dict(version, base, tiles
+        [[tx, ty, version], ...]), les tuiles absentes étant à base.
+        """
+        return {
+            'version': self.tiles_version,
+            'base': self._tiles_base,
+            'tiles': [[tx, ty, version] for (tx, ty), version in self._tile_versions.items()]
+        }
+
+    def _load_tiles(self, state):
+        self.tiles_version = state['version']
+        self._tiles_base = state['base']
+        self._tile_versions = {(tx, ty): version for tx, ty, version in state['tiles']}
+        self._dirty_tiles = {tile for tile, version in self._tile_versions.items()
+                             if version == self.tiles_version}
+
+    def _update_aggregates(self):
+        """
+        Recalcule poids total et nombre de cellules par joueur en un passage sur la
+        grille, quand elle est remplacée d'un bloc (nouvelle partie, restore) ; après
+        un tour, _advance les met à jour à partir des seules cases modifiées.
+        """
+        weights = dict.fromkeys(self.players, 0)
+        counts = dict.fromkeys(self.players, 0)
+        for cell in self.current_grid:
+            player = cell['player']
+            if player == 'vitamin':
+                continue
+            weights[player] = weights.get(player, 0) + cell['weight']
+            counts[player] = counts.get(player, 0) + 1
+        self.total_weights = weights
+        self.cell_counts = counts
+        self._record_history()
+
+    def _record_history(self):
+        # (le point du tour peut déjà être là : reçu avec l'historique publié, voir restore)
+        if not self.history.rows or self.history.last_turn != self.turn:
+            self.history.record(self.turn, {
+                'weight': self.total_weights, 'cells': self.cell_counts,
+                'vitamins_eaten': self.vitamins_eaten
+            })
+
+    @property
+    def world(self):
+        """
+        Grille courante sous forme de ChunkedWorld (chunks ne contenant que les cases
+        occupées) : la mémoire et les recherches dépendent du nombre de cellules,
+        pas de grid_size ** 2. Construit au besoin quand la grille est remplacée d'un
+        bloc, puis tenu à jour à chaque tour à partir des cases modifiées.
+        """
+        if self._world is None:
+            self._world = ChunkedWorld.from_cells(self.grid_size, self.current_grid)
+            self._by_player = None
+        return self._world
+
+    def cells_of(self, player):
+        """
+        Retourne les cellules d'un joueur (index construit une fois par tour).
+        """
+        if self._by_player is None:
+            by_player = {}
+            for cell in self.current_grid:
+                by_player.setdefault(cell['player'], []).append(cell)
+            self._by_player = by_player
+        return self._by_player.get(player, [])
+
+    def view(self, player, radius):
+        """
+        Retourne les cellules à distance <= radius (en x et en y) d'au moins une
+        cellule de player, ses propres cellules comprises : une fenêtre par cellule,
+        lue dans l'index spatial, sans parcourir la grille entière.
+        """
+        if radius >= self.grid_size:
+            return self.current_grid if self.cells_of(player) else []
+        seen = {}
+        for cell in self.cells_of(player):
+            x, y = cell['x'], cell['y']
+            for other in self.world.cells_in_rect(x - radius, y - radius, x + radius, y + radius):
+                seen[(other['x'], other['y'])] = other
+        return list(seen.values())
+
+    def planes(self):
+        """
+        Grille courante sous forme de tableaux NumPy denses, indexés [y, x] :
+          - 'weight'   : int32 (len(players), grid_size, grid_size), poids de chaque joueur
+                         (dans l'ordre de players)
+          - 'vitamin'  : bool (grid_size, grid_size)
+          - 'occupied' : bool (grid_size, grid_size)
+        Construits au premier appel (un passage sur la grille), puis réécrits sur place
+        à chaque tour pour les seules cases modifiées (voir _advance) ; remplacement de
+        la grille (reset, restore) : reconstruits au prochain appel. Les tableaux sont
+        en lecture seule et changent au tour suivant (les copier pour garder un tour).
+        Lève ValueError si la grille contient un joueur absent de players (il n'a pas
+        de plan).
+        """
+        if self._planes is None:
+            if self.grid_size * self.grid_size > DENSE_AREA_LIMIT:
+                raise ValueError(f"Plateau trop grand pour des plans denses ({self.grid_size}x{self.grid_size})")
+            import numpy as np
+
+            index = {p: i for i, p in enumerate(self.players)}
+            for cell in self.current_grid:
+                if cell['player'] != 'vitamin' and cell['player'] not in index:
+                    raise ValueError(f"Joueur '{cell['player']}' absent de la partie "
+                                     f"(joueurs : {', '.join(self.players)}) : pas de plan")
+            size = self.grid_size
+            self._planes = {
+                'weight': np.zeros((len(self.players), size, size), dtype=np.int32),
+                'vitamin': np.zeros((size, size), dtype=bool),
+                'occupied': np.zeros((size, size), dtype=bool),
+            }
+            self._plane_index = index
+            self._write_planes((c['x'], c['y'], None, c) for c in self.current_grid)
+        return self._planes
+
+    def _write_planes(self, changes):
+        # Réécrit les cases changes [(x, y, ancienne cellule ou None, nouvelle ou None)]
+        # (les cellules d'un tour viennent de celles de la grille : leurs joueurs ont
+        # tous un plan, vérifié à la construction)
+        index = self._plane_index
+        planes = self._planes
+        weight, vitamin, occupied = planes['weight'], planes['vitamin'], planes['occupied']
+        for array in planes.values():
+            array.flags.writeable = True
+        for x, y, old, new in changes:
+            if old is not None:
+                if old['player'] == 'vitamin':
+                    vitamin[y, x] = False
+                else:
+                    weight[index[old['player']], y, x] = 0
+                occupied[y, x] = False
+            if new is not None:
+                if new['player'] == 'vitamin':
+                    vitamin[y, x] = True
+                else:
+                    weight[index[new['player']], y, x] = new['weight']
+                occupied[y, x] = True
+        for array in planes.values():
+            array.flags.writeable = False
+
+    def tile_updates(self, since=None):
+        """
+        Contenu des tuiles d'affichage (carrés de CHUNK_SIZE cases, les chunks de
+        world) changées depuis la version `since` de la partie, pour qu'un front ne
+        redessine que celles-ci. Chaque tour incrémente tiles_version et y place les
+        tuiles qu'il a modifiées (déplacements, fusions, vitamines, voir le paramètre
+        touched de compute_game_turn).
 
-    def apply_moves(self, cells_moves):
+        Sans since, ou si la grille a été remplacée depuis (reset, restore), la
+        réponse est complète (full) : toutes les tuiles non vides, les autres sont
+        vides. Une tuile changée peut être vide (cells == []).
+        :return: dict(version, since, full, tile_size, tiles [{tx, ty, version, cells}])
+        """
+        full = since is None or since < self._tiles_base or since > self.tiles_version
+        world = self.world
+        if full:
+            tiles = world.chunks.keys()
+        elif since == self.tiles_version - 1:
+            tiles = self._dirty_tiles
+        else:
+            tiles = [tile for tile, version in self._tile_versions.items() if version > since]
+        return {
+            'version': self.tiles_version,
+            'since': None if full else since,
+            'full': full,
+            'tile_size': world.chunk_size,
+            'tiles': [
+                {
+                    'tx': tx,
+                    'ty': ty,
+                    'version': self._tile_versions.get((tx, ty), self._tiles_base),
+                    'cells': list(world.chunks.get((tx, ty), {}).values())
+                }
+                for tx, ty in sorted(tiles)
+            ]
+        }
+
+    def cell_at(self, x, y):
+        """
+        Retourne la cellule en (x, y) ou None.
+        """
+        return self.world.get(x, y)
+
+    def cells_in_rect(self, x0, y0, x1, y1):
+        """
+        Retourne les cellules du rectangle [x0, x1] x [y0, y1].
+        """
+        return self.world.cells_in_rect(x0, y0, x1, y1)
+
+    def apply_moves(self, cells_moves, rejected=None, max_moves_per_player=None, seed=None):
         """
         Applique un tour de jeu et met à jour la grille courante
         :param cells_moves: liste de moves (dict)
+        :param rejected: (optionnel) liste qui reçoit les moves refusés et leur raison
+            (voir compute.validate_moves)
+        :param max_moves_per_player: (optionnel) nombre maximum de moves lus par joueur
+        :param seed: (optionnel) graine du tour : égalités et vitamines en sont tirées,
+            le tour est alors rejouable à l'identique (voir lockstep.py)
         :return: (move_animation, new_grid)
+
+        Sous _turn_lock, comme close_turn : un prepare_next_turn en cours ne peut pas
+        installer un tour préparé sur la grille d'avant ce tour.
         """
-        move_animation, new_grid = compute_game_turn(
-            self.grid_size,
-            self.number_of_vitamins,
-            self.current_grid,
-            cells_moves
-        )
-        self.current_grid = new_grid
+        rng = random.Random(seed) if seed is not None else None
+        with self._turn_lock:
+            touched, eaten = {}, {}
+            if self.tile_workers > 0:
+                if self._tile_executor is None:
+                    self._tile_executor = ProcessPoolExecutor(max_workers=self.tile_workers)
+                # Les égalités sont tirées par case : le résultat ne dépend pas du découpage
+                move_animation, new_grid = compute_game_turn_tiled(
+                    self.grid_size,
+                    self.number_of_vitamins,
+                    self.current_grid,
+                    cells_moves,
+                    tie_seed=random.getrandbits(64) if seed is None else seed,
+                    tile_size=self.tile_size,
+                    executor=self._tile_executor,
+                    rejected=rejected,
+                    max_moves_per_player=max_moves_per_player,
+                    rng=rng,
+                    touched=touched,
+                    eaten=eaten
+                )
+            else:
+                move_animation, new_grid = compute_game_turn(
+                    self.grid_size,
+                    self.number_of_vitamins,
+                    self.current_grid,
+                    cells_moves,
+                    tie_seed=seed,
+                    rejected=rejected,
+                    max_moves_per_player=max_moves_per_player,
+                    rng=rng,
+                    touched=touched,
+                    eaten=eaten
+                )
+            self._advance(new_grid, touched, eaten)
         return move_animation, new_grid
 
+    def apply_moves_stream(self, cells_moves, rejected=None, max_moves_per_player=None, seed=None):
+        """
+        Comme apply_moves, mais move_animation est un itérateur dont les entrées sont
+        produites au fur et à mesure (pour une réponse NDJSON). La grille courante est
+        mise à jour dès le retour, que l'itérateur soit consommé ou non.
+        :return: (move_animation_iter, new_grid)
+        """
+        if self.tile_workers > 0:
+            move_animation, new_grid = self.apply_moves(cells_moves, rejected, max_moves_per_player, seed)
+            return iter(move_animation), new_grid
+        with self._turn_lock:
+            touched, eaten = {}, {}
+            move_animation, new_grid = compute_game_turn_stream(
+                self.grid_size,
+                self.number_of_vitamins,
+                self.current_grid,
+                cells_moves,
+                tie_seed=seed,
+                rejected=rejected,
+                max_moves_per_player=max_moves_per_player,
+                rng=random.Random(seed) if seed is not None else None,
+                touched=touched,
+                eaten=eaten
+            )
+            self._advance(new_grid, touched, eaten)
+        return move_animation, new_grid
+
+    def prepare_next_turn(self):
+        """
+        Prépare le tour suivant hors du chemin critique (à appeler juste après un tour,
+        par ex. en tâche de fond) : index (x, y, player) -> weight de la grille pour
+        valider les moves à leur arrivée, et ordre aléatoire des cases pour la
+        réapparition des vitamines (plateaux denses ; les très grands plateaux
+        tirent déjà leurs cases sans parcourir toute la grille).
+        """
+        # L'ordre des cases ne dépend pas de la grille : tiré hors du verrou, pour ne
+        # pas bloquer les envois de moves pendant le mélange
+        candidates = self._vitamin_order() if self._vitamin_candidates is None else None
+        with self._turn_lock:
+            self._prepare_locked()
+            if self._vitamin_candidates is None:
+                self._vitamin_candidates = candidates
+
+    def _prepare_locked(self):
+        if self._pending is None:
+            self._pending = PendingTurn(self.grid_size, self.current_grid)
+
+    def _vitamin_order(self):
+        # Cases dans un ordre aléatoire (plateaux denses seulement), voir resolve_pending_turn
+        if self.grid_size * self.grid_size <= DENSE_AREA_LIMIT:
+            return shuffled_positions(self.grid_size)
+        return None
+
+    def submit_moves(self, cells_moves, max_moves_per_player=None):
+        """
+        Valide tout de suite des moves du tour en cours (un nouvel envoi d'un joueur
+        remplace le précédent) ; ils seront joués par close_turn.
+        :return: liste des moves refusés avec leur raison
+        """
+        with self._turn_lock:
+            self._prepare_locked()
+            return self._pending.submit(cells_moves, max_moves_per_player)
+
+    def close_turn(self, stream=False):
+        """
+        Joue les moves reçus par submit_moves : il ne reste que les collisions et la
+        réapparition des vitamines. Le tour suivant n'est pas préparé ici (voir
+        prepare_next_turn), pour ne pas retarder la réponse.
+        Toujours calculé en séquentiel, même avec tile_workers.
+        :return: (move_animation, new_grid), move_animation étant un itérateur si stream
+        """
+        candidates = self._vitamin_candidates
+        if candidates is None:
+            candidates = self._vitamin_order()  # hors du verrou, voir prepare_next_turn
+        with self._turn_lock:
+            self._prepare_locked()
+            touched, eaten = {}, {}
+            move_animation, new_grid = resolve_pending_turn(
+                self.grid_size,
+                self.number_of_vitamins,
+                self._pending,
+                vitamin_candidates=candidates,
+                touched=touched,
+                eaten=eaten
+            )
+            self._advance(new_grid, touched, eaten)
+            self._vitamin_candidates = None
+        if not stream:
+            move_animation = list(move_animation)
+        return move_animation, new_grid
+
+    def close(self):
+        """
+        Arrête le pool de processus du calcul par tuiles, s'il a été lancé (il serait
+        recréé si la partie jouait encore un tour). À appeler quand la partie est
+        remplacée, retirée ou écrite sur disque.
+        """
+        with self._turn_lock:
+            executor, self._tile_executor = self._tile_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def alive_players(self):
+        """
+        Joueurs qui ont encore au moins une cellule.
+        """
+        return [p for p in self.players if self.cell_counts.get(p, 0) > 0]
+
+    def is_over(self):
+        """
+        La partie est finie quand il reste au plus un joueur (à plusieurs joueurs).
+        """
+        return len(self.players) > 1 and len(self.alive_players()) <= 1
+
+    def winner(self):
+        """
+        Seul joueur restant si la partie est finie, sinon None.
+        """
+        alive = self.alive_players()
+        return alive[0] if self.is_over() and alive else None
+
+    def leaderboard(self):
+        """
+        Agrégats par joueur, du plus lourd au plus léger :
+        [{'player', 'weight', 'cells', 'vitamins_eaten'}, ...]
+        """
+        rows = [
+            {
+                'player': player,
+                'weight': self.total_weights.get(player, 0),
+                'cells': self.cell_counts.get(player, 0),
+                'vitamins_eaten': self.vitamins_eaten.get(player, 0),
+            }
+            for player in self.players
+        ]
+        rows.sort(key=lambda row: -row['weight'])
+        return rows
+
+    def memory_usage(self):
+        """
+        Estimation (en octets) de la mémoire occupée par la partie : grille courante,
+        index spatial et plans NumPy s'ils sont construits, historique des agrégats,
+        et caches du tour : ordre des cases pour les vitamines, cellules par joueur,
+        tour préparé (index de la grille et moves reçus, voir prepare_next_turn).
+        Retourne dict(grid, world, planes, history, vitamin_candidates, by_player,
+        pending, total).
+        """
+        usage = {'grid': _sizeof_list(self.current_grid)}
+        world = 0
+        if self._world is not None:
+            world = sys.getsizeof(self._world.chunks)
+            for chunk in self._world.chunks.values():
+                # (cellules comprises : celles des cases inchangées depuis la
+                # construction de l'index ne sont plus celles de la grille)
+                pos, cell = next(iter(chunk.items()))
+                world += sys.getsizeof(chunk) + len(chunk) * (_sizeof_item(pos) + _sizeof_item(cell))
+        usage['world'] = world
+        usage['planes'] = 0
+        if self._planes is not None:
+            usage['planes'] = sum(array.nbytes for array in self._planes.values())
+        usage['history'] = self.history.nbytes()
+        usage['vitamin_candidates'] = _sizeof_list(self._vitamin_candidates or [])
+        by_player = 0
+        if self._by_player is not None:
+            # (les cellules sont celles de la grille)
+            by_player = sys.getsizeof(self._by_player)
+            by_player += sum(sys.getsizeof(cells) for cells in self._by_player.values())
+        usage['by_player'] = by_player
+        pending = 0
+        if self._pending is not None:
+            lookup = self._pending.original_lookup
+            pending = sys.getsizeof(lookup)
+            if lookup:
+                pending += len(lookup) * _sizeof_item(next(iter(lookup)))
+            for moves in self._pending.valid_by_player.values():
+                pending += _sizeof_list(moves)
+        usage['pending'] = pending
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def snapshot(self):
+        """
+        État compact de la partie (sérialisable en JSON) : les cellules sont des
+        [x, y, weight, index du joueur] (-1 pour une vitamine).
+        """
+        index = {p: i for i, p in enumerate(self.players)}
+        return {
+            'players': list(self.players),
+            'grid_size': self.grid_size,
+            'start_weight': self.start_weight,
+            'number_of_vitamins': self.number_of_vitamins,
+            'turn': self.turn,
+            'vitamins_eaten': [self.vitamins_eaten.get(p, 0) for p in self.players],
+            'history': self.history.to_dict(),
+            'tiles': self.tiles_state(),
+            'cells': [
+                [c['x'], c['y'], c['weight'], -1 if c['player'] == 'vitamin' else index[c['player']]]
+                for c in self.current_grid
+            ]
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        """
+        Recrée une partie à partir de snapshot().
+        """
+        players = snapshot['players']
+        grid = [
+            {'x': x, 'y': y, 'weight': w, 'player': 'vitamin' if p < 0 else players[p]}
+            for x, y, w, p in snapshot['cells']
+        ]
+        game = cls(players, snapshot['grid_size'], snapshot['start_weight'],
+                   snapshot['number_of_vitamins'], current_grid=grid,
+                   turn=snapshot['turn'], **kwargs)
+        game.vitamins_eaten = dict(zip(players, snapshot.get('vitamins_eaten', [0] * len(players))))
+        if 'history' in snapshot:
+            game.history = MetricsHistory.from_dict(players, snapshot['history'])
+        if 'tiles' in snapshot:
+            game._load_tiles(snapshot['tiles'])
+        return game
+
     def get_state(self):
         """
         Retourne la grille courante.
         """
-        return self.current_grid
\ No newline at end of file
+        return self.current_grid
+
+
+def _sizeof_item(item):
+    # Taille d'un élément et de ce qu'il contient (tuples, dict, listes imbriqués) ;
+    # les petits entiers et les noms de joueurs sont partagés, pas comptés
+    size = sys.getsizeof(item)
+    if isinstance(item, dict):
+        return size + sum(_sizeof_item(v) for v in item.values())
+    if isinstance(item, (tuple, list)):
+        return size + sum(_sizeof_item(v) for v in item)
+    if isinstance(item, int) and not -5 <= item <= 256:
+        return size
+    return 0 if isinstance(item, (int, str)) else size
+
+
+def _sizeof_list(items):
+    # Liste d'éléments de même forme : un seul est mesuré
+    size = sys.getsizeof(items)
+    if items:
+        size += len(items) * _sizeof_item(items[-1])
+    return size
@@ -0,0 +1,348 @@
+# game_registry.py
+#
+# Parties identifiées par un game_id, et réserve de parties pré-générées par jeu de
+# paramètres : créer une partie courante revient à retirer un GameManager déjà prêt
+# d'une file (O(1)) ; un thread de fond regarnit la réserve.
+#
+# Le registre estime la mémoire de chaque partie et peut écrire sur disque (snapshot
+# compact) les parties inactives les moins récemment utilisées ; elles sont rechargées
+# d'elles-mêmes à la requête suivante.
+
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from urllib.parse import quote
+
+from game_manager import GameManager
+
+
+def params_key(players, grid_size, start_weight, number_of_vitamins):
+    """
+    Clé d'un jeu de paramètres (utilisable dans un dict).
+    """
+    return (tuple(players), grid_size, start_weight, number_of_vitamins)
+
+
+class WarmPool:
+    def __init__(self, targets=None):
+        """
+        :param targets: {params_key: nombre de parties à garder prêtes}
+        """
+        self.targets = dict(targets or {})
+        self.games = defaultdict(deque)
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Construit la réserve depuis une liste de dict (ex : JSON de GAME_WARM_POOL) :
+        [{"players": [...], "grid_size": 10, "start_weight": 6,
+          "number_of_vitamins": 5, "size": 8}, ...]
+        """
+        targets = {}
+        for entry in config:
+            key = params_key(entry['players'], entry['grid_size'],
+                             entry['start_weight'], entry['number_of_vitamins'])
+            targets[key] = entry.get('size', 1)
+        return cls(targets)
+
+    def ready(self, key):
+        """
+        Nombre de parties prêtes pour ce jeu de paramètres.
+        """
+        return len(self.games.get(key, ()))
+
+    def take(self, key):
+        """
+        Retire une partie prête, ou en génère une tout de suite si la réserve est vide.
+        """
+        with self.lock:
+            queue = self.games.get(key)
+            game = queue.popleft() if queue else None
+        if key in self.targets:
+            self._wakeup.set()
+        if game is None:
+            game = GameManager(list(key[0]), key[1], key[2], key[3])
+        return game
+
+    def fill(self):
+        """
+        Complète chaque file jusqu'à sa taille cible (la génération se fait hors verrou).
+        """
+        for key, size in list(self.targets.items()):
+            while self.ready(key) < size:
+                game = GameManager(list(key[0]), key[1], key[2], key[3])
+                with self.lock:
+                    self.games[key].append(game)
+
+    def start(self):
+        """
+        Lance le thread qui regarnit la réserve à chaque prélèvement.
+        """
+        if self._thread is not None or not self.targets:
+            return
+
+        def run():
+            while True:
+                self.fill()
+                self._wakeup.wait()
+                self._wakeup.clear()
+
+        self._thread = threading.Thread(target=run, name="warm-pool", daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+
+
+class GameRegistry:
+    def __init__(self, pool=None, snapshot_dir=None, memory_budget=None,
+                 idle_seconds=300, pinned=()):
+        """
+        :param snapshot_dir: dossier des parties évincées (None = pas d'éviction)
+        :param memory_budget: mémoire visée (octets) pour les parties en mémoire ;
+            None = évincer toutes les parties inactives
+        :param idle_seconds: une partie n'est évincée qu'après ce délai sans requête
+            (une requête en cours ne doit pas durer plus longtemps)
+        :param pinned: game_id jamais évincés (ex : la partie par défaut)
+        """
+        self.pool = pool if pool is not None else WarmPool()
+        self.snapshot_dir = snapshot_dir
+        self.memory_budget = memory_budget
+        self.idle_seconds = idle_seconds
+        self.pinned = set(pinned)
+        self.games = {}
+        self.last_access = {}
+        self.evicted = set()  # game_id dont le snapshot est sur disque
+        self.evictions = 0
+        self.reloads = 0
+        # lock protège les dict ci-dessus et n'est jamais tenu pendant une écriture,
+        # une lecture de snapshot ou la génération d'une partie ; io_locks (un verrou
+        # par partie, voir _io_lock) sérialise éviction et rechargement d'une même
+        # partie, sans faire attendre les autres
+        self.lock = threading.Lock()
+        self.io_locks = {}
+        self._janitor = None
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+
+    def create(self, players, grid_size, start_weight, number_of_vitamins, game_id=None):
+        """
+        Crée (ou remplace) une partie ; retourne (game_id, GameManager).
+        """
+        game = self.pool.take(params_key(players, grid_size, start_weight, number_of_vitamins))
+        game_id = game_id or uuid.uuid4().hex
+        with self.lock:
+            self._forget_snapshot(game_id)
+            replaced = self.games.get(game_id)
+            self.games[game_id] = game
+            self.last_access[game_id] = time.monotonic()
+        if replaced is not None and replaced is not game:
+            replaced.close()
+        return game_id, game
+
+    def create_many(self, count, players, grid_size, start_weight, number_of_vitamins):
+        """
+        Crée `count` parties identiques ; retourne [(game_id, GameManager), ...].
+        """
+        return [self.create(players, grid_size, start_weight, number_of_vitamins)
+                for _ in range(count)]
+
+    def get(self, game_id):
+        """
+        Retourne la partie (rechargée depuis le disque si elle avait été évincée) ou None.
+        """
+        with self.lock:
+            game = self._touch(game_id)
+            if game is not None or game_id not in self.evicted:
+                return game
+        return self._reload(game_id)
+
+    def get_or_create(self, game_id, players, grid_size, start_weight, number_of_vitamins):
+        """
+        Retourne la partie game_id, créée avec ces paramètres si elle n'existe pas.
+        La partie est prise (ou générée) hors verrou ; si un autre appel l'a créée
+        entre-temps, c'est la sienne qui est retournée.
+        """
+        while True:
+            game = self.get(game_id)
+            if game is not None:
+                return game
+            new_game = self.pool.take(params_key(players, grid_size, start_weight, number_of_vitamins))
+            with self.lock:
+                if game_id not in self.games and game_id not in self.evicted:
+                    self.games[game_id] = new_game
+                    self.last_access[game_id] = time.monotonic()
+                    return new_game
+
+    def remove(self, game_id):
+        with self.lock:
+            self._forget_snapshot(game_id)
+            self.last_access.pop(game_id, None)
+            self.io_locks.pop(game_id, None)
+            game = self.games.pop(game_id, None)
+        if game is not None:
+            game.close()
+        return game
+
+    def __len__(self):
+        return len(self.games) + len(self.evicted)
+
+    def _touch(self, game_id):
+        game = self.games.get(game_id)
+        if game is not None:
+            self.last_access[game_id] = time.monotonic()
+        return game
+
+    def _io_lock(self, game_id):
+        with self.lock:
+            return self.io_locks.setdefault(game_id, threading.Lock())
+
+    def _snapshot_path(self, game_id):
+        return os.path.join(self.snapshot_dir, quote(game_id, safe='') + '.json.gz')
+
+    def _reload(self, game_id):
+        # Lecture du snapshot hors de self.lock ; la partie n'est publiée que si elle
+        # est toujours évincée (pas remplacée ni supprimée pendant la lecture)
+        path = self._snapshot_path(game_id)
+        with self._io_lock(game_id):
+            with self.lock:
+                game = self._touch(game_id)
+                if game is not None or game_id not in self.evicted:
+                    return game
+            try:
+                with gzip.open(path, 'rt') as f:
+                    game = GameManager.from_snapshot(json.load(f))
+            except FileNotFoundError:
+                game = None
+            with self.lock:
+                if game_id not in self.evicted:
+                    return self._touch(game_id)
+                if game is None:
+                    raise FileNotFoundError(path)
+                os.remove(path)
+                self.evicted.discard(game_id)
+                self.games[game_id] = game
+                self.last_access[game_id] = time.monotonic()
+                self.reloads += 1
+                return game
+
+    def _forget_snapshot(self, game_id):
+        if game_id in self.evicted:
+            os.remove(self._snapshot_path(game_id))
+            self.evicted.discard(game_id)
+
+    def memory_usage(self):
+        """
+        {game_id: octets estimés} des parties en mémoire.
+        """
+        return {game_id: game.memory_usage()['total'] for game_id, game in list(self.games.items())}
+
+    def evict(self):
+        """
+        Écrit sur disque les parties inactives depuis idle_seconds, de la moins
+        récemment utilisée à la plus récente, jusqu'à revenir sous memory_budget.
+        Retourne la liste des game_id évincés.
+
+        Les parties sont choisies sous verrou, puis chacune est écrite hors verrou,
+        sous son seul verrou d'entrées-sorties (un rechargement d'une autre partie
+        n'attend pas la fin du passage), et retirée seulement si personne ne l'a
+        utilisée pendant l'écriture.
+        """
+        if not self.snapshot_dir:
+            return []
+        with self.lock:
+            usage = self.memory_usage()
+            total = sum(usage.values())
+            now = time.monotonic()
+            idle = sorted(
+                (self.last_access.get(game_id, 0), game_id) for game_id in self.games
+                if game_id not in self.pinned
+                and now - self.last_access.get(game_id, 0) >= self.idle_seconds
+            )
+            victims = []
+            for last_access, game_id in idle:
+                if self.memory_budget is not None and total <= self.memory_budget:
+                    break
+                victims.append((game_id, self.games[game_id], last_access))
+                total -= usage[game_id]
+
+        evicted = []
+        for game_id, game, last_access in victims:
+            if self._evict_one(game_id, game, last_access):
+                evicted.append(game_id)
+        return evicted
+
+    def _evict_one(self, game_id, game, last_access):
+        path = self._snapshot_path(game_id)
+        with self._io_lock(game_id):
+            with self.lock:
+                if not self._unused(game_id, game, last_access):
+                    return False  # (déjà évincée par un autre passage, ou reprise)
+            with gzip.open(path + '.tmp', 'wt') as f:
+                json.dump(game.snapshot(), f, separators=(',', ':'))
+            with self.lock:
+                unused = self._unused(game_id, game, last_access)
+                if unused:
+                    os.replace(path + '.tmp', path)
+                    del self.games[game_id]
+                    self.evicted.add(game_id)
+                    self.evictions += 1
+            if not unused:
+                os.remove(path + '.tmp')
+                return False
+        game.close()
+        return True
+
+    def _unused(self, game_id, game, last_access):
+        return self.games.get(game_id) is game and self.last_access.get(game_id, 0) == last_access
+
+    def start_janitor(self, interval=30):
+        """
+        Lance un thread qui appelle evict() toutes les `interval` secondes.
+        """
+        if self._janitor is not None or not self.snapshot_dir:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.evict()
+
+        self._janitor = threading.Thread(target=run, name="game-janitor", daemon=True)
+        self._janitor.start()
+
+    def diagnostics(self):
+        """
+        Mémoire estimée et activité de chaque partie en mémoire, et compteurs globaux.
+        """
+        now = time.monotonic()
+        with self.lock:
+            games = []
+            for game_id, game in self.games.items():
+                usage = game.memory_usage()
+                games.append({
+                    'game_id': game_id,
+                    'turn': game.turn,
+                    'cells': len(game.current_grid),
+                    'memory': usage,
+                    'idle_seconds': now - self.last_access.get(game_id, now),
+                })
+            games.sort(key=lambda g: -g['memory']['total'])
+            return {
+                'resident_games': len(self.games),
+                'evicted_games': len(self.evicted),
+                'resident_bytes': sum(g['memory']['total'] for g in games),
+                'memory_budget': self.memory_budget,
+                'idle_seconds': self.idle_seconds,
+                'evictions': self.evictions,
+                'reloads': self.reloads,
+                'warm_pool': {
+                    str(list(key)): self.pool.ready(key) for key in self.pool.targets
+                },
+                'games': games,
+            }
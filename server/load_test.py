@@ -0,0 +1,347 @@
+# load_test.py
+#
+# Générateur de charge pour server.py : des milliers de clients bots simulés dans une
+# seule boucle asyncio (une connexion HTTP/1.1 keep-alive chacun, sans thread ni
+# dépendance). Chaque client lit l'état de sa partie, en tire des moves pour ses
+# cellules, et les envoie.
+#
+#   uvicorn server:app --port 8000 &
+#   python load_test.py --clients 2000 --duration 60
+#   python load_test.py --clients 500 --games 50 --view-radius 5 --json load.json
+#   python load_test.py --clients 200 --pipelined --close-interval 0.5
+#
+# Toutes les --report-interval secondes : requêtes/s, latences (p50/p95/p99) et taux
+# d'erreurs par endpoint ; un résumé global à la fin.
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+DIRECTIONS = (('move_up', 0, -1), ('move_down', 0, 1), ('move_left', -1, 0),
+              ('move_right', 1, 0), ('move_stay', 0, 0))
+
+
+class HttpConnection:
+    """
+    Connexion HTTP/1.1 keep-alive minimale (corps JSON, réponses à Content-Length ou
+    chunked), rouverte après une erreur.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        """
+        Retourne (status, corps en bytes).
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            data = b'' if body is None else json.dumps(body).encode()
+            head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n")
+            self.writer.write(head.encode() + data)
+            await self.writer.drain()
+
+            status = int((await self.reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if headers.get('transfer-encoding') == 'chunked':
+                chunks = []
+                while True:
+                    size = int((await self.reader.readline()).strip(), 16)
+                    chunk = await self.reader.readexactly(size + 2)
+                    if size == 0:
+                        break
+                    chunks.append(chunk[:-2])
+                content = b''.join(chunks)
+            else:
+                content = await self.reader.readexactly(int(headers.get('content-length', 0)))
+            if headers.get('connection') == 'close':
+                self.close()
+            return status, content
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def random_moves(grid, player, grid_size, rng):
+    """
+    Moves « réalistes » tirés de la grille : chaque cellule de player part entière
+    dans une direction valide, ou se divise en deux parts (une sur place).
+    """
+    moves = []
+    for cell in grid:
+        if cell['player'] != player:
+            continue
+        x, y, weight = cell['x'], cell['y'], cell['weight']
+        valid = [d for d in DIRECTIONS if 0 <= x + d[1] < grid_size and 0 <= y + d[2] < grid_size]
+        move = {'x': x, 'y': y, 'player': player}
+        for name, _, _ in DIRECTIONS:
+            move[name] = 0
+        name = rng.choice(valid)[0]
+        if weight > 1 and rng.random() < 0.3:
+            move[name] += weight // 2
+            move['move_stay'] += weight - weight // 2
+        else:
+            move[name] += weight
+        moves.append(move)
+    return moves
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Stats:
+    """
+    Latences et erreurs par endpoint, pour la fenêtre en cours et pour tout le test.
+    """
+
+    def __init__(self):
+        self.window = defaultdict(list)
+        self.window_errors = defaultdict(int)
+        self.total = defaultdict(list)
+        self.total_errors = defaultdict(int)
+        self.intervals = []
+        self.started = time.perf_counter()
+        self.window_started = self.started
+
+    def record(self, endpoint, seconds, ok):
+        self.window[endpoint].append(seconds)
+        self.total[endpoint].append(seconds)
+        if not ok:
+            self.window_errors[endpoint] += 1
+            self.total_errors[endpoint] += 1
+
+    @staticmethod
+    def summarize(latencies, errors, seconds):
+        report = {}
+        for endpoint in sorted(set(latencies) | set(errors)):
+            values = sorted(latencies[endpoint])
+            report[endpoint] = {
+                'requests': len(values),
+                'per_second': len(values) / seconds if seconds else 0.0,
+                'errors': errors[endpoint],
+                'error_rate': errors[endpoint] / len(values) if values else 0.0,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': (values[-1] if values else 0.0) * 1000,
+            }
+        return report
+
+    def roll(self):
+        """
+        Clôt la fenêtre en cours ; retourne son résumé (aussi gardé dans intervals).
+        """
+        now = time.perf_counter()
+        interval = {
+            'elapsed': now - self.started,
+            'endpoints': self.summarize(self.window, self.window_errors, now - self.window_started),
+        }
+        self.intervals.append(interval)
+        self.window = defaultdict(list)
+        self.window_errors = defaultdict(int)
+        self.window_started = now
+        return interval
+
+    def overall(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'seconds': seconds,
+            'endpoints': self.summarize(self.total, self.total_errors, seconds),
+            'intervals': self.intervals,
+        }
+
+
+async def timed(stats, endpoint, connection, method, path, body=None, timeout=None):
+    """
+    Envoie une requête et l'enregistre ; retourne le JSON de la réponse, ou None en
+    cas d'erreur (statut >= 400, exception réseau, réponse qui n'est pas du JSON ou
+    délai dépassé : pas de réponse complète après timeout secondes, la connexion est
+    alors fermée et rouverte à la requête suivante).
+    """
+    started = time.perf_counter()
+    result = None
+    try:
+        status, content = await asyncio.wait_for(connection.request(method, path, body), timeout)
+        ok = status < 400
+        if ok and content:
+            result = json.loads(content)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+        ok, result = False, None
+    stats.record(endpoint, time.perf_counter() - started, ok)
+    return result
+
+
+async def run_client(args, host, port, game_id, player, stats, stop, rng):
+    connection = HttpConnection(host, port)
+    query = f"?game_id={game_id}"
+    # Clients décalés pour ne pas démarrer tous ensemble
+    await asyncio.sleep(rng.uniform(0, args.poll_interval))
+    try:
+        while not stop.is_set():
+            if args.view_radius is not None:
+                view = await timed(stats, 'GET /state/view', connection, 'GET',
+                                   f"/state/view{query}&player={player}&radius={args.view_radius}",
+                                   timeout=args.request_timeout)
+                grid = view['grid'] if view else None
+            else:
+                grid = await timed(stats, 'GET /state', connection, 'GET', f"/state{query}",
+                                   timeout=args.request_timeout)
+            if grid:
+                moves = random_moves(grid, player, args.grid_size, rng)
+                if moves and rng.random() < args.post_ratio:
+                    if args.pipelined:
+                        await timed(stats, 'POST /moves/submit', connection, 'POST',
+                                    f"/moves/submit{query}", moves, args.request_timeout)
+                    else:
+                        await timed(stats, 'POST /moves', connection, 'POST', f"/moves{query}", moves,
+                                    args.request_timeout)
+            await asyncio.sleep(args.poll_interval * rng.uniform(0.5, 1.5))
+    finally:
+        connection.close()
+
+
+async def run_closer(args, host, port, game_ids, stats, stop):
+    # Mode pipeliné : un « serveur Node » clôt les tours de chaque partie à intervalle fixe
+    connection = HttpConnection(host, port)
+    try:
+        while not stop.is_set():
+            await asyncio.sleep(args.close_interval)
+            for game_id in game_ids:
+                await timed(stats, 'POST /turn/close', connection, 'POST',
+                            f"/turn/close?game_id={game_id}", timeout=args.request_timeout)
+    finally:
+        connection.close()
+
+
+async def run_reporter(args, stats, stop):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), args.report_interval)
+        except asyncio.TimeoutError:
+            pass
+        print_interval(stats.roll())
+
+
+async def setup_games(args, host, port):
+    """
+    Crée les parties du test (--games) ; retourne leurs game_id.
+    """
+    connection = HttpConnection(host, port)
+    params = {'grid_size': args.grid_size, 'number_of_vitamins': args.vitamins,
+              'players': args.players, 'start_weight': args.start_weight}
+    try:
+        if args.games <= 1:
+            status, content = await connection.request('POST', '/init?game_id=default', params)
+            if status >= 400:
+                raise SystemExit(f"/init a échoué ({status}) : {content[:200]!r}")
+            return ['default']
+        status, content = await connection.request('POST', '/games/bulk', dict(params, count=args.games))
+        if status >= 400:
+            raise SystemExit(f"/games/bulk a échoué ({status}) : {content[:200]!r}")
+        return [game['game_id'] for game in json.loads(content)['games']]
+    finally:
+        connection.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    game_ids = await setup_games(args, host, port)
+    stats = Stats()
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+
+    tasks = []
+    for i in range(args.clients):
+        game_id = game_ids[i % len(game_ids)]
+        player = args.players[(i // len(game_ids)) % len(args.players)]
+        tasks.append(asyncio.ensure_future(
+            run_client(args, host, port, game_id, player, stats, stop, random.Random(rng.random()))
+        ))
+    if args.pipelined:
+        tasks.append(asyncio.ensure_future(run_closer(args, host, port, game_ids, stats, stop)))
+    reporter = asyncio.ensure_future(run_reporter(args, stats, stop))
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await reporter
+    return stats.overall()
+
+
+def print_interval(interval):
+    print(f"--- t = {interval['elapsed']:.0f} s")
+    print_endpoints(interval['endpoints'])
+
+
+def print_endpoints(endpoints):
+    for endpoint, s in endpoints.items():
+        print(f"  {endpoint:<20}{s['per_second']:>9.1f} req/s   p50 {s['p50_ms']:>8.1f}   "
+              f"p95 {s['p95_ms']:>8.1f}   p99 {s['p99_ms']:>8.1f} ms   "
+              f"erreurs {s['errors']:>5} ({s['error_rate'] * 100:.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge simulée (clients bots) contre server.py")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30, help="secondes")
+    parser.add_argument('--games', type=int, default=1,
+                        help="parties créées pour le test (1 = partie par défaut, ré-initialisée)")
+    parser.add_argument('--players', type=lambda s: s.split(','), default=['p1', 'p2'])
+    parser.add_argument('--grid-size', type=int, default=10)
+    parser.add_argument('--start-weight', type=int, default=6)
+    parser.add_argument('--vitamins', type=int, default=5)
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="délai moyen entre deux lectures d'un client (secondes)")
+    parser.add_argument('--post-ratio', type=float, default=1.0,
+                        help="fraction des lectures suivies d'un envoi de moves")
+    parser.add_argument('--view-radius', type=int, default=None,
+                        help="lire /state/view (ce rayon) au lieu de /state")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="envoyer sur /moves/submit, un client clôt les tours (/turn/close)")
+    parser.add_argument('--close-interval', type=float, default=1.0, help="secondes entre deux /turn/close")
+    parser.add_argument('--request-timeout', type=float, default=10.0,
+                        help="secondes sans réponse complète avant de compter la requête en erreur")
+    parser.add_argument('--report-interval', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="écrit aussi le rapport (avec les fenêtres) dans ce fichier")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    total = sum(s['requests'] for s in report['endpoints'].values())
+    errors = sum(s['errors'] for s in report['endpoints'].values())
+    print(f"\n=== {total} requêtes en {report['seconds']:.1f} s ({total / report['seconds']:.1f} req/s), "
+          f"{errors} erreurs")
+    print_endpoints(report['endpoints'])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# lockstep.py
+#
+# Mode lockstep : au lieu de diffuser new_grid et move_animation à chaque tour, le
+# serveur diffuse les moves acceptés du tour et sa graine ; chaque client rejoue le
+# tour avec le même moteur (compute_game_turn, égalités et vitamines tirées depuis la
+# graine) et retrouve exactement la même grille. Un hash de l'état, envoyé tous les
+# quelques tours, détecte une divergence (le client redemande alors l'état complet).
+#
+#   replica = LockstepReplica.from_state(message_lockstepState)
+#   for message in messages_lockstepTurn:
+#       move_animation = replica.apply(message)   # LockstepDivergence si écart
+#
+# Un client Python (bot, spectateur scripté) importe ce module avec server/ dans son
+# sys.path, comme tournament.py. Il n'y a pas de rejeu en JavaScript (le moteur et ses
+# tirages aléatoires devraient y être reproduits à l'identique) : front.html reste
+# sur stateUpdate / turnAnimation.
+
+import hashlib
+import random
+from collections import defaultdict
+
+from compute import compute_game_turn, REJECT_TOO_MANY_MOVES
+
+
+class LockstepDivergence(Exception):
+    """
+    L'état rejoué ne correspond plus à celui du serveur : il faut redemander l'état
+    complet (événement lockstepResync de server.js).
+    """
+
+
+def new_turn_seed():
+    """
+    Graine d'un tour (tirée par le serveur, diffusée avec les moves). 52 bits : elle
+    passe par le JSON de server.js, où un nombre est un double.
+    """
+    return random.getrandbits(52)
+
+
+def play_turn(grid_size, numberOfVit, grid, moves, seed):
+    """
+    Joue un tour entièrement déterminé par (grid, moves, seed) ; même résultat que
+    GameManager.apply_moves(moves, seed=seed).
+    :return: (move_animation, new_grid)
+    """
+    return compute_game_turn(grid_size, numberOfVit, grid, moves,
+                             tie_seed=seed, rng=random.Random(seed))
+
+
+def state_hash(grid):
+    """
+    Empreinte d'une grille, indépendante de l'ordre des cellules.
+    """
+    digest = hashlib.sha256()
+    for x, y, player, weight in sorted((c['x'], c['y'], c['player'], c['weight']) for c in grid):
+        digest.update(f"{x},{y},{player},{weight};".encode())
+    return digest.hexdigest()[:16]
+
+
+def accepted_moves(cells_moves, rejected):
+    """
+    Moves du tour moins ceux refusés (rejected : entrées de validate_moves, repérées
+    par joueur et position parmi ses moves), dans l'ordre d'envoi : rejoués, ils
+    donnent le même tour que la liste complète. Une entrée too_many_moves couvre
+    tous les moves du joueur à partir de son index.
+    """
+    refused = set()
+    capped = {}
+    for entry in rejected:
+        if entry['reason'] == REJECT_TOO_MANY_MOVES:
+            capped[entry['player']] = entry['index']
+        else:
+            refused.add((entry['player'], entry['index']))
+    position = defaultdict(int)
+    accepted = []
+    for move in cells_moves:
+        player = move['player']
+        index = position[player]
+        position[player] += 1
+        if (player, index) in refused or index >= capped.get(player, len(cells_moves)):
+            continue
+        accepted.append(move)
+    return accepted
+
+
+class LockstepReplica:
+    def __init__(self, grid_size, number_of_vitamins, grid, turn):
+        """
+        Copie locale d'une partie, à partir d'un état complet (celui du début de `turn`).
+        """
+        self.grid_size = grid_size
+        self.number_of_vitamins = number_of_vitamins
+        self.grid = grid
+        self.turn = turn
+
+    @classmethod
+    def from_state(cls, message):
+        """
+        Construit la copie depuis un message lockstepState de server.js
+        ({turn, grid, grid_size, number_of_vitamins, state_hash}).
+        """
+        replica = cls(message['grid_size'], message['number_of_vitamins'],
+                      message['grid'], message['turn'])
+        replica.check(message.get('state_hash'))
+        return replica
+
+    def apply(self, message):
+        """
+        Rejoue un message lockstepTurn ({turn, seed, moves, state_hash?}) ;
+        retourne move_animation (pour animer le tour localement).
+        """
+        if message['turn'] != self.turn:
+            raise LockstepDivergence(f"Tour {message['turn']} reçu, {self.turn} attendu")
+        move_animation, self.grid = play_turn(
+            self.grid_size, self.number_of_vitamins, self.grid, message['moves'], message['seed']
+        )
+        self.turn += 1
+        self.check(message.get('state_hash'))
+        return move_animation
+
+    def check(self, expected):
+        """
+        Compare l'état local au hash du serveur (s'il y en a un).
+        """
+        if expected is not None and state_hash(self.grid) != expected:
+            raise LockstepDivergence(f"Hash différent au tour {self.turn}")
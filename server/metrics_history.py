@@ -0,0 +1,281 @@
+# metrics_history.py
+#
+# Série temporelle des agrégats par joueur (poids total, nombre de cellules, vitamines
+# mangées), un point par tour, stockée en colonnes (array, une par métrique, lignes
+# de len(players) valeurs). Des niveaux sous-échantillonnés (blocs de factor ** k
+# tours : moyenne, min, max) sont tenus à jour à l'ajout, pour qu'une requête sur
+# une longue plage lise au plus ~`points` lignes, quelle que soit la durée de la partie.
+#
+# Une copie reprise d'un export partiel (to_dict(last_rows=...), voir merge) ne garde
+# de chaque niveau que les derniers blocs : les tours plus anciens n'y sont lisibles
+# qu'aux niveaux qui les couvrent encore (voir query).
+
+from array import array
+
+FIELDS = ('weight', 'cells', 'vitamins_eaten')
+AGGREGATES = ('mean', 'min', 'max')
+
+
+class MetricsHistory:
+    def __init__(self, players, first_turn=0, factor=8, levels=5):
+        """
+        :param factor: tours par point d'un niveau au suivant
+        :param levels: nombre de niveaux sous-échantillonnés (blocs de factor ** 1
+            à factor ** levels tours)
+        """
+        self.players = list(players)
+        self.factor = factor
+        self.n_levels = levels
+        self.clear(first_turn)
+
+    def clear(self, first_turn):
+        self.first_turn = first_turn
+        self.rows = 0
+        # Niveau 0 : valeurs brutes, [ligne * len(players) + joueur]
+        self.raw = {field: array('q') for field in FIELDS}
+        # Niveaux 1..n_levels : {agrégat: {métrique: array}}, une ligne par bloc complet
+        self.levels = [
+            {agg: {field: array('d' if agg == 'mean' else 'q') for field in FIELDS}
+             for agg in AGGREGATES}
+            for _ in range(self.n_levels)
+        ]
+        # Premier bloc gardé par niveau (0 : valeurs brutes, puis les niveaux
+        # sous-échantillonnés) ; 0 partout, sauf après la reprise d'un export partiel
+        self.starts = [0] * (self.n_levels + 1)
+
+    @property
+    def last_turn(self):
+        return self.first_turn + self.rows - 1
+
+    def record(self, turn, values):
+        """
+        Ajoute le point du tour `turn` ; values : {métrique: {joueur: valeur}}.
+        Un tour qui ne suit pas le dernier (reprise d'un autre état) recommence
+        la série à ce tour.
+        """
+        if turn != self.first_turn + self.rows:
+            self.clear(turn)
+        for field in FIELDS:
+            column = values[field]
+            self.raw[field].extend(column.get(p, 0) for p in self.players)
+
+        # rows n'avance qu'une fois les niveaux à jour : une lecture concurrente
+        # (query, sans verrou) ne voit que des lignes complètes
+        rows = self.rows + 1
+        block = 1
+        for level in range(self.n_levels):
+            block *= self.factor
+            if rows % block:
+                break
+            self._roll_up(level, rows // block - 1)
+        self.rows = rows
+
+    def _column(self, level, agg, field):
+        # Colonne d'un niveau (0 : valeurs brutes, qui servent pour les trois agrégats)
+        return self.raw[field] if level == 0 else self.levels[level - 1][agg][field]
+
+    def _roll_up(self, level, index):
+        # Ligne `index` du niveau `level` à partir des factor dernières lignes du niveau
+        # inférieur (blocs de même taille : la moyenne des moyennes est la moyenne)
+        n = len(self.players)
+        first = index * self.factor - self.starts[level]
+        target = self.levels[level]
+        for field in FIELDS:
+            sources = {agg: self._column(level, agg, field) for agg in AGGREGATES}
+            for p in range(n):
+                cells = range((first * n) + p, (first + self.factor) * n, n)
+                target['mean'][field].append(sum(sources['mean'][i] for i in cells) / self.factor)
+                target['min'][field].append(min(sources['min'][i] for i in cells))
+                target['max'][field].append(max(sources['max'][i] for i in cells))
+
+    def query(self, start=None, end=None, points=500, players=None, fields=None, agg='mean'):
+        """
+        Points des tours [start, end] (bornes incluses, défaut : toute la série), au
+        plus ~points : le niveau le plus fin qui tient dans points est choisi. Les deux
+        blocs du bord, partiellement dans la plage, sont composés des plus grands
+        sous-blocs complets des niveaux inférieurs (au plus ~factor par niveau), si
+        bien qu'une requête lit O(points + factor * levels) lignes.
+
+        Si les valeurs des premiers tours ne sont gardées qu'à un niveau grossier
+        (reprise partielle, voir merge), la plage part du début de leur bloc à ce
+        niveau, qui est au moins le niveau choisi ; de même, la fin de la plage
+        s'étend au bout du bloc si les niveaux plus fins manquent.
+
+        :param agg: 'mean', 'min' ou 'max' sur chaque bloc
+        :return: dict(first_turn, last_turn, step (tours par point), turns (premier tour
+            de chaque point), series {joueur: {métrique: [valeurs]}})
+        """
+        if agg not in AGGREGATES:
+            raise ValueError(f"Agrégat inconnu '{agg}' (disponibles : {', '.join(AGGREGATES)})")
+        players = list(players) if players else self.players
+        fields = list(fields) if fields else list(FIELDS)
+        for field in fields:
+            if field not in FIELDS:
+                raise ValueError(f"Métrique inconnue '{field}' (disponibles : {', '.join(FIELDS)})")
+        columns = [(player, self.players.index(player)) for player in players if player in self.players]
+        series = {player: {field: [] for field in fields} for player, _ in columns}
+        result = {'first_turn': self.first_turn, 'last_turn': self.last_turn,
+                  'step': 1, 'turns': [], 'series': series}
+
+        lo = max(0, (self.first_turn if start is None else start) - self.first_turn)
+        hi = min(self.rows - 1, (self.last_turn if end is None else end) - self.first_turn)
+        if hi < lo:
+            return result
+
+        level, block = 0, 1
+        while self.starts[level] * block > lo:
+            if level == self.n_levels:
+                # Même le niveau le plus grossier ne remonte pas jusque-là
+                lo = self.starts[level] * block
+                if hi < lo:
+                    return result
+                break
+            level += 1
+            block *= self.factor
+        lo -= lo % block
+        while level < self.n_levels and (hi - lo) // block + 1 > max(points, 1):
+            level += 1
+            block *= self.factor
+        result['step'] = block
+
+        # Taille et blocs gardés [début, fin) de chaque niveau, pour _aggregate
+        sizes = [self.factor ** k for k in range(self.n_levels + 1)]
+        kept = [(self.starts[k], self.rows // sizes[k]) for k in range(self.n_levels + 1)]
+        for bucket in range(lo // block, hi // block + 1):
+            first, last = max(bucket * block, lo), min((bucket + 1) * block - 1, hi)
+            result['turns'].append(self.first_turn + first)
+            for field in fields:
+                for player, p in columns:
+                    series[player][field].append(self._aggregate(field, p, agg, first, last, sizes, kept))
+        return result
+
+    def _aggregate(self, field, p, agg, first, last, sizes, kept):
+        # Agrégat des lignes [first, last] du joueur p : de gauche à droite, le plus
+        # grand bloc gardé aligné qui tient dans la plage (un bloc entier du niveau
+        # choisi est lu en une fois). Sans bloc qui tienne (niveaux fins absents, voir
+        # query), le plus petit bloc gardé, qui dépasse la fin de la plage.
+        n = len(self.players)
+        total = covered = 0
+        value = None
+        row = first
+        while row <= last:
+            best = None
+            for level, size in enumerate(sizes):
+                if row % size:
+                    break
+                start, end = kept[level]
+                if start <= row // size < end:
+                    fits = row + size - 1 <= last
+                    if fits or best is None:
+                        best = level
+                    if not fits:
+                        break
+            if best is None:
+                break
+            level, size = best, sizes[best]
+            part = self._column(level, agg, field)[(row // size - self.starts[level]) * n + p]
+            if agg == 'mean':
+                total += part * size
+                covered += size
+            elif value is None:
+                value = part
+            else:
+                value = min(value, part) if agg == 'min' else max(value, part)
+            row += size
+        return total / covered if agg == 'mean' else value
+
+    def nbytes(self):
+        """
+        Mémoire occupée par les colonnes (octets).
+        """
+        total = sum(a.itemsize * len(a) for a in self.raw.values())
+        for level in self.levels:
+            for columns in level.values():
+                total += sum(a.itemsize * len(a) for a in columns.values())
+        return total
+
+    def to_dict(self, last_rows=None):
+        """
+        Export sérialisable en JSON : valeurs brutes à partir de la ligne raw_start
+        (0 si la série est complète : les niveaux sont alors recalculés au chargement),
+        sinon aussi les niveaux (blocs gardés à partir de start).
+        :param last_rows: (optionnel) seulement les last_rows dernières lignes de chaque
+            niveau (le plus grossier en entier), soit une taille bornée quelle que soit
+            la durée de la partie : voir merge
+        """
+        n = len(self.players)
+        raw_start = self.starts[0] if last_rows is None else max(self.starts[0], self.rows - last_rows)
+        offset = (raw_start - self.starts[0]) * n
+        data = {'first_turn': self.first_turn, 'raw_start': raw_start,
+                'raw': {field: self.raw[field][offset:].tolist() for field in FIELDS}}
+        if raw_start:
+            data['levels'] = []
+            for level in range(1, self.n_levels + 1):
+                start = self.starts[level]
+                if last_rows is not None and level < self.n_levels:
+                    start = max(start, self.rows // self.factor ** level - last_rows)
+                offset = (start - self.starts[level]) * n
+                columns = self.levels[level - 1]
+                data['levels'].append({
+                    'start': start,
+                    **{agg: {field: columns[agg][field][offset:].tolist() for field in FIELDS}
+                       for agg in AGGREGATES}
+                })
+        return data
+
+    def merge(self, data):
+        """
+        Reprend data (to_dict d'une autre copie de la même partie, éventuellement
+        partiel). Si data prolonge la série, les tours qui manquent sont ajoutés.
+        Sinon (tours manquants au-delà des valeurs brutes de data, ou autre série), les
+        niveaux de data remplacent ceux-ci, en gardant de cette copie les blocs plus
+        anciens qui les précèdent sans trou : les niveaux grossiers restent complets.
+        """
+        n = len(self.players)
+        raw = data['raw']
+        first = data['first_turn']
+        raw_start = data.get('raw_start', 0)
+        rows = raw_start + (len(raw[FIELDS[0]]) // n if n else 0)
+        same = first == self.first_turn and self.rows <= rows
+        if same and self.rows and raw_start <= self.rows:
+            skip = self.rows - raw_start
+        elif not raw_start:
+            self.clear(first)
+            skip = 0
+        else:
+            self._adopt(data, rows, self.rows if same else 0)
+            return
+        for row in range(skip, rows - raw_start):
+            values = {
+                field: dict(zip(self.players, raw[field][row * n:(row + 1) * n]))
+                for field in FIELDS
+            }
+            self.record(first + raw_start + row, values)
+
+    def _adopt(self, data, rows, kept_rows):
+        # Reprise des niveaux de data ; kept_rows : lignes de cette copie (même série)
+        # dont les blocs précédant ceux de data sont gardés
+        n = len(self.players)
+        kept = [self.raw] + self.levels
+        kept_starts = self.starts
+        sources = [(data['raw_start'], {agg: data['raw'] for agg in AGGREGATES})]
+        sources += [(level['start'], level) for level in data['levels']]
+        self.clear(data['first_turn'])
+        for level, (start, values) in enumerate(sources):
+            own_start = kept_starts[level]
+            keep = kept_rows and own_start <= start <= kept_rows // self.factor ** level
+            self.starts[level] = own_start if keep else start
+            for agg in ('mean',) if level == 0 else AGGREGATES:
+                for field in FIELDS:
+                    target = self._column(level, agg, field)
+                    if keep:
+                        own = kept[level][field] if level == 0 else kept[level][agg][field]
+                        target.extend(own[:(start - own_start) * n])
+                    target.extend(values[agg][field])
+        self.rows = rows
+
+    @classmethod
+    def from_dict(cls, players, data, **kwargs):
+        history = cls(players, data['first_turn'], **kwargs)
+        history.merge(data)
+        return history
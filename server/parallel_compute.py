@@ -0,0 +1,87 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from compute import (
+    build_sub_cells, resolve_midway_collisions, resolve_destination_collisions,
+    finish_turn, tie_rngs
+)
+
+# Side of a tile, in squares
+TILE_SIZE = 64
+
+
+def compute_game_turn_tiled(grid_size, numberOfVit, original_grid, cells_moves, tie_seed,
+                            tile_size=TILE_SIZE, executor=None, rejected=None,
+                            max_moves_per_player=None, rng=None, touched=None, eaten=None):
+    """
+    Same turn as compute_game_turn(..., tie_seed=tie_seed), with collisions resolved
+    tile by tile, optionally in parallel.
+
+    Every rule is local: a sub-cell moves at most one square, and a crossing only
+    involves the two squares of its path. A tile therefore receives the sub-cells whose
+    origin or destination lies in it (those leaving it form its one-square halo),
+    resolves STEP 3 and STEP 4 for the squares it owns, and returns the results tagged
+    with ordering keys. Tie-breaks are drawn per square or per crossing path
+    (tie_seed), so they do not depend on which tile computes them. Stitching sorts
+    by key, which reproduces the sequential sub-cell order; move validation, animation results, vitamin respawn and
+    the new grid are built once by the caller, exactly as in compute_game_turn.
+
+    :param executor: (optional) concurrent.futures executor (e.g. ProcessPoolExecutor);
+        without one, tiles are resolved one after the other in this process.
+    :param rejected, max_moves_per_player, rng, touched, eaten: as in compute_game_turn.
+    :return: (move_animation, new_grid), identical to the sequential engine's.
+    """
+    sub_cells, move_animation_expansions = build_sub_cells(
+        grid_size, original_grid, cells_moves, rejected, max_moves_per_player
+    )
+    tiles = partition_sub_cells(sub_cells, tile_size)
+
+    jobs = [(tile, tile_size, subs, tie_seed) for tile, subs in tiles.items()]
+    if executor is None:
+        results = [resolve_tile(*job) for job in jobs]
+    else:
+        results = executor.map(resolve_tile, *zip(*jobs), chunksize=max(1, len(jobs) // 64))
+
+    placed, fates = [], {}
+    for tile_placed, tile_fates in results:
+        placed.extend(tile_placed)
+        fates.update(tile_fates)
+    stitched = [s for _, s in sorted(placed, key=itemgetter(0))]
+    return finish_turn(grid_size, numberOfVit, stitched, move_animation_expansions, fates, rng,
+                       touched, eaten)
+
+
+def partition_sub_cells(sub_cells, tile_size):
+    """
+    Tag each sub-cell with its sequential ordering key and send it to the tile of its
+    destination, and to the tile of its origin when it leaves that tile.
+    Return {(tx, ty): [sub-cells in sequential order]}.
+    """
+    tiles = defaultdict(list)
+    for k, s in enumerate(sub_cells):
+        s['_key'] = (0, k)
+        destination_tile = (s['x'] // tile_size, s['y'] // tile_size)
+        origin_tile = (s['origin_x'] // tile_size, s['origin_y'] // tile_size)
+        tiles[destination_tile].append(s)
+        if origin_tile != destination_tile:
+            tiles[origin_tile].append(s)
+    return tiles
+
+
+def resolve_tile(tile, tile_size, subs, tie_seed):
+    """
+    Resolve crossings among the tile's sub-cells, then destination merges on the
+    squares the tile owns. Return ([(ordering key, sub-cell), ...], fates): sub-cells
+    left alone on their square come first in the stitched order, merged ones after.
+    A crossing between two tiles is resolved by both, with the same outcome, so its
+    deaths may be reported twice.
+    """
+    rng_at = tie_rngs(tie_seed)
+    fates = {}
+    subs = resolve_midway_collisions(subs, rng_at, fates)
+
+    tx, ty = tile
+    owned = [s for s in subs if s['x'] // tile_size == tx and s['y'] // tile_size == ty]
+    survivors, merged = resolve_destination_collisions(owned, rng_at, fates)
+    placed = [((0, s['_key']), s) for s in survivors] + [((1, s['_key']), s) for s in merged]
+    return placed, fates
@@ -46,6 +46,42 @@ let timeBetweenMoves = 0;
 
 let movesBuffer = {};
 let turnTimer = null;
+let turnClosing = false; // fin de tour en cours : les moves reçus arrivent trop tard
+let currentLeaderboard = null; // agrégats par joueur renvoyés par le Python à chaque tour
+
+// Tours pipelinés (PIPELINE_TURNS=1) : chaque envoi de moves est validé tout de suite
+// par le Python (/moves/submit) ; la fin de tour n'appelle plus que /turn/close.
+// (Incompatible avec GAME_SHARED_STATE côté Python.)
+const PIPELINE_TURNS = process.env.PIPELINE_TURNS === '1';
+let pendingSubmits = [];
+// Refus du dernier envoi de chaque joueur : un nouvel envoi remplace le précédent
+// côté Python, ses refus remplacent donc aussi les anciens (lastSubmit : numéro du
+// dernier envoi de chaque joueur, pour ignorer une réponse arrivée après la suivante)
+let pendingRejected = {};
+let lastSubmit = {};
+let submitCount = 0;
+
+// Mode lockstep (LOCKSTEP_TURNS=1) : les sockets qui émettent "lockstep" reçoivent
+// l'état complet une fois (lockstepState), puis à chaque tour seulement les moves
+// acceptés et la graine du tour (lockstepTurn), qu'elles rejouent avec le même moteur
+// (server/lockstep.py) ; un hash de l'état accompagne un tour sur LOCKSTEP_HASH_INTERVAL.
+// Le rejeu n'existe qu'en Python (bots, spectateurs scriptés) : front.html reste sur
+// stateUpdate / turnAnimation, comme toutes les autres sockets.
+// Le Python ne tire la graine que si la room a des abonnés, et ne calcule le hash
+// que les tours où il est envoyé. (Non disponible avec PIPELINE_TURNS.)
+const LOCKSTEP_TURNS = process.env.LOCKSTEP_TURNS === '1' && !PIPELINE_TURNS;
+const LOCKSTEP_HASH_INTERVAL = parseInt(process.env.LOCKSTEP_HASH_INTERVAL || '10', 10);
+const LOCKSTEP_ROOM = 'lockstep';
+let currentStateHash = null; // hash de currentGrid (renvoyé par le Python), ou null
+
+// Mises à jour par tuiles (TILE_UPDATES=1) : les sockets qui émettent "tiles" ne
+// reçoivent plus stateUpdate (grille complète) mais, une fois, toutes les tuiles non
+// vides (tilesState), puis à chaque tour seulement les tuiles changées (tilesUpdate),
+// chacune avec sa version. Un tilesUpdate porte {since, version} : si since n'est pas
+// la version que le client a, il émet "tilesResync" {version} et reçoit les tuiles
+// changées depuis (ou toutes, full: true, si elle est trop ancienne).
+const TILE_UPDATES = process.env.TILE_UPDATES === '1';
+const TILES_ROOM = 'tiles';
 
 // On maintient la liste de joueurs "connectés" au WebSocket (optionnel)
 let connectedPlayers = [];
@@ -58,6 +94,8 @@ io.on('connection', (socket) => {
 
   socket.on('join', (data) => {
     const { name } = data;
+    // Room du joueur : ses moves refusés ne sont envoyés qu'à elle
+    socket.join(playerRoom(name));
     if (!connectedPlayers.includes(name)) {
       connectedPlayers.push(name);
       console.log(`Join via socket => ${name}`);
@@ -66,6 +104,30 @@ io.on('connection', (socket) => {
     }
   });
 
+  socket.on('lockstep', () => {
+    if (!LOCKSTEP_TURNS) return;
+    socket.join(LOCKSTEP_ROOM);
+    socket.emit('lockstepState', lockstepState());
+  });
+
+  // Divergence détectée par le client : il redemande l'état complet
+  socket.on('lockstepResync', () => {
+    if (LOCKSTEP_TURNS) socket.emit('lockstepState', lockstepState());
+  });
+
+  socket.on('tiles', async () => {
+    if (!TILE_UPDATES) return;
+    socket.join(TILES_ROOM);
+    socket.emit('tilesState', await fetchTiles());
+  });
+
+  // Tours manqués : tuiles changées depuis la version du client
+  socket.on('tilesResync', async (data) => {
+    if (!TILE_UPDATES) return;
+    const version = data && Number.isInteger(data.version) ? data.version : null;
+    socket.emit('tilesUpdate', await fetchTiles(version));
+  });
+
   socket.on('disconnect', () => {
     console.log(`Le client (socket ID=${socket.id}) s'est déconnecté`);
     // Ici, on pourrait retirer un joueur si on voulait
@@ -75,21 +137,103 @@ io.on('connection', (socket) => {
 // -----------------------------------------------------------------
 // FONCTIONS DE TOUR
 // -----------------------------------------------------------------
+// Destinataires des événements complets (tout le monde sauf la room lockstep)
+function fullStateAudience() {
+  return LOCKSTEP_TURNS ? io.except(LOCKSTEP_ROOM) : io;
+}
+
+// Destinataires de stateUpdate (les rooms lockstep et tiles ont leurs propres événements)
+function stateUpdateAudience() {
+  const rooms = [];
+  if (LOCKSTEP_TURNS) rooms.push(LOCKSTEP_ROOM);
+  if (TILE_UPDATES) rooms.push(TILES_ROOM);
+  return rooms.length ? io.except(rooms) : io;
+}
+
+// Tuiles changées depuis `since` (toutes sans since), lues au Python (GET /tiles)
+async function fetchTiles(since = null) {
+  try {
+    const query = since === null ? '' : `?since=${since}`;
+    const resp = await axios.get(`${PYTHON_API}/tiles${query}`);
+    return { turn: currentTurnNumber, ...resp.data };
+  } catch (err) {
+    console.error("Erreur /tiles:", err.message);
+    return { turn: currentTurnNumber, error: err.message };
+  }
+}
+
+function playerRoom(name) {
+  return `player:${name}`;
+}
+
+// Moves refusés : chaque joueur ne reçoit que les siens
+function emitRejected(rejected) {
+  const byPlayer = {};
+  for (const entry of rejected) {
+    (byPlayer[entry.player] = byPlayer[entry.player] || []).push(entry);
+  }
+  for (const player in byPlayer) {
+    io.to(playerRoom(player)).emit('movesRejected', {
+      turn: currentTurnNumber,
+      rejected: byPlayer[player]
+    });
+  }
+}
+
+function lockstepState() {
+  return {
+    turn: currentTurnNumber,
+    grid: currentGrid,
+    grid_size: currentGridSize,
+    number_of_vitamins: currentVitaminsCount,
+    state_hash: currentStateHash
+  };
+}
+
 function emitState() {
   // Émet un événement "stateUpdate" si vous en avez besoin
   // (facultatif si on n'utilise plus "stateUpdate")
-  io.emit('stateUpdate', {
+  stateUpdateAudience().emit('stateUpdate', {
     turn: currentTurnNumber,
     grid: currentGrid,
     grid_size: currentGridSize,
     timeBetweenMoves,
-    players: currentPlayers
+    players: currentPlayers,
+    leaderboard: currentLeaderboard
   });
 }
 
+function forwardMoves(players, moves) {
+  if (!PIPELINE_TURNS) return;
+  const turn = currentTurnNumber;
+  const submitted = new Set(players);
+  for (const move of moves) submitted.add(move.player);
+  const number = ++submitCount;
+  for (const player of submitted) lastSubmit[player] = number;
+  const submit = axios.post(`${PYTHON_API}/moves/submit`, moves)
+    .then((resp) => {
+      if (turn !== currentTurnNumber) return;
+      const byPlayer = {};
+      for (const entry of resp.data.rejected || []) {
+        (byPlayer[entry.player] = byPlayer[entry.player] || []).push(entry);
+      }
+      for (const player of submitted) {
+        if (lastSubmit[player] === number) pendingRejected[player] = byPlayer[player] || [];
+      }
+    })
+    .catch((err) => {
+      console.error("Erreur /moves/submit:", err.message);
+    });
+  pendingSubmits.push(submit);
+}
+
 function startTurn() {
   currentTurnNumber++;
   movesBuffer = {};
+  pendingSubmits = [];
+  pendingRejected = {};
+  lastSubmit = {};
+  turnClosing = false;
   console.log(`\n=== DÉBUT DU TOUR ${currentTurnNumber} === (timeBetweenMoves=${timeBetweenMoves})`);
 
   // Notifier les clients (optionnel si on n'utilise plus stateUpdate)
@@ -113,6 +257,7 @@ async function endTurn() {
     clearTimeout(turnTimer);
     turnTimer = null;
   }
+  turnClosing = true;
 
   // On compile tous les moves
   const allMoves = [];
@@ -123,22 +268,71 @@ async function endTurn() {
   console.log(`=> Tour ${currentTurnNumber} : envoi de ${allMoves.length} moves au Python`);
 
   try {
-    // On envoie la liste de moves directement
-    const pythonResp = await axios.post(`${PYTHON_API}/moves`, allMoves);
-    // On suppose le Python renvoie : { move_animation, new_grid }
-    const { move_animation, new_grid } = pythonResp.data;
+    let pythonResp;
+    if (PIPELINE_TURNS) {
+      // Les moves ont déjà été validés à leur arrivée : il ne reste qu'à clore le tour
+      await Promise.allSettled(pendingSubmits);
+      const query = TILE_UPDATES ? '?tiles=true' : '';
+      pythonResp = await axios.post(`${PYTHON_API}/turn/close${query}`);
+      pythonResp.data.rejected = Object.values(pendingRejected).flat();
+    } else {
+      // On envoie la liste de moves directement
+      const params = [];
+      const lockstepRoom = LOCKSTEP_TURNS && io.sockets.adapter.rooms.get(LOCKSTEP_ROOM);
+      if (lockstepRoom && lockstepRoom.size > 0) {
+        params.push('lockstep=true');
+        if (currentTurnNumber % LOCKSTEP_HASH_INTERVAL !== 0) params.push('lockstep_hash=false');
+      }
+      if (TILE_UPDATES) params.push('tiles=true');
+      const query = params.length ? `?${params.join('&')}` : '';
+      pythonResp = await axios.post(`${PYTHON_API}/moves${query}`, allMoves);
+    }
+    // On suppose le Python renvoie : { move_animation, new_grid, rejected, leaderboard, lockstep?, tiles? }
+    const { move_animation, new_grid, rejected, leaderboard, lockstep, tiles } = pythonResp.data;
 
     currentGrid = new_grid;
+    currentLeaderboard = leaderboard || null;
     console.log(`=> Tour ${currentTurnNumber} terminé, nouvelle grille reçue.`);
 
+    currentStateHash = lockstep ? lockstep.state_hash : null;
+    if (lockstep) {
+      io.to(LOCKSTEP_ROOM).emit('lockstepTurn', {
+        turn: currentTurnNumber,
+        seed: lockstep.seed,
+        moves: lockstep.moves,
+        state_hash: lockstep.state_hash
+      });
+    }
+
+    if (tiles) {
+      io.to(TILES_ROOM).emit('tilesUpdate', { turn: currentTurnNumber, ...tiles });
+    }
+
     // On émet l'événement "turnAnimation" pour le front
-    io.emit('turnAnimation', {
+    fullStateAudience().emit('turnAnimation', {
       turn: currentTurnNumber,
       grid_size: currentGridSize,     // <-- On renvoie la taille
       timeBetweenMoves: timeBetweenMoves, // <-- On renvoie le temps/coup
       move_animation
     });
 
+    // Moves refusés (raison par move), envoyés à leur joueur seulement
+    if (rejected && rejected.length > 0) {
+      emitRejected(rejected);
+    }
+
+    // Partie finie (au plus un joueur restant) : on n'enchaîne plus les tours
+    if (leaderboard && leaderboard.game_over) {
+      console.log(`=> Partie terminée au tour ${currentTurnNumber}, gagnant : ${leaderboard.winner}`);
+      emitState();
+      io.emit('gameOver', {
+        turn: currentTurnNumber,
+        winner: leaderboard.winner,
+        leaderboard
+      });
+      return;
+    }
+
     // Lance le tour suivant
     startTurn();
   } catch (err) {
@@ -203,15 +397,24 @@ app.post('/begin', async (req, res) => {
       start_weight: startWeight
     };
     const pythonResp = await axios.post(`${PYTHON_API}/init`, initBody);
-    const { grid } = pythonResp.data;
+    const { grid, leaderboard } = pythonResp.data;
 
     currentGrid = grid || [];
+    currentLeaderboard = leaderboard || null;
+    currentStateHash = null;
     currentTurnNumber = 0;
 
     console.log(`Partie BEGIN: grille=${currentGridSize}, vitamins=${currentVitaminsCount}, players=${currentPlayers}, TBM=${timeBetweenMoves}`);
     
     // Lance le premier tour
     startTurn();
+    if (LOCKSTEP_TURNS) {
+      io.to(LOCKSTEP_ROOM).emit('lockstepState', lockstepState());
+    }
+    if (TILE_UPDATES) {
+      // Nouvelle partie : les versions repartent de zéro
+      io.to(TILES_ROOM).emit('tilesState', await fetchTiles());
+    }
 
     res.json({ message: "Game started", grid: currentGrid });
   } catch (err) {
@@ -225,7 +428,7 @@ app.post('/moves', (req, res) => {
     const { player, turn } = req.body;
     const moves = Array.isArray(req.body.moves) ? req.body.moves : [];
 
-    if (turn !== currentTurnNumber) {
+    if (turn !== currentTurnNumber || turnClosing) {
       return res.json({
         error: "Tour invalide",
         currentTurn: currentTurnNumber
@@ -233,6 +436,7 @@ app.post('/moves', (req, res) => {
     }
 
     movesBuffer[player] = moves;
+    forwardMoves([player], moves);
     console.log(`=> Reçu ${moves.length} moves pour le joueur ${player} (tour=${turn}).`);
 
     if (timeBetweenMoves === 0) {
@@ -245,13 +449,48 @@ app.post('/moves', (req, res) => {
   }
 });
 
+// Moves de plusieurs joueurs en une seule requête (ex. bot_host.py)
+app.post('/moves/batch', (req, res) => {
+  try {
+    const { turn } = req.body;
+    const movesByPlayer = req.body.moves_by_player || {};
+
+    if (turn !== currentTurnNumber || turnClosing) {
+      return res.json({
+        error: "Tour invalide",
+        currentTurn: currentTurnNumber
+      });
+    }
+
+    let nbMoves = 0;
+    const batch = [];
+    for (const player in movesByPlayer) {
+      const moves = Array.isArray(movesByPlayer[player]) ? movesByPlayer[player] : [];
+      movesBuffer[player] = moves;
+      batch.push(...moves);
+      nbMoves += moves.length;
+    }
+    forwardMoves(Object.keys(movesByPlayer), batch);
+    console.log(`=> Reçu ${nbMoves} moves pour ${Object.keys(movesByPlayer).length} joueurs (tour=${turn}).`);
+
+    if (timeBetweenMoves === 0) {
+      checkIfAllPlayersHavePlayed();
+    }
+    res.json({ message: "Moves enregistrés" });
+  } catch (err) {
+    console.error(err);
+    res.status(500).send("Erreur /moves/batch");
+  }
+});
+
 app.get('/state', (req, res) => {
   res.json({
     turn: currentTurnNumber,
     grid: currentGrid,
     grid_size: currentGridSize,
     timeBetweenMoves,
-    players: currentPlayers
+    players: currentPlayers,
+    leaderboard: currentLeaderboard
   });
 });
 
@@ -1,9 +1,19 @@
 # server.py
 
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import threading
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
-from game_manager import GameManager
+from typing import List, Optional
+from game_registry import GameRegistry, WarmPool
+from lockstep import accepted_moves, new_turn_seed, state_hash
+from shared_state import SharedGameState
+from turn_waiters import TurnWaiters
 
 
 # ----------------------------------------
@@ -21,14 +31,149 @@ class InitParams(BaseModel):
     players: List[str]
     start_weight: int
 
-# On initialise un GameManager global (pour 1 partie unique).
+class BulkInitParams(InitParams):
+    count: int
+
+# Partie par défaut (celle du serveur Node, sans game_id), créée à la première requête.
+DEFAULT_GAME_ID = "default"
 
 players = ["p1", "p2"]          # Joueurs
 grid_size = 10
 start_weight = 6
 number_of_vitamins = 5
 
-game_manager = GameManager(players, grid_size, start_weight, number_of_vitamins)
+# Réserve de parties pré-générées, ex :
+# GAME_WARM_POOL='[{"players": ["p1", "p2"], "grid_size": 10, "start_weight": 6,
+#                   "number_of_vitamins": 5, "size": 8}]'
+WARM_POOL_CONFIG = os.environ.get("GAME_WARM_POOL", "[]")
+
+# Éviction des parties inactives : GAME_SNAPSHOT_DIR active l'écriture sur disque des
+# parties sans requête depuis GAME_IDLE_SECONDS, les moins récemment utilisées d'abord,
+# jusqu'à repasser sous GAME_MEMORY_BUDGET_MB (sans budget : toutes les inactives).
+SNAPSHOT_DIR = os.environ.get("GAME_SNAPSHOT_DIR")
+MEMORY_BUDGET_MB = os.environ.get("GAME_MEMORY_BUDGET_MB")
+IDLE_SECONDS = float(os.environ.get("GAME_IDLE_SECONDS", "300"))
+JANITOR_INTERVAL = float(os.environ.get("GAME_JANITOR_INTERVAL", "30"))
+
+# Nombre maximum de moves lus par joueur et par tour (les suivants sont refusés)
+MAX_MOVES_PER_PLAYER = os.environ.get("GAME_MAX_MOVES_PER_PLAYER")
+MAX_MOVES_PER_PLAYER = int(MAX_MOVES_PER_PLAYER) if MAX_MOVES_PER_PLAYER else None
+
+# Avec plusieurs workers (uvicorn --workers N), GAME_SHARED_STATE=<nom> place l'état
+# de la partie par défaut dans un segment de mémoire partagée : chaque worker sert
+# /state depuis le segment, et un seul à la fois applique un tour (verrou), après
+# s'être resynchronisé.
+SHARED_STATE_NAME = os.environ.get("GAME_SHARED_STATE")
+SHARED_STATE_MAX_CELLS = int(os.environ.get("GAME_SHARED_STATE_MAX_CELLS", "100000"))
+
+# Long-poll de /state/next : attente maximale accordée, et (avec GAME_SHARED_STATE)
+# intervalle de surveillance des tours publiés par les autres workers
+LONG_POLL_MAX_TIMEOUT = 120
+SHARED_STATE_POLL = 0.05
+
+registry = None
+turn_waiters = TurnWaiters()
+_shared_state_watcher = None
+shared_state = None
+shared_version = None  # version du segment que la partie par défaut reflète
+pipelining_used = False  # /moves/submit ou /turn/close déjà appelé (voir init_game)
+_startup_lock = threading.Lock()
+# Resynchronisations de la partie par défaut dans ce processus (voir sync_from_shared_state)
+_sync_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Crée le registre de parties (et démarre la réserve, le segment partagé)
+    à la première requête plutôt qu'à l'import du module.
+    """
+    global registry, shared_state, shared_version
+    if registry is not None:
+        return registry
+    with _startup_lock:
+        if registry is not None:
+            return registry
+        pool = WarmPool.from_config(json.loads(WARM_POOL_CONFIG))
+        pool.start()
+        new_registry = GameRegistry(
+            pool,
+            snapshot_dir=SNAPSHOT_DIR,
+            memory_budget=float(MEMORY_BUDGET_MB) * 1024 * 1024 if MEMORY_BUDGET_MB else None,
+            idle_seconds=IDLE_SECONDS,
+            pinned={DEFAULT_GAME_ID}
+        )
+        new_registry.start_janitor(JANITOR_INTERVAL)
+        if SHARED_STATE_NAME:
+            shared_state, created = SharedGameState.open_or_create(
+                SHARED_STATE_NAME, max_cells=SHARED_STATE_MAX_CELLS
+            )
+            with shared_state.write_lock():
+                if created or shared_state.read_snapshot()['grid_size'] == 0:
+                    shared_state.publish(new_registry.get_or_create(
+                        DEFAULT_GAME_ID, players, grid_size, start_weight, number_of_vitamins
+                    ))
+                    shared_version = shared_state.version()
+        registry = new_registry
+    return registry
+
+
+def get_game(game_id):
+    """
+    Retourne la partie game_id ; la partie par défaut est créée si besoin.
+    """
+    if game_id == DEFAULT_GAME_ID:
+        return get_registry().get_or_create(
+            DEFAULT_GAME_ID, players, grid_size, start_weight, number_of_vitamins
+        )
+    game = get_registry().get(game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail=f"Partie inconnue : {game_id}")
+    return game
+
+
+def sync_from_shared_state():
+    """
+    Recharge la partie par défaut depuis le segment si un autre worker a publié
+    depuis. Retourne la partie à jour.
+
+    Sans verrou entre processus : la version se compare sans verrou et l'état se lit
+    par le seqlock du segment ; seuls les écrivains prennent write_lock (et appellent
+    ceci dessous avant de jouer un tour). _sync_lock n'ordonne que les threads de ce
+    processus.
+    """
+    if shared_state.version() == shared_version:
+        return get_game(DEFAULT_GAME_ID)
+    with _sync_lock:
+        return _sync_locked()
+
+
+def _sync_locked():
+    global shared_version
+    game_manager = get_game(DEFAULT_GAME_ID)
+    snapshot = shared_state.read_snapshot()
+    if snapshot['version'] == shared_version:
+        # Un autre thread vient de se resynchroniser
+        return game_manager
+    if (snapshot['players'] != game_manager.players
+            or snapshot['grid_size'] != game_manager.grid_size
+            or snapshot['number_of_vitamins'] != game_manager.number_of_vitamins
+            or snapshot['start_weight'] != game_manager.start_weight):
+        _, game_manager = registry.create(
+            snapshot['players'], snapshot['grid_size'], snapshot['start_weight'],
+            snapshot['number_of_vitamins'], game_id=DEFAULT_GAME_ID
+        )
+    game_manager.restore(snapshot['grid'], snapshot['turn'], snapshot['vitamins_eaten'],
+                         snapshot['tiles'], snapshot['history'])
+    shared_version = snapshot['version']
+    return game_manager
+
+
+def publish_shared_state(game_manager):
+    global shared_version
+    # Sous _sync_lock : un lecteur ne prend pas cette publication pour celle d'un autre
+    with _sync_lock:
+        shared_state.publish(game_manager)
+        shared_version = shared_state.version()
 
 # ----------------------------------------
 # 2) Définition du modèle de données pour recevoir les moves
@@ -49,40 +194,340 @@ class Move(BaseModel):
 # ----------------------------------------
 
 @app.get("/state")
-def get_state():
+def get_state(game_id: str = DEFAULT_GAME_ID):
     """
     Récupère l'état courant de la grille (liste de cells/vitamines).
     """
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        # JSON déjà sérialisé par l'écrivain : pas de ré-encodage par requête
+        return Response(content=shared_state.read_payload(), media_type="application/json")
     return game_manager.get_state()
 
+@app.get("/state/view")
+def get_state_view(player: str, radius: int = 5, game_id: str = DEFAULT_GAME_ID):
+    """
+    Renvoie seulement les cellules à distance <= radius (en x et en y) des cellules
+    de player : moins de données à envoyer et à lire sur les grands plateaux, et un
+    mode « brouillard de guerre ».
+    """
+    if radius < 0:
+        raise HTTPException(status_code=400, detail="radius doit être >= 0")
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        game_manager = sync_from_shared_state()
+    return {
+        "turn": game_manager.turn,
+        "grid_size": game_manager.grid_size,
+        "player": player,
+        "radius": radius,
+        "grid": game_manager.view(player, radius)
+    }
+
+@app.get("/state/next")
+async def get_next_state(after_turn: int, timeout: float = 30, game_id: str = DEFAULT_GAME_ID):
+    """
+    Long-poll : renvoie {"turn", "grid"} dès que le tour de la partie diffère de
+    after_turn (tout de suite si c'est déjà le cas), ou 204 après timeout secondes.
+    Les clients en attente ne coûtent qu'une attente sur un asyncio.Event partagé.
+    La partie est cherchée dans le pool de threads : une partie évincée est relue du
+    disque, ce qui ne doit pas bloquer la boucle d'événements (ni les autres clients).
+    """
+    turn_waiters.bind(asyncio.get_running_loop())
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        start_shared_state_watcher()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(timeout, 0), LONG_POLL_MAX_TIMEOUT)
+    while True:
+        game_manager = await run_in_threadpool(get_game, game_id)
+        if game_manager.turn != after_turn:
+            return {"turn": game_manager.turn, "grid": game_manager.get_state()}
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await turn_waiters.wait(game_id, remaining):
+            return Response(status_code=204)
+
+def start_shared_state_watcher():
+    """
+    Avec GAME_SHARED_STATE, les tours appliqués par un autre worker n'appellent pas
+    notify ici : une seule tâche par processus surveille la version du segment,
+    resynchronise la partie par défaut et réveille les clients en attente.
+    """
+    global _shared_state_watcher
+    if _shared_state_watcher is not None:
+        return
+
+    async def watch():
+        while True:
+            await asyncio.sleep(SHARED_STATE_POLL)
+            if shared_state.version() != shared_version:
+                await asyncio.get_running_loop().run_in_executor(None, sync_from_shared_state)
+                turn_waiters.notify(DEFAULT_GAME_ID)
+
+    _shared_state_watcher = asyncio.ensure_future(watch())
+
+@app.get("/leaderboard")
+def get_leaderboard(game_id: str = DEFAULT_GAME_ID):
+    """
+    Poids total, nombre de cellules et vitamines mangées par joueur (agrégats tenus
+    à jour à chaque tour, sans parcourir la grille), et fin de partie.
+    """
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        game_manager = sync_from_shared_state()
+    return leaderboard_payload(game_manager)
+
+@app.get("/history")
+def get_history(start: Optional[int] = None, end: Optional[int] = None, points: int = 500,
+                players: Optional[str] = None, fields: Optional[str] = None,
+                agg: str = "mean", game_id: str = DEFAULT_GAME_ID):
+    """
+    Évolution des agrégats par joueur sur les tours [start, end], en au plus ~points
+    points (moyenne, min ou max de chaque bloc de tours) ; players et fields sont des
+    listes séparées par des virgules (défaut : tous).
+    """
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        game_manager = sync_from_shared_state()
+    try:
+        return game_manager.history.query(
+            start, end, points,
+            players=players.split(",") if players else None,
+            fields=fields.split(",") if fields else None,
+            agg=agg
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/tiles")
+def get_tiles(since: Optional[int] = None, game_id: str = DEFAULT_GAME_ID):
+    """
+    Tuiles d'affichage changées depuis la version since (voir
+    GameManager.tile_updates) : {version, since, full, tile_size, tiles: [{tx, ty,
+    version, cells}]}. Sans since, ou si since est trop ancienne (partie
+    réinitialisée ou resynchronisée), toutes les tuiles non vides (full).
+    """
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        game_manager = sync_from_shared_state()
+    return game_manager.tile_updates(since)
+
+def leaderboard_payload(game_manager):
+    return {
+        "turn": game_manager.turn,
+        "game_over": game_manager.is_over(),
+        "winner": game_manager.winner(),
+        "players": game_manager.leaderboard()
+    }
+
+NDJSON_BATCH = 256  # lignes par morceau envoyé
+
+
+def ndjson_turn(move_animation, new_grid, turn, rejected=(), leaderboard=None, tiles=None,
+                lockstep=None):
+    """
+    Génère la réponse NDJSON d'un tour : une ligne {"type": "rejected", ...} par move
+    refusé, une ligne {"type": "animation", ...} par sous-cellule, puis une ligne
+    {"type": "cell", ...} par case de la nouvelle grille, puis {"type": "end", "turn": ...,
+    "leaderboard": ..., "tiles": ..., "lockstep": ...} (tiles et lockstep s'ils sont
+    demandés). Les lignes sont envoyées par paquets.
+    """
+    lines = [json.dumps({"type": "rejected", **entry}) for entry in rejected]
+    for entry in move_animation:
+        lines.append(json.dumps({"type": "animation", **entry}))
+        if len(lines) >= NDJSON_BATCH:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    for cell in new_grid:
+        lines.append(json.dumps({"type": "cell", **cell}))
+        if len(lines) >= NDJSON_BATCH:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    end = {"type": "end", "turn": turn, "leaderboard": leaderboard}
+    if tiles is not None:
+        end["tiles"] = tiles
+    if lockstep is not None:
+        end["lockstep"] = lockstep
+    lines.append(json.dumps(end))
+    yield "\n".join(lines) + "\n"
+
+
 @app.post("/moves")
-def post_moves(moves: List[Move]):
+def post_moves(moves: List[Move], stream: bool = False, lockstep: bool = False,
+               lockstep_hash: bool = True, tiles: bool = False, game_id: str = DEFAULT_GAME_ID):
     """
     Reçoit un tableau de moves pour ce tour, applique compute_game_turn,
-    et renvoie un JSON contenant move_animation + new_grid.
+    et renvoie un JSON contenant move_animation + new_grid (+ leaderboard, comme
+    GET /leaderboard).
+
+    Avec ?stream=true, la réponse est en NDJSON (application/x-ndjson, voir
+    ndjson_turn) : le front peut commencer l'animation avant la fin de l'envoi.
+
+    Les moves invalides sont ignorés et listés dans "rejected" avec leur raison
+    (index parmi les moves de ce joueur, x, y, player, reason ; un seul refus
+    too_many_moves par joueur, avec count, voir compute.report_rejection).
+
+    Avec ?lockstep=true, le tour est tiré d'une graine et la réponse contient aussi
+    "lockstep" : {seed, moves (acceptés), state_hash}, de quoi rejouer le tour à
+    l'identique chez un client (voir lockstep.py) ; en NDJSON, dans la ligne "end".
+    Avec ?lockstep_hash=false, state_hash vaut null : le hash trie et parcourt toute
+    la grille, server.js ne le demande que les tours où il l'envoie.
+
+    Avec ?tiles=true, la réponse contient aussi "tiles" : les tuiles d'affichage
+    changées par ce tour (comme GET /tiles?since=<version précédente>).
     """
     # Convertit chaque Move Pydantic en dict standard
     moves_list = [m.dict() for m in moves]
-    move_animation, new_grid = game_manager.apply_moves(moves_list)
-    return {
+    rejected = []
+    seed = new_turn_seed() if lockstep else None
+
+    def apply(game_manager):
+        if stream:
+            return game_manager.apply_moves_stream(moves_list, rejected, MAX_MOVES_PER_PLAYER, seed)
+        return game_manager.apply_moves(moves_list, rejected, MAX_MOVES_PER_PLAYER, seed)
+
+    def dirty_tiles(game_manager):
+        # Lues juste après le tour, avant qu'un autre ne change la version
+        return game_manager.tile_updates(game_manager.tiles_version - 1) if tiles else None
+
+    game_manager = get_game(game_id)
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        with shared_state.write_lock():
+            game_manager = sync_from_shared_state()
+            move_animation, new_grid = apply(game_manager)
+            tile_payload = dirty_tiles(game_manager)
+            publish_shared_state(game_manager)
+    else:
+        move_animation, new_grid = apply(game_manager)
+        tile_payload = dirty_tiles(game_manager)
+    turn_waiters.notify(game_id)
+    leaderboard = leaderboard_payload(game_manager)
+    lockstep_payload = None
+    if lockstep:
+        # (en flux aussi, rejected est déjà rempli : les moves sont validés d'abord)
+        lockstep_payload = {
+            "seed": seed,
+            "moves": accepted_moves(moves_list, rejected),
+            "state_hash": state_hash(new_grid) if lockstep_hash else None
+        }
+    if stream:
+        return StreamingResponse(
+            ndjson_turn(move_animation, new_grid, game_manager.turn, rejected, leaderboard,
+                        tile_payload, lockstep_payload),
+            media_type="application/x-ndjson"
+        )
+    response = {
         "move_animation": move_animation,
-        "new_grid": new_grid
+        "new_grid": new_grid,
+        "rejected": rejected,
+        "leaderboard": leaderboard
     }
+    if lockstep:
+        response["lockstep"] = lockstep_payload
+    if tiles:
+        response["tiles"] = tile_payload
+    return response
+
+def pipelined_game(game_id):
+    """
+    Partie pour /moves/submit et /turn/close : les moves validés à l'avance vivent
+    dans la mémoire de ce processus, ce qui exclut le mode multi-workers.
+    """
+    global pipelining_used
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        raise HTTPException(
+            status_code=409,
+            detail="Tours pipelinés indisponibles avec GAME_SHARED_STATE : utiliser /moves"
+        )
+    pipelining_used = True
+    return get_game(game_id)
+
+@app.post("/moves/submit")
+def submit_moves(moves: List[Move], game_id: str = DEFAULT_GAME_ID):
+    """
+    Valide tout de suite les moves d'un ou plusieurs joueurs pour le tour en cours
+    (un nouvel envoi d'un joueur remplace le précédent) ; renvoie les refusés.
+    Le tour est joué par /turn/close.
+    """
+    game_manager = pipelined_game(game_id)
+    rejected = game_manager.submit_moves([m.dict() for m in moves], MAX_MOVES_PER_PLAYER)
+    return {"rejected": rejected}
+
+@app.post("/turn/close")
+def close_turn(background_tasks: BackgroundTasks, stream: bool = False, tiles: bool = False,
+               game_id: str = DEFAULT_GAME_ID):
+    """
+    Joue les moves reçus par /moves/submit (même réponse que /moves, sans
+    "rejected" : les refus ont été renvoyés à chaque envoi). Le tour suivant est
+    préparé après l'envoi de la réponse.
+    """
+    game_manager = pipelined_game(game_id)
+    move_animation, new_grid = game_manager.close_turn(stream=stream)
+    tile_payload = game_manager.tile_updates(game_manager.tiles_version - 1) if tiles else None
+    turn_waiters.notify(game_id)
+    background_tasks.add_task(game_manager.prepare_next_turn)
+    leaderboard = leaderboard_payload(game_manager)
+    if stream:
+        return StreamingResponse(
+            ndjson_turn(move_animation, new_grid, game_manager.turn, leaderboard=leaderboard,
+                        tiles=tile_payload),
+            media_type="application/x-ndjson",
+            background=background_tasks
+        )
+    response = {
+        "move_animation": move_animation,
+        "new_grid": new_grid,
+        "leaderboard": leaderboard
+    }
+    if tiles:
+        response["tiles"] = tile_payload
+    return response
 
 @app.post("/init")
-def init_game(params: InitParams):
+def init_game(params: InitParams, background_tasks: BackgroundTasks,
+              game_id: str = DEFAULT_GAME_ID):
     """
     Ré-initialise la partie avec les nouveaux paramètres reçus
+    (partie prise dans la réserve si ces paramètres y sont configurés)
     """
-    global game_manager
-    # Recrée un nouveau GameManager
-    game_manager = GameManager(
-        players=params.players,
-        grid_size=params.grid_size,
-        start_weight=params.start_weight,
-        number_of_vitamins=params.number_of_vitamins
+    _, game_manager = get_registry().create(
+        params.players, params.grid_size, params.start_weight,
+        params.number_of_vitamins, game_id=game_id
     )
+    if shared_state is not None and game_id == DEFAULT_GAME_ID:
+        with shared_state.write_lock():
+            publish_shared_state(game_manager)
+    elif pipelining_used:
+        # Seulement pour les tours pipelinés (sinon le premier /moves/submit prépare)
+        background_tasks.add_task(game_manager.prepare_next_turn)
+    turn_waiters.notify(game_id)
     return {
         "message": "Game re-initialized",
-        "grid": game_manager.get_state()
-    }
\ No newline at end of file
+        "grid": game_manager.get_state(),
+        "leaderboard": leaderboard_payload(game_manager)
+    }
+
+@app.post("/games/bulk")
+def create_games(params: BulkInitParams):
+    """
+    Crée params.count parties avec les mêmes paramètres (prises dans la réserve
+    tant qu'elle en a) et renvoie leurs game_id et grilles initiales.
+    """
+    if params.count < 1:
+        raise HTTPException(status_code=400, detail="count doit être >= 1")
+    created = get_registry().create_many(
+        params.count, params.players, params.grid_size,
+        params.start_weight, params.number_of_vitamins
+    )
+    return {
+        "games": [
+            {"game_id": game_id, "grid": game_manager.get_state()}
+            for game_id, game_manager in created
+        ]
+    }
+
+@app.get("/games/diagnostics")
+def games_diagnostics():
+    """
+    Mémoire estimée par partie, parties évincées / rechargées, état de la réserve.
+    """
+    return get_registry().diagnostics()
@@ -0,0 +1,231 @@
+# shared_state.py
+#
+# État de la partie dans un segment de mémoire partagée, pour que plusieurs workers
+# uvicorn servent /state sans passer par le worker qui a calculé le tour.
+#
+# Disposition du segment :
+#   en-tête   : magic, seq (seqlock), turn, grid_size, number_of_vitamins, start_weight,
+#               n_cells, n_players, max_cells, players_len, payload_len, max_payload,
+#               meta_len, max_meta
+#   joueurs   : noms des joueurs, UTF-8, séparés par '\n' (MAX_PLAYERS_BYTES octets)
+#   cellules  : max_cells x (x, y, weight, player_index) en int32 (-1 = vitamine)
+#   payload   : JSON de /state déjà sérialisé (max_payload octets)
+#   méta      : JSON de ce que la grille ne dit pas (max_meta octets) : vitamines
+#               mangées par joueur, fin de chaque niveau de l'historique (HISTORY_TAIL),
+#               versions des tuiles ; un worker qui se resynchronise répond ensuite
+#               à /leaderboard, /history et /tiles comme l'écrivain
+#
+# Un seul écrivain à la fois (verrou fcntl sur un fichier), lecteurs sans verrou :
+# l'écrivain passe seq à une valeur impaire pendant l'écriture, et un lecteur
+# recommence si seq était impair ou a changé pendant sa copie.
+
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+MAGIC = b'GOC2'
+HEADER = struct.Struct('<4sQQiiiiiiiiiii')
+MAX_PLAYERS_BYTES = 64 * 1024
+CELL = struct.Struct('<iiii')
+VITAMIN_INDEX = -1
+# Lignes publiées de chaque niveau de l'historique (le plus grossier en entier, voir
+# MetricsHistory.to_dict) : taille bornée quelle que soit la durée de la partie. Un
+# worker en retard de moins de HISTORY_TAIL tours reprend l'historique à l'identique ;
+# au-delà, les tours manqués ne restent lisibles qu'aux niveaux qui les couvrent
+# (HISTORY_TAIL x factor ** k tours pour le niveau k)
+HISTORY_TAIL = 64
+# Lecteur qui trouve une écriture en cours : il recommence tout de suite SPIN_TRIES
+# fois, puis cède le processeur SPIN_TRIES fois, puis dort de plus en plus longtemps
+# (jusqu'à MAX_BACKOFF secondes), pour ne pas affamer un écrivain préempté
+SPIN_TRIES = 16
+BACKOFF_STEP = 0.00001
+MAX_BACKOFF = 0.001
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # Avant Python 3.13, un simple attachement est suivi par le resource_tracker,
+    # qui supprimerait le segment à la sortie de ce worker.
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+class SharedGameState:
+    def __init__(self, shm, name):
+        self.shm = shm
+        self.name = name
+        self.buf = shm.buf
+        header = HEADER.unpack_from(self.buf, 0)
+        if header[0] != MAGIC:
+            raise ValueError(f"Segment '{name}' : ce n'est pas un état de partie")
+        self.max_cells = header[8]
+        self.max_payload = header[11]
+        self.players_offset = HEADER.size
+        self.cells_offset = self.players_offset + MAX_PLAYERS_BYTES
+        self.payload_offset = self.cells_offset + self.max_cells * CELL.size
+        self.max_meta = header[13]
+        self.meta_offset = self.payload_offset + self.max_payload
+        self.lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+    @classmethod
+    def open_or_create(cls, name, max_cells=100_000, max_payload=None, max_meta=None):
+        """
+        Ouvre le segment s'il existe, sinon le crée (vide, turn 0).
+        Retourne (state, created).
+        """
+        if max_payload is None:
+            max_payload = max_cells * 64 + 4096
+        if max_meta is None:
+            max_meta = max_cells * 32 + 1024 * 1024
+        size = HEADER.size + MAX_PLAYERS_BYTES + max_cells * CELL.size + max_payload + max_meta
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            return cls(_attach(name), name), False
+        HEADER.pack_into(shm.buf, 0, MAGIC, 0, 0, 0, 0, 0, 0, 0, max_cells, 0, 0, max_payload,
+                         0, max_meta)
+        return cls(shm, name), True
+
+    @contextmanager
+    def write_lock(self):
+        """
+        Verrou exclusif entre processus : un seul écrivain applique un tour à la fois.
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _seq(self):
+        return struct.unpack_from('<Q', self.buf, 4)[0]
+
+    def _set_seq(self, seq):
+        struct.pack_into('<Q', self.buf, 4, seq)
+
+    def version(self):
+        """
+        Numéro de version (pair) de l'état publié ; change à chaque publication.
+        """
+        return self._seq()
+
+    def publish(self, game_manager):
+        """
+        Écrit l'état d'un GameManager (à appeler sous write_lock).
+        """
+        grid = game_manager.current_grid
+        if len(grid) > self.max_cells:
+            raise ValueError(f"{len(grid)} cellules, le segment en accepte {self.max_cells}")
+        players = list(game_manager.players)
+        players_blob = '\n'.join(players).encode('utf-8')
+        if len(players_blob) > MAX_PLAYERS_BYTES:
+            raise ValueError("Liste de joueurs trop longue pour le segment")
+        payload = json.dumps(game_manager.get_state()).encode('utf-8')
+        if len(payload) > self.max_payload:
+            raise ValueError(f"État de {len(payload)} octets, le segment en accepte {self.max_payload}")
+        meta = json.dumps({
+            'vitamins_eaten': [game_manager.vitamins_eaten.get(p, 0) for p in players],
+            'history': game_manager.history.to_dict(last_rows=HISTORY_TAIL),
+            'tiles': game_manager.tiles_state(),
+        }).encode('utf-8')
+        if len(meta) > self.max_meta:
+            raise ValueError(f"Méta de {len(meta)} octets, le segment en accepte {self.max_meta}")
+
+        index = {p: i for i, p in enumerate(players)}
+        seq = self._seq()
+        self._set_seq(seq + 1)  # impair : écriture en cours
+        HEADER.pack_into(
+            self.buf, 0, MAGIC, seq + 1, game_manager.turn, game_manager.grid_size,
+            game_manager.number_of_vitamins, game_manager.start_weight,
+            len(grid), len(players), self.max_cells, len(players_blob),
+            len(payload), self.max_payload, len(meta), self.max_meta
+        )
+        self.buf[self.players_offset:self.players_offset + len(players_blob)] = players_blob
+        offset = self.cells_offset
+        for cell in grid:
+            player = cell['player']
+            player_index = VITAMIN_INDEX if player == 'vitamin' else index.setdefault(player, len(index))
+            CELL.pack_into(self.buf, offset, cell['x'], cell['y'], cell['weight'], player_index)
+            offset += CELL.size
+        self.buf[self.payload_offset:self.payload_offset + len(payload)] = payload
+        self.buf[self.meta_offset:self.meta_offset + len(meta)] = meta
+        self._set_seq(seq + 2)  # pair : état cohérent
+
+    def _read_consistent(self, read):
+        attempts = 0
+        while True:
+            before = self._seq()
+            if not before % 2:
+                result = read()
+                if self._seq() == before:
+                    return before, result
+            attempts += 1
+            if attempts <= SPIN_TRIES:
+                continue
+            if attempts <= 2 * SPIN_TRIES:
+                time.sleep(0)
+            else:
+                time.sleep(min(MAX_BACKOFF, BACKOFF_STEP * (attempts - 2 * SPIN_TRIES)))
+
+    def read_payload(self):
+        """
+        Retourne le JSON de /state tel que publié (une seule copie, pas de ré-encodage).
+        """
+        def read():
+            payload_len = HEADER.unpack_from(self.buf, 0)[10]
+            return bytes(self.buf[self.payload_offset:self.payload_offset + payload_len])
+        return self._read_consistent(read)[1]
+
+    def read_snapshot(self):
+        """
+        Décode l'état complet : dict avec version, turn, grid_size, number_of_vitamins,
+        start_weight, players, grid (liste de dict), vitamins_eaten ({joueur: nombre}),
+        history (MetricsHistory.to_dict(last_rows=HISTORY_TAIL)) et tiles
+        (GameManager.tiles_state) ; ces trois derniers valent None si rien n'est publié.
+        """
+        def read():
+            header = HEADER.unpack_from(self.buf, 0)
+            _, _, turn, grid_size, number_of_vitamins, start_weight, n_cells, _, _, players_len = header[:10]
+            meta_len = header[12]
+            meta_blob = bytes(self.buf[self.meta_offset:self.meta_offset + meta_len])
+            blob = bytes(self.buf[self.players_offset:self.players_offset + players_len])
+            players = blob.decode('utf-8').split('\n') if blob else []
+            grid = []
+            for i in range(n_cells):
+                x, y, weight, player_index = CELL.unpack_from(self.buf, self.cells_offset + i * CELL.size)
+                grid.append({
+                    'x': x,
+                    'y': y,
+                    'weight': weight,
+                    'player': 'vitamin' if player_index == VITAMIN_INDEX else players[player_index]
+                })
+            return {
+                'turn': turn,
+                'grid_size': grid_size,
+                'number_of_vitamins': number_of_vitamins,
+                'start_weight': start_weight,
+                'players': players,
+                'grid': grid
+            }, meta_blob
+        version, (snapshot, meta_blob) = self._read_consistent(read)
+        # Décodé hors de la boucle : seule la copie des octets est répétée
+        meta = json.loads(meta_blob) if meta_blob else {}
+        eaten = meta.get('vitamins_eaten')
+        snapshot['vitamins_eaten'] = dict(zip(snapshot['players'], eaten)) if eaten is not None else None
+        snapshot['history'] = meta.get('history')
+        snapshot['tiles'] = meta.get('tiles')
+        snapshot['version'] = version
+        return snapshot
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
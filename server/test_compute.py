@@ -1,6 +1,10 @@
 # test_compute.py
 
-from compute import compute_game_turn
+from compute import (
+    compute_game_turn, PendingTurn, resolve_pending_turn, REJECT_TOO_MANY_MOVES, REJECT_DUPLICATE,
+    REJECT_UNKNOWN_CELL, REJECT_NEGATIVE_SPLIT, REJECT_WRONG_TOTAL, REJECT_OUT_OF_BOUNDS
+)
+from lockstep import accepted_moves
 
 def main():
     # Paramètres du jeu
@@ -70,5 +74,162 @@ def main():
     for cell in new_grid:
         print(cell)
 
+
+# ------------------------------------------------------------
+# Validation des moves : une raison de refus par cas
+# ------------------------------------------------------------
+REJECT_GRID = [
+    {'x': 0, 'y': 0, 'weight': 3, 'player': 'p1'},
+    {'x': 2, 'y': 2, 'weight': 2, 'player': 'p1'},
+    {'x': 4, 'y': 4, 'weight': 2, 'player': 'p2'},
+]
+
+
+def move(x, y, player, up=0, down=0, left=0, right=0, stay=0):
+    return {'x': x, 'y': y, 'player': player, 'move_up': up, 'move_down': down,
+            'move_left': left, 'move_right': right, 'move_stay': stay}
+
+
+def reasons(cells_moves, max_moves_per_player=None):
+    rejected = []
+    compute_game_turn(6, 0, REJECT_GRID, cells_moves, rejected=rejected,
+                      max_moves_per_player=max_moves_per_player)
+    return [(r['player'], r['index'], r['reason']) for r in rejected]
+
+
+def test_reject_each_reason():
+    assert reasons([move(2, 2, 'p1', stay=2), move(2, 2, 'p1', stay=2)]) == [('p1', 1, REJECT_DUPLICATE)]
+    assert reasons([move(1, 1, 'p1', stay=3)]) == [('p1', 0, REJECT_UNKNOWN_CELL)]
+    assert reasons([move(4, 4, 'p1', stay=2)]) == [('p1', 0, REJECT_UNKNOWN_CELL)]
+    assert reasons([move(2, 2, 'p1', up=3, down=-1)]) == [('p1', 0, REJECT_NEGATIVE_SPLIT)]
+    assert reasons([move(2, 2, 'p1', up=1)]) == [('p1', 0, REJECT_WRONG_TOTAL)]
+    assert reasons([move(0, 0, 'p1', left=1, stay=2)]) == [('p1', 0, REJECT_OUT_OF_BOUNDS)]
+    # Une direction vide peut pointer hors de la grille
+    assert reasons([move(0, 0, 'p1', right=1, stay=2)]) == []
+    assert reasons([move(0, 0, 'p1', stay=3), move(2, 2, 'p1', stay=2)], 1) == [('p1', 1, REJECT_TOO_MANY_MOVES)]
+
+
+def test_rejected_move_does_not_count_as_played():
+    # Un move refusé ne bloque pas un move valide de la même cellule
+    assert reasons([move(2, 2, 'p1', up=5), move(2, 2, 'p1', stay=2)]) == [('p1', 0, REJECT_WRONG_TOTAL)]
+
+
+def test_index_is_per_player():
+    # Les moves sont concaténés joueur par joueur : l'index est la position dans
+    # le tableau envoyé par le joueur
+    cells_moves = [move(0, 0, 'p1', stay=3), move(9, 9, 'p1'), move(4, 4, 'p2', up=1), move(4, 4, 'p2', stay=2)]
+    assert reasons(cells_moves) == [('p1', 1, REJECT_UNKNOWN_CELL), ('p2', 0, REJECT_WRONG_TOTAL)]
+
+
+def test_too_many_moves_is_summarized():
+    cells_moves = [move(0, 0, 'p1', stay=3)] + [move(5, 5, 'p1')] * 1000 + [move(4, 4, 'p2', stay=2)] * 3
+    rejected = []
+    compute_game_turn(6, 0, REJECT_GRID, cells_moves, rejected=rejected, max_moves_per_player=2)
+    assert rejected == [
+        {'index': 1, 'x': 5, 'y': 5, 'player': 'p1', 'reason': REJECT_UNKNOWN_CELL},
+        {'index': 2, 'x': 5, 'y': 5, 'player': 'p1', 'reason': REJECT_TOO_MANY_MOVES, 'count': 999},
+        {'index': 1, 'x': 4, 'y': 4, 'player': 'p2', 'reason': REJECT_DUPLICATE},
+        {'index': 2, 'x': 4, 'y': 4, 'player': 'p2', 'reason': REJECT_TOO_MANY_MOVES, 'count': 1},
+    ]
+    # Les moves acceptés se retrouvent à partir des refus
+    assert accepted_moves(cells_moves, rejected) == [cells_moves[0], cells_moves[1001]]
+
+
+def test_pending_turn_reports_like_validate_moves():
+    cells_moves = [move(4, 4, 'p2', stay=2), move(2, 2, 'p1', up=-1, stay=3)] + [move(0, 0, 'p1', stay=3)] * 4
+    pending = PendingTurn(6, REJECT_GRID)
+    rejected = sorted(pending.submit(cells_moves, max_moves_per_player=2), key=lambda r: r['player'])
+    expected = []
+    compute_game_turn(6, 0, REJECT_GRID, cells_moves, rejected=expected, max_moves_per_player=2)
+    assert rejected == sorted(expected, key=lambda r: r['player'])
+
+
+def test_pending_turn_replays_arrival_order():
+    # Chaque nouvel envoi d'un joueur remplace le précédent, et ses moves passent
+    # après ceux déjà reçus : le tour est celui de compute_game_turn sur les moves
+    # gardés, dans cet ordre
+    grid = [
+        {'x': 1, 'y': 2, 'weight': 3, 'player': 'p1'},
+        {'x': 3, 'y': 2, 'weight': 3, 'player': 'p2'},
+        {'x': 2, 'y': 1, 'weight': 3, 'player': 'p1'},
+        {'x': 2, 'y': 3, 'weight': 3, 'player': 'p2'},
+    ]
+    first = [move(1, 2, 'p1', stay=3), move(3, 2, 'p2', left=3)]
+    second = [move(2, 1, 'p1', down=3), move(1, 2, 'p1', right=3)]
+    pending = PendingTurn(5, grid)
+    pending.submit(first)
+    pending.submit([move(2, 3, 'p2', up=3)])
+    pending.submit(second)
+    kept = [move(2, 3, 'p2', up=3)] + second
+    for seed in range(20):
+        animation, new_grid = resolve_pending_turn(5, 0, pending, tie_seed=seed)
+        expected = compute_game_turn(5, 0, grid, kept, tie_seed=seed)
+        assert (list(animation), new_grid) == expected
+
+def results(move_animation):
+    # Résultat de chaque sous-cellule, par (origine, direction)
+    return {(m['origin_x'], m['origin_y'], m['direction']): m['result'] for m in move_animation}
+
+
+def test_fates_follow_midway_merge():
+    # p1 (3 = 2 à droite + 1 sur place) croise p2 (1 à gauche) : p2 meurt à mi-chemin
+    # et la fusion garde l'entrée de p1, qui se joue ensuite sur (2, 0) contre p3
+    grid = [
+        {'x': 1, 'y': 0, 'weight': 3, 'player': 'p1'},
+        {'x': 2, 'y': 0, 'weight': 1, 'player': 'p2'},
+        {'x': 3, 'y': 0, 'weight': 5, 'player': 'p3'},
+    ]
+    cells_moves = [move(1, 0, 'p1', right=2, stay=1), move(2, 0, 'p2', left=1), move(3, 0, 'p3', left=5)]
+    move_animation, new_grid = compute_game_turn(5, 0, grid, cells_moves)
+    assert results(move_animation) == {
+        (1, 0, 'right'): 'dies_arrival',  # la fusion (3) perd contre p3 (5)
+        (1, 0, 'stay'): 'survives',
+        (2, 0, 'left'): 'dies_midway',
+        (3, 0, 'left'): 'survives',
+    }
+    assert sorted((c['x'], c['y'], c['player'], c['weight']) for c in new_grid) == [
+        (1, 0, 'p1', 1), (2, 0, 'p3', 8)
+    ]
+
+    # p3 plus léger que la fusion : p1 survit, la mort à mi-chemin de p2 reste
+    grid[2]['weight'] = 2
+    cells_moves[2] = move(3, 0, 'p3', left=2)
+    move_animation, new_grid = compute_game_turn(5, 0, grid, cells_moves)
+    assert results(move_animation) == {
+        (1, 0, 'right'): 'survives',
+        (1, 0, 'stay'): 'survives',
+        (2, 0, 'left'): 'dies_midway',
+        (3, 0, 'left'): 'dies_arrival',
+    }
+    assert sorted((c['x'], c['y'], c['player'], c['weight']) for c in new_grid) == [
+        (1, 0, 'p1', 1), (2, 0, 'p1', 5)
+    ]
+
+
+def test_fates_of_split_and_vitamin():
+    # La cellule de p1 se divise : la moitié qui descend perd contre p2, celle qui va
+    # à droite y rejoint une autre cellule de p1 et mange la vitamine
+    grid = [
+        {'x': 0, 'y': 0, 'weight': 2, 'player': 'p1'},
+        {'x': 2, 'y': 0, 'weight': 1, 'player': 'p1'},
+        {'x': 1, 'y': 0, 'weight': 1, 'player': 'vitamin'},
+        {'x': 0, 'y': 2, 'weight': 3, 'player': 'p2'},
+    ]
+    cells_moves = [move(0, 0, 'p1', right=1, down=1), move(2, 0, 'p1', left=1), move(0, 2, 'p2', up=3)]
+    eaten = {}
+    move_animation, new_grid = compute_game_turn(4, 0, grid, cells_moves, eaten=eaten)
+    assert results(move_animation) == {
+        (0, 0, 'right'): 'survives',
+        (0, 0, 'down'): 'dies_arrival',
+        (2, 0, 'left'): 'survives',
+        (1, 0, 'stay'): 'dies_arrival',
+        (0, 2, 'up'): 'survives',
+    }
+    assert eaten == {'p1': 1}
+    assert sorted((c['x'], c['y'], c['player'], c['weight']) for c in new_grid) == [
+        (0, 1, 'p2', 4), (1, 0, 'p1', 3)
+    ]
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+# test_engine_check.py
+#
+# Les moteurs candidats (tuiles, flux, tour préparé, simulateur des bots) doivent donner
+# exactement la grille et l'animation de la référence (voir engine_check.py).
+
+from engine_check import check
+
+
+def test_tiled_matches_reference():
+    report = check('tiled', cases=200)
+    assert report['divergences'] == 0, report['first_divergence']
+
+
+def test_stream_matches_reference():
+    report = check('stream', cases=200)
+    assert report['divergences'] == 0, report['first_divergence']
+
+
+def test_pending_matches_reference():
+    # Moves de tous les joueurs entrelacés dans un seul envoi
+    report = check('pending', cases=200)
+    assert report['divergences'] == 0, report['first_divergence']
+
+
+def test_simulator_matches_reference():
+    # Le modèle de prédiction de player/search.py joue le même tour que le serveur
+    report = check('simulator', cases=300, max_grid=20)
+    assert report['divergences'] == 0, report['first_divergence']
+
+
+if __name__ == "__main__":
+    test_tiled_matches_reference()
+    test_stream_matches_reference()
+    test_pending_matches_reference()
+    test_simulator_matches_reference()
+    print("OK")
@@ -0,0 +1,157 @@
+# test_game_manager.py
+#
+# Cases modifiées d'un tour (touched), agrégats tenus à jour à partir de celles-ci
+# et aller-retour snapshot / from_snapshot.
+
+import json
+import random
+
+from compute import compute_game_turn
+from game_manager import GameManager
+
+
+def move(x, y, player, up=0, down=0, left=0, right=0, stay=0):
+    return {'x': x, 'y': y, 'player': player, 'move_up': up, 'move_down': down,
+            'move_left': left, 'move_right': right, 'move_stay': stay}
+
+
+def changed_squares(before, after):
+    # Cases dont le contenu (joueur, poids) diffère entre deux grilles
+    old = {(c['x'], c['y']): (c['player'], c['weight']) for c in before}
+    new = {(c['x'], c['y']): (c['player'], c['weight']) for c in after}
+    return {pos for pos in old.keys() | new.keys() if old.get(pos) != new.get(pos)}
+
+
+def test_touched_split():
+    # p1 envoie 2 à droite et garde 2 : seules (1, 1) et (2, 1) changent
+    grid = [
+        {'x': 1, 'y': 1, 'weight': 4, 'player': 'p1'},
+        {'x': 4, 'y': 4, 'weight': 3, 'player': 'p2'},
+        {'x': 0, 'y': 5, 'weight': 1, 'player': 'vitamin'},
+    ]
+    touched = set()
+    _, new_grid = compute_game_turn(6, 1, grid, [move(1, 1, 'p1', right=2, stay=2)],
+                                    touched=touched)
+    assert touched == {(1, 1), (2, 1)}
+    assert changed_squares(grid, new_grid) == touched
+
+
+def test_touched_vitamin_eaten():
+    # p1 mange la vitamine en (4, 3) ; une autre réapparaît ailleurs
+    grid = [
+        {'x': 3, 'y': 3, 'weight': 2, 'player': 'p1'},
+        {'x': 0, 'y': 0, 'weight': 3, 'player': 'p2'},
+        {'x': 4, 'y': 3, 'weight': 1, 'player': 'vitamin'},
+    ]
+    touched = set()
+    _, new_grid = compute_game_turn(6, 1, grid, [move(3, 3, 'p1', right=2)],
+                                    rng=random.Random(0), touched=touched)
+    spawned = {(c['x'], c['y']) for c in new_grid if c['player'] == 'vitamin'}
+    assert len(spawned) == 1
+    assert touched == {(3, 3), (4, 3)} | spawned
+    assert changed_squares(grid, new_grid) == touched
+
+
+def random_moves(game, rng):
+    # Chaque cellule répartit tout son poids au hasard entre les cinq directions
+    moves = []
+    for c in game.current_grid:
+        if c['player'] == 'vitamin':
+            continue
+        shares = dict.fromkeys(('up', 'down', 'left', 'right', 'stay'), 0)
+        for _ in range(c['weight']):
+            shares[rng.choice(list(shares))] += 1
+        moves.append(move(c['x'], c['y'], c['player'], **shares))
+    return moves
+
+
+def tiles_content(updates):
+    # Tuiles changées, cellules triées (l'ordre dans une tuile dépend de l'historique
+    # de l'index, pas du contenu)
+    return {**updates, 'tiles': [
+        {**tile, 'cells': sorted(tile['cells'], key=lambda c: (c['x'], c['y']))}
+        for tile in updates['tiles']
+    ]}
+
+
+def test_incremental_aggregates():
+    # Poids, cellules et index tenus à jour case par case = recalcul complet ;
+    # vitamines mangées comptées par la résolution
+    rng = random.Random(2)
+    game = GameManager(['a', 'b', 'c'], 40, 10, 150)
+    eaten = dict.fromkeys(game.players, 0)
+    for turn in range(25):
+        before = {(c['x'], c['y']) for c in game.current_grid if c['player'] == 'vitamin'}
+        moves = random_moves(game, rng)
+        game.apply_moves(moves, seed=turn)
+        # Une vitamine est mangée si sa case est occupée par un joueur après le tour
+        for c in game.current_grid:
+            if c['player'] != 'vitamin' and (c['x'], c['y']) in before:
+                eaten[c['player']] += 1
+        check = GameManager(game.players, 40, 10, 150, current_grid=game.current_grid)
+        assert game.total_weights == check.total_weights
+        assert game.cell_counts == check.cell_counts
+        assert game.world.count == len(game.current_grid)
+        for c in game.current_grid:
+            assert game.world.get(c['x'], c['y']) == c
+    assert game.vitamins_eaten == eaten
+    assert sum(eaten.values()) > 0
+
+
+def test_planes_follow_turns():
+    # Plans réécrits sur place à chaque tour = plans construits depuis la grille
+    import numpy as np
+
+    rng = random.Random(3)
+    game = GameManager(['a', 'b', 'c'], 30, 10, 100)
+    planes = game.planes()
+    for turn in range(15):
+        game.apply_moves(random_moves(game, rng), seed=turn)
+        assert game.planes() is planes
+        fresh = GameManager(game.players, 30, 10, 100, current_grid=game.current_grid).planes()
+        for name, array in fresh.items():
+            assert np.array_equal(planes[name], array)
+            assert not planes[name].flags.writeable
+
+    # Un joueur inconnu dans la grille est refusé explicitement
+    stray = game.current_grid + [{'x': 0, 'y': 0, 'weight': 1, 'player': 'z'}]
+    game.restore([c for c in stray if (c['x'], c['y']) != (0, 0) or c['player'] == 'z'], game.turn)
+    try:
+        game.planes()
+    except ValueError as error:
+        assert "'z'" in str(error)
+    else:
+        assert False, "joueur inconnu accepté"
+
+
+def test_snapshot_round_trip():
+    rng = random.Random(1)
+    game = GameManager(['a', 'b', 'c', 'd'], 80, 12, 400)
+    for turn in range(20):
+        game.apply_moves(random_moves(game, rng), seed=turn)
+
+    copy = GameManager.from_snapshot(json.loads(json.dumps(game.snapshot())))
+    assert copy.turn == game.turn
+    assert sorted(map(str, copy.current_grid)) == sorted(map(str, game.current_grid))
+    assert copy.leaderboard() == game.leaderboard()
+    assert copy.history.to_dict() == game.history.to_dict()
+    assert copy.tiles_state() == game.tiles_state()
+    since = game.tiles_version - 3
+    assert tiles_content(copy.tile_updates(since)) == tiles_content(game.tile_updates(since))
+
+    # Les deux parties continuent à l'identique
+    moves = random_moves(game, rng)
+    game.apply_moves(moves, seed=99)
+    copy.apply_moves(moves, seed=99)
+    assert copy.leaderboard() == game.leaderboard()
+    assert copy.history.to_dict() == game.history.to_dict()
+    assert tiles_content(copy.tile_updates(since)) == tiles_content(game.tile_updates(since))
+
+
+if __name__ == "__main__":
+    test_touched_split()
+    test_touched_vitamin_eaten()
+    test_incremental_aggregates()
+    test_planes_follow_turns()
+    test_snapshot_round_trip()
+    print("OK")
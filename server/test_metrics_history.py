@@ -0,0 +1,103 @@
+# test_metrics_history.py
+#
+# Requêtes sur les niveaux sous-échantillonnés comparées au calcul direct sur les
+# valeurs brutes, et reprise d'un export partiel (celui de shared_state).
+
+import json
+import random
+
+from metrics_history import MetricsHistory, FIELDS, AGGREGATES
+
+PLAYERS = ['a', 'b']
+FIRST_TURN = 5
+
+
+def recorded(turns, seed=0, **kwargs):
+    # Historique de `turns` tours aux valeurs aléatoires, et ces valeurs par tour
+    rng = random.Random(seed)
+    history = MetricsHistory(PLAYERS, first_turn=FIRST_TURN, **kwargs)
+    values = []
+    for row in range(turns):
+        point = {field: {p: rng.randint(0, 100) for p in PLAYERS} for field in FIELDS}
+        history.record(FIRST_TURN + row, point)
+        values.append(point)
+    return history, values
+
+
+def brute_force(values, first, last, field, player, agg):
+    column = [values[row][field][player] for row in range(first, last + 1)]
+    if agg == 'mean':
+        return sum(column) / len(column)
+    return min(column) if agg == 'min' else max(column)
+
+
+def check_points(result, values, agg, last_row, points):
+    # Chaque point agrège les lignes de son bloc de step tours, dans la plage
+    for i in points:
+        first = result['turns'][i] - FIRST_TURN
+        last = min(first - first % result['step'] + result['step'] - 1, last_row)
+        for player in PLAYERS:
+            for field in FIELDS:
+                expected = brute_force(values, first, last, field, player, agg)
+                assert abs(result['series'][player][field][i] - expected) < 1e-9
+
+
+def random_queries(rng, count, last_turn):
+    for _ in range(count):
+        start = rng.randint(0, last_turn + 100)
+        end = rng.randint(start, last_turn + 100)
+        yield start, end, rng.randint(1, 300), rng.choice(AGGREGATES)
+
+
+def test_query_matches_brute_force():
+    history, values = recorded(2000, factor=4, levels=3)
+    for start, end, points, agg in random_queries(random.Random(1), 300, history.last_turn):
+        result = history.query(start, end, points, agg=agg)
+        last_row = min(end, history.last_turn) - FIRST_TURN
+        check_points(result, values, agg, last_row, range(len(result['turns'])))
+        # Au plus points + 1 points (blocs alignés), sauf au niveau le plus grossier
+        assert len(result['turns']) <= max(points + 1, (last_row + 1) // 64 + 2)
+
+
+def test_partial_export_keeps_coarse_levels():
+    # Un worker très en retard ne repart pas de zéro : les niveaux publiés couvrent
+    # toute la partie, et les requêtes à leur résolution sont celles de l'écrivain
+    writer, values = recorded(2000, factor=4, levels=3)
+    lagging, _ = recorded(100, factor=4, levels=3)
+    lagging.merge(json.loads(json.dumps(writer.to_dict(last_rows=16))))
+    assert lagging.rows == writer.rows
+    for points in (1, 10, 31):
+        assert lagging.query(points=points) == writer.query(points=points)
+    # Tours dont seuls les niveaux grossiers restent : points exacts sur leurs blocs
+    # (le dernier peut déborder de la plage, faute de niveaux plus fins)
+    for start, end, points, agg in random_queries(random.Random(2), 300, writer.last_turn):
+        result = lagging.query(start, end, points, agg=agg)
+        last_row = min(end, writer.last_turn) - FIRST_TURN
+        check_points(result, values, agg, last_row, range(len(result['turns']) - 1))
+
+    # La suite s'ajoute comme chez l'écrivain, et la copie survit à un snapshot
+    rng = random.Random(3)
+    for row in range(2000, 2600):
+        point = {field: {p: rng.randint(0, 100) for p in PLAYERS} for field in FIELDS}
+        writer.record(FIRST_TURN + row, point)
+        lagging.record(FIRST_TURN + row, point)
+    reloaded = MetricsHistory.from_dict(PLAYERS, json.loads(json.dumps(lagging.to_dict())),
+                                        factor=4, levels=3)
+    for copy in (lagging, reloaded):
+        assert copy.query(points=10) == writer.query(points=10)
+        assert copy.query(2400, 2600) == writer.query(2400, 2600)
+
+
+def test_short_lag_is_exact():
+    writer, _ = recorded(2000, factor=4, levels=3)
+    lagging, _ = recorded(1990, factor=4, levels=3)
+    lagging.merge(writer.to_dict(last_rows=16))
+    assert lagging.to_dict() == writer.to_dict()
+    assert lagging.query(points=2000) == writer.query(points=2000)
+
+
+if __name__ == "__main__":
+    test_query_matches_brute_force()
+    test_partial_export_keeps_coarse_levels()
+    test_short_lag_is_exact()
+    print("OK")
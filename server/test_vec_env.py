@@ -0,0 +1,72 @@
+# test_vec_env.py
+#
+# Observations tenues à jour à partir des cases modifiées = observations tirées de la
+# grille, et parties reproductibles par graine sans toucher au module random.
+
+import random
+
+import numpy as np
+
+from vec_env import VecEnv, PLANE_OWN, PLANE_ENEMY, PLANE_VITAMIN, PLANE_OCCUPIED
+
+
+def random_actions(env, rng):
+    # Tout le poids de chaque case de l'agent dans une direction au hasard
+    actions = np.zeros((env.n_games, env.grid_size, env.grid_size, 5), dtype=np.int32)
+    own = env._obs[:, PLANE_OWN].astype(np.int32)
+    directions = rng.integers(0, 5, size=own.shape)
+    np.put_along_axis(actions, directions[..., None], own[..., None], axis=-1)
+    return actions
+
+
+def observed(env, i):
+    # Observation de la partie i recalculée depuis sa grille
+    obs = np.zeros(env._obs.shape[1:], dtype=np.float32)
+    for c in env.grids[i]:
+        x, y = c['x'], c['y']
+        if c['player'] == 'vitamin':
+            obs[PLANE_VITAMIN, y, x] = 1
+        else:
+            obs[PLANE_OWN if c['player'] == env.agent else PLANE_ENEMY, y, x] = c['weight']
+        obs[PLANE_OCCUPIED, y, x] = 1
+    return obs
+
+
+def test_observations_follow_grid():
+    env = VecEnv(8, ['p1', 'p2', 'p3'], 8, max_turns=30)
+    obs = env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    for _ in range(60):
+        obs, rewards, terminated, truncated, info = env.step(random_actions(env, rng))
+        for i in range(env.n_games):
+            assert np.array_equal(obs[i], observed(env, i))
+            weights = {}
+            for c in env.grids[i]:
+                weights[c['player']] = weights.get(c['player'], 0) + 1
+            assert env.agent_weights[i] == obs[i, PLANE_OWN].sum()
+            for player in env.players:
+                assert env._counts[i][player] == weights.get(player, 0)
+
+
+def test_seed_is_per_env():
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    runs = []
+    for _ in range(2):
+        env = VecEnv(4, ['p1', 'p2'], 10)
+        first = env.reset(seed=3)
+        rng = np.random.default_rng(1)
+        steps = [env.step(random_actions(env, rng))[0] for _ in range(20)]
+        runs.append((first, steps))
+    # Le module random n'a pas bougé
+    assert random.random() == expected
+    # Même graine, mêmes parties ; des parties différentes d'un env à l'autre
+    assert all(np.array_equal(a, b) for a, b in zip([runs[0][0]] + runs[0][1], [runs[1][0]] + runs[1][1]))
+    assert not all(np.array_equal(runs[0][1][-1][0], runs[0][1][-1][i]) for i in range(1, 4))
+
+
+if __name__ == "__main__":
+    test_observations_follow_grid()
+    test_seed_is_per_env()
+    print("OK")
@@ -0,0 +1,55 @@
+# turn_waiters.py
+#
+# Attente d'un nouveau tour sans thread par client (long-poll de GET /state/next) :
+# tous les clients qui attendent une même partie partagent un asyncio.Event de la
+# boucle du serveur. Le thread qui applique un tour appelle notify(game_id), qui
+# passe la main à la boucle (call_soon_threadsafe) pour réveiller l'événement.
+
+import asyncio
+
+
+class TurnWaiters:
+    def __init__(self):
+        self.loop = None
+        self.events = {}  # game_id -> asyncio.Event du prochain tour
+
+    def bind(self, loop):
+        """
+        Boucle asyncio des clients en attente (à fixer avant de lire le tour courant,
+        pour qu'un tour appliqué entre-temps ne soit pas manqué).
+        """
+        self.loop = loop
+
+    async def wait(self, game_id, timeout):
+        """
+        Attend le prochain notify(game_id) ; retourne False si timeout (secondes)
+        expire avant.
+        """
+        event = self.events.get(game_id)
+        if event is None:
+            event = self.events[game_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def notify(self, game_id):
+        """
+        Signale un nouveau tour de game_id (appelable depuis n'importe quel thread).
+        """
+        # Toujours passer par la boucle : un client qui vient de lire l'ancien tour
+        # crée son événement avant que _wake ne s'exécute
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake, game_id)
+            except RuntimeError:
+                # Boucle fermée (arrêt du serveur) : plus personne n'attend
+                self.loop = None
+
+    def _wake(self, game_id):
+        # Les clients suivants attendront un nouvel événement
+        event = self.events.pop(game_id, None)
+        if event is not None:
+            event.set()
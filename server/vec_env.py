@@ -0,0 +1,245 @@
+# vec_env.py
+#
+# Environnement vectorisé (style Gym) pour l'apprentissage par renforcement : N
+# parties avancent ensemble, actions et observations sont des tableaux NumPy.
+#
+#   env = VecEnv(n_games=64, players=["p1", "p2"], grid_size=10)
+#   obs = env.reset(seed=0)                       # (N, PLANES, H, W)
+#   actions = np.zeros((64, 10, 10, 5), np.int32)  # poids par direction, par case
+#   obs, rewards, terminated, truncated, info = env.step(actions)
+#
+# Chaque partie n'est que sa grille, jouée directement par compute_game_turn : pas
+# de GameManager (historique, tuiles, index, plans), les observations et le nombre
+# de cellules par joueur sont mis à jour à partir des seules cases modifiées par le
+# tour (touched). Le moteur reste en Python pur : le débit d'un VecEnv est celui
+# d'un cœur ; SubprocVecEnv répartit les parties sur plusieurs processus.
+
+import multiprocessing as mp
+import random
+
+import numpy as np
+
+from compute import compute_game_turn, generate_initial_grid
+
+# Ordre des directions dans la dernière dimension des actions
+ACTION_DIRECTIONS = ('move_up', 'move_down', 'move_left', 'move_right', 'move_stay')
+
+# Plans d'observation (obs[:, plan, y, x])
+PLANE_OWN = 0        # poids de mes cellules
+PLANE_ENEMY = 1      # poids des cellules adverses
+PLANE_VITAMIN = 2    # 1 si vitamine
+PLANE_OCCUPIED = 3   # 1 si case occupée
+N_PLANES = 4
+
+
+class VecEnv:
+    def __init__(self, n_games, players, grid_size, start_weight=6, number_of_vitamins=5,
+                 agent=None, opponent_policy=None, max_turns=200):
+        """
+        :param agent: joueur piloté par les actions (par défaut players[0])
+        :param opponent_policy: (optionnel) fonction (cellules du joueur, player_name,
+            grid_size) -> moves pour les autres joueurs (ex : logicBackUp.build_moves) ;
+            sans elle, ils restent sur place
+        :param max_turns: au-delà, la partie est tronquée et recommence
+        """
+        self.n_games = n_games
+        self.players = list(players)
+        self.grid_size = grid_size
+        self.start_weight = start_weight
+        self.number_of_vitamins = number_of_vitamins
+        self.agent = agent or self.players[0]
+        self.opponent_policy = opponent_policy
+        self.max_turns = max_turns
+        # Par partie : grille courante, numéro du tour, générateur aléatoire (placement
+        # initial, égalités, vitamines), cellule de chaque case occupée et nombre de
+        # cellules par joueur
+        self.grids = [None] * n_games
+        self.turns = np.zeros(n_games, dtype=np.int64)
+        self.rngs = [random.Random() for _ in range(n_games)]
+        self._occupants = [None] * n_games
+        self._counts = [None] * n_games
+        self.agent_weights = np.zeros(n_games, dtype=np.int64)
+        self._obs = np.zeros((n_games, N_PLANES, grid_size, grid_size), dtype=np.float32)
+
+    def _new_game(self, i):
+        grid = generate_initial_grid(self.players, self.grid_size, self.start_weight,
+                                     self.number_of_vitamins, rng=self.rngs[i])
+        self.grids[i] = grid
+        self.turns[i] = 0
+        self._occupants[i] = {}
+        self._counts[i] = dict.fromkeys(self.players, 0)
+        self._obs[i] = 0
+        self.agent_weights[i] = 0
+        self._write(i, {(c['x'], c['y']): c for c in grid})
+
+    def reset(self, seed=None):
+        """
+        Recommence toutes les parties ; retourne les observations (N, N_PLANES, H, W).
+        :param seed: (optionnel) la partie i est alors tirée par son propre générateur,
+            initialisé avec (seed, i) : le module `random` n'est pas touché
+        """
+        for i in range(self.n_games):
+            if seed is not None:
+                self.rngs[i].seed(f"{seed}:{i}")
+            self._new_game(i)
+        return self._obs.copy()
+
+    def step(self, actions):
+        """
+        Joue un tour dans chaque partie.
+
+        :param actions: tableau d'entiers (N, H, W, 5) : pour chaque case, le poids envoyé
+            vers up, down, left, right, stay. Seules les cases de l'agent sont lues ; une
+            répartition invalide (somme différente du poids, sortie de grille) laisse la
+            cellule sur place, comme pour un bot.
+        :return: (obs, rewards, terminated, truncated, info)
+            rewards : variation du poids total de l'agent ; terminated : l'agent n'a plus
+            de cellule ou la partie est finie (au plus un joueur restant, comme
+            GameManager.is_over) ; truncated : max_turns atteint. Les parties finies
+            recommencent aussitôt (obs est alors la première observation de la nouvelle
+            partie) ; info['final_weight'] donne le poids de l'agent à la fin du tour.
+        """
+        actions = np.asarray(actions)
+        rewards = np.zeros(self.n_games, dtype=np.float32)
+        terminated = np.zeros(self.n_games, dtype=bool)
+        truncated = np.zeros(self.n_games, dtype=bool)
+        final_weight = np.zeros(self.n_games, dtype=np.int64)
+        several = len(self.players) > 1
+
+        for i in range(self.n_games):
+            moves = self._agent_moves(i, actions[i])
+            if self.opponent_policy is not None:
+                moves.extend(self._opponent_moves(i))
+            rng = self.rngs[i]
+            touched = {}
+            _, self.grids[i] = compute_game_turn(
+                self.grid_size, self.number_of_vitamins, self.grids[i], moves,
+                tie_seed=rng.getrandbits(64), rng=rng, touched=touched
+            )
+            self.turns[i] += 1
+
+            before = self.agent_weights[i]
+            self._write(i, touched)
+            rewards[i] = self.agent_weights[i] - before
+            final_weight[i] = self.agent_weights[i]
+
+            counts = self._counts[i]
+            alive = sum(1 for count in counts.values() if count)
+            terminated[i] = not counts[self.agent] or (several and alive <= 1)
+            truncated[i] = not terminated[i] and self.turns[i] >= self.max_turns
+            if terminated[i] or truncated[i]:
+                self._new_game(i)
+
+        info = {'final_weight': final_weight}
+        return self._obs.copy(), rewards, terminated, truncated, info
+
+    def _agent_moves(self, i, action):
+        # Cases de l'agent lues dans son plan d'observation, à jour du dernier tour
+        ys, xs = np.nonzero(self._obs[i, PLANE_OWN])
+        splits = action[ys, xs].tolist()
+        moves = []
+        for x, y, split in zip(xs.tolist(), ys.tolist(), splits):
+            move = dict(zip(ACTION_DIRECTIONS, split))
+            move['x'] = x
+            move['y'] = y
+            move['player'] = self.agent
+            moves.append(move)
+        return moves
+
+    def _opponent_moves(self, i):
+        by_player = {}
+        for cell in self._occupants[i].values():
+            by_player.setdefault(cell['player'], []).append(cell)
+        moves = []
+        for player in self.players:
+            if player != self.agent and player in by_player:
+                moves.extend(self.opponent_policy(by_player[player], player, self.grid_size))
+        return moves
+
+    def _write(self, i, touched):
+        """
+        Reporte dans self._obs[i], le poids de l'agent et le nombre de cellules par
+        joueur les cases touched ({(x, y): cellule ou None}) de la partie i.
+        """
+        occupants = self._occupants[i]
+        counts = self._counts[i]
+        obs = self._obs[i]
+        agent = self.agent
+        own = int(self.agent_weights[i])
+        for (x, y), cell in touched.items():
+            old = occupants.pop((x, y), None)
+            if old is not None:
+                obs[:, y, x] = 0
+                if old['player'] != 'vitamin':
+                    counts[old['player']] -= 1
+                    if old['player'] == agent:
+                        own -= old['weight']
+            if cell is None:
+                continue
+            occupants[(x, y)] = cell
+            player = cell['player']
+            if player == 'vitamin':
+                obs[PLANE_VITAMIN, y, x] = 1
+            else:
+                counts[player] = counts.get(player, 0) + 1
+                if player == agent:
+                    obs[PLANE_OWN, y, x] = cell['weight']
+                    own += cell['weight']
+                else:
+                    obs[PLANE_ENEMY, y, x] = cell['weight']
+            obs[PLANE_OCCUPIED, y, x] = 1
+        self.agent_weights[i] = own
+
+def _worker(remote, kwargs):
+    env = VecEnv(**kwargs)
+    while True:
+        command, data = remote.recv()
+        if command == 'reset':
+            remote.send(env.reset(seed=data))
+        elif command == 'step':
+            remote.send(env.step(data))
+        elif command == 'close':
+            remote.close()
+            return
+
+
+class SubprocVecEnv:
+    def __init__(self, n_games, workers, **kwargs):
+        """
+        Même interface que VecEnv, les parties étant réparties entre `workers` processus
+        qui avancent en parallèle.
+        """
+        self.n_games = n_games
+        sizes = [n_games // workers + (1 if w < n_games % workers else 0) for w in range(workers)]
+        self.bounds = np.cumsum([0] + sizes)
+        self.remotes = []
+        self.processes = []
+        context = mp.get_context()
+        for size in sizes:
+            local, remote = context.Pipe()
+            process = context.Process(target=_worker, args=(remote, dict(kwargs, n_games=size)),
+                                      daemon=True)
+            process.start()
+            remote.close()
+            self.remotes.append(local)
+            self.processes.append(process)
+
+    def reset(self, seed=None):
+        for w, remote in enumerate(self.remotes):
+            remote.send(('reset', None if seed is None else seed + w))
+        return np.concatenate([remote.recv() for remote in self.remotes])
+
+    def step(self, actions):
+        for w, remote in enumerate(self.remotes):
+            remote.send(('step', actions[self.bounds[w]:self.bounds[w + 1]]))
+        results = [remote.recv() for remote in self.remotes]
+        obs, rewards, terminated, truncated, infos = zip(*results)
+        info = {'final_weight': np.concatenate([i['final_weight'] for i in infos])}
+        return (np.concatenate(obs), np.concatenate(rewards), np.concatenate(terminated),
+                np.concatenate(truncated), info)
+
+    def close(self):
+        for remote in self.remotes:
+            remote.send(('close', None))
+        for process in self.processes:
+            process.join()
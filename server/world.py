@@ -0,0 +1,161 @@
+import random
+
+# Side of a chunk, in squares
+CHUNK_SIZE = 64
+
+# Boards up to this many squares keep the dense "enumerate every free square" placement
+# (and its exact random sequence); larger boards sample free squares instead.
+DENSE_AREA_LIMIT = 250_000
+
+
+class ChunkedWorld:
+    """
+    Sparse world: a hash of fixed-size chunks, each holding only its occupied squares.
+
+    Memory and lookups depend on the number of cells, not on grid_size ** 2,
+    so a 100,000 x 100,000 board with 50k cells costs the same as a small one.
+
+        chunks: {(cx, cy): {(x, y): cell}}   with cx = x // chunk_size
+    """
+
+    def __init__(self, grid_size, chunk_size=CHUNK_SIZE):
+        self.grid_size = grid_size
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.count = 0
+
+    @classmethod
+    def from_cells(cls, grid_size, cells, chunk_size=CHUNK_SIZE):
+        world = cls(grid_size, chunk_size)
+        for cell in cells:
+            world.add(cell)
+        return world
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, pos):
+        return self.get(*pos) is not None
+
+    def __iter__(self):
+        for chunk in self.chunks.values():
+            yield from chunk.values()
+
+    def chunk_key(self, x, y):
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def add(self, cell):
+        """
+        Place a cell (dict with x, y, weight, player), replacing any occupant.
+        """
+        pos = (cell['x'], cell['y'])
+        chunk = self.chunks.setdefault(self.chunk_key(*pos), {})
+        if pos not in chunk:
+            self.count += 1
+        chunk[pos] = cell
+
+    def remove(self, x, y):
+        """
+        Remove and return the cell at (x, y), or None if the square is free.
+        Empty chunks are dropped.
+        """
+        key = self.chunk_key(x, y)
+        chunk = self.chunks.get(key)
+        if not chunk or (x, y) not in chunk:
+            return None
+        cell = chunk.pop((x, y))
+        self.count -= 1
+        if not chunk:
+            del self.chunks[key]
+        return cell
+
+    def get(self, x, y):
+        chunk = self.chunks.get(self.chunk_key(x, y))
+        if chunk is None:
+            return None
+        return chunk.get((x, y))
+
+    def is_free(self, x, y):
+        return self.get(x, y) is None
+
+    def cells(self):
+        return list(self)
+
+    def cells_in_rect(self, x0, y0, x1, y1):
+        """
+        Cells with x0 <= x <= x1 and y0 <= y <= y1, visiting only the chunks
+        overlapping the rectangle (or only the occupied ones, whichever is fewer).
+        """
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.grid_size - 1, x1), min(self.grid_size - 1, y1)
+        if x0 > x1 or y0 > y1:
+            return []
+        cx0, cy0 = self.chunk_key(x0, y0)
+        cx1, cy1 = self.chunk_key(x1, y1)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.chunks):
+            keys = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        else:
+            keys = [k for k in self.chunks if cx0 <= k[0] <= cx1 and cy0 <= k[1] <= cy1]
+
+        found = []
+        for key in keys:
+            chunk = self.chunks.get(key)
+            if not chunk:
+                continue
+            for (x, y), cell in chunk.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    found.append(cell)
+        return found
+
+
+def pick_free_positions(grid_size, occupied, count, rng=random):
+    """
+    Choose up to `count` distinct free squares at random.
+
+    :param occupied: container supporting `(x, y) in occupied`
+        (a set of positions, or a ChunkedWorld)
+
+    Small boards enumerate every free square and shuffle them, exactly as the turn
+    engine always did. Boards larger than DENSE_AREA_LIMIT that are mostly empty use
+    rejection sampling, so the cost depends on `count` rather than on the board area.
+    """
+    area = grid_size * grid_size
+    n_occupied = len(occupied)
+    if area > DENSE_AREA_LIMIT and area - n_occupied > 2 * count:
+        chosen = []
+        seen = set()
+        while len(chosen) < count:
+            pos = (rng.randrange(grid_size), rng.randrange(grid_size))
+            if pos in occupied or pos in seen:
+                continue
+            seen.add(pos)
+            chosen.append(pos)
+        return chosen
+
+    all_positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
+    free_positions = [pos for pos in all_positions if pos not in occupied]
+    rng.shuffle(free_positions)
+    return free_positions[:count]
+
+
+def shuffled_positions(grid_size, rng=random):
+    """
+    Every square of the board in random order. Drawn ahead of a turn, its first free
+    squares after the turn are a uniform random choice among the free squares.
+    """
+    positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
+    rng.shuffle(positions)
+    return positions
+
+
+def take_free_positions(candidates, occupied, count):
+    """
+    The first `count` candidates not in `occupied` (fewer if the board is full).
+    """
+    chosen = []
+    for pos in candidates:
+        if len(chosen) >= count:
+            break
+        if pos not in occupied:
+            chosen.append(pos)
+    return chosen